@@ -98,6 +98,9 @@ requires = [
     'stringcase'
 ]
 
+if sys.version_info[0] < 3:
+    requires.append('futures')
+
 if sys.platform == 'win32':
     requires.append('pyreadline')
     # scripts.extend(['%s.bat' % s for s in scripts])
@@ -127,6 +130,7 @@ setup(
     [console_scripts]
     canari=canari.entrypoints:main
     dispatcher=canari.entrypoints:dispatcher
+    worker-dispatcher=canari.worker:dispatch
     pysudo=canari.entrypoints:pysudo
     ''',
     classifiers=[
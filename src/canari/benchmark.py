@@ -0,0 +1,356 @@
+"""
+Micro-benchmarks for the hot paths of the message model, parser, renderer and configuration parser. Each benchmark is
+run against synthetic request or response corpora of varying sizes (number of entities and number of fields per
+entity). The results can be saved as JSON and compared against a baseline to catch performance regressions. See the
+`canari benchmark` command or run the pytest-benchmark suite in tests/benchmarks.
+"""
+import fnmatch
+import gc
+import json
+import math
+import platform
+import timeit
+from collections import OrderedDict
+from datetime import datetime
+
+import canari
+from canari.config import CanariConfigParser
+from canari.maltego.codec import get_codec
+from canari.maltego.entities import Location, Phrase
+from canari.maltego.message import (MaltegoMessage, MaltegoTransformRequestMessage, MaltegoTransformResponseMessage,
+                                    EntityTypeFactory, Field, Label, Limits, UIMessage)
+from canari.maltego.parser import LazyMaltegoTransformRequestMessage
+from canari.maltego.renderer import render_message
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'benchmarks',
+    'benchmark',
+    'make_request',
+    'make_response',
+    'iter_cases',
+    'measure',
+    'run_benchmarks',
+    'save_results',
+    'load_results',
+    'compare_results',
+    'regressions'
+]
+
+DEFAULT_ENTITIES = (1, 100, 1000, 10000)
+DEFAULT_FIELDS = (0, 10, 200)
+
+# Combinations of entity and field counts beyond this number of fields in total are skipped by default since they take
+# minutes to build and parse with safedexml.
+DEFAULT_MAX_SIZE = 100000
+
+RESULTS_FORMAT_VERSION = 1
+
+
+def make_request(entities, fields):
+    """Returns a transform request message with the specified number of entities that each have the specified number
+    of fields, along with a label, transform fields and limits."""
+    request = MaltegoTransformRequestMessage()
+    for i in range(entities):
+        e = Phrase('phrase & <value> %d' % i, weight=i % 100)
+        for j in range(fields):
+            e += Field('field%d' % j, 'value %d' % j, display_name='Field %d' % j)
+        e += Label('label', 'label %d' % i)
+        request += e
+    request += Field('api.key', '0123456789abcdef')
+    request += Limits(soft=entities, hard=entities)
+    return request
+
+
+def make_response(entities, fields):
+    """Returns a transform response message with the specified number of entities that each have the specified number
+    of fields, along with a UI message."""
+    response = MaltegoTransformResponseMessage()
+    for i in range(entities):
+        e = Phrase('phrase & <value> %d' % i, weight=i % 100, link_label='link %d' % i)
+        for j in range(fields):
+            e += Field('field%d' % j, 'value %d' % j, display_name='Field %d' % j)
+        response += e
+    response += UIMessage('Returned %d entities.' % entities)
+    return response
+
+
+def _render(msg):
+    return MaltegoMessage(message=msg).render(encoding='utf-8')
+
+
+class Benchmark(object):
+    def __init__(self, name, setup, uses_fields=True, description=None):
+        self.name = name
+        self.setup = setup
+        self.uses_fields = uses_fields
+        self.description = description or (setup.__doc__ or '').strip()
+
+
+# All the registered benchmarks by name in the order they were registered.
+benchmarks = OrderedDict()
+
+
+def benchmark(name, uses_fields=True):
+    """Registers a benchmark. The decorated function is called with the number of entities and fields and returns a
+    function that takes no arguments and runs the code being measured once."""
+    def decorator(setup):
+        benchmarks[name] = Benchmark(name, setup, uses_fields)
+        return setup
+    return decorator
+
+
+@benchmark('message.parse_request')
+def _parse_request(entities, fields):
+    """MaltegoMessage.parse() of a request message."""
+    xml = _render(make_request(entities, fields))
+    return lambda: MaltegoMessage.parse(xml).message.entities
+
+
+@benchmark('message.parse_response')
+def _parse_response(entities, fields):
+    """MaltegoMessage.parse() of a response message."""
+    xml = _render(make_response(entities, fields))
+    return lambda: MaltegoMessage.parse(xml).message.entities
+
+
+@benchmark('parser.iterparse_request')
+def _iterparse_request(entities, fields):
+    """LazyMaltegoTransformRequestMessage.iterparse() of a request message and access to all its entities."""
+    xml = _render(make_request(entities, fields))
+    return lambda: LazyMaltegoTransformRequestMessage.iterparse(xml).entities
+
+
+@benchmark('message.render_response')
+def _render_response(entities, fields):
+    """MaltegoMessage.render() of a response message."""
+    response = make_response(entities, fields)
+    return lambda: _render(response)
+
+
+@benchmark('renderer.render_response')
+def _render_message(entities, fields):
+    """render_message() of a response message."""
+    response = make_response(entities, fields)
+    return lambda: render_message(response, encoding='utf-8')
+
+
+@benchmark('codec.json_loads_request')
+def _json_loads_request(entities, fields):
+    """JSONCodec.loads_request() of a request message and access to all its entities."""
+    codec = get_codec('json')
+    data = codec.dumps(make_request(entities, fields))
+    return lambda: codec.loads_request(data).entities
+
+
+@benchmark('codec.json_dumps_response')
+def _json_dumps_response(entities, fields):
+    """JSONCodec.dumps() of a response message."""
+    codec = get_codec('json')
+    response = make_response(entities, fields)
+    return lambda: codec.dumps(response)
+
+
+@benchmark('message.entity_init', uses_fields=False)
+def _entity_init(entities, fields):
+    """Entity.__init__() with field keyword arguments."""
+    def run():
+        for i in range(entities):
+            Location('location %d' % i, city='Toronto', country='Canada', latitude=43.7, longitude=-79.4)
+    return run
+
+
+@benchmark('message.field_descriptors', uses_fields=False)
+def _field_descriptors(entities, fields):
+    """Setting and getting entity fields using the entity field descriptors."""
+    locations = [Location('location %d' % i) for i in range(entities)]
+
+    def run():
+        for l in locations:
+            l.city = 'Toronto'
+            l.latitude = 43.7
+            l.city, l.latitude, l.country
+    return run
+
+
+@benchmark('message.response_deduplicate')
+def _response_deduplicate(entities, fields):
+    """Adding entities to a deduplicating response message where half the entities are duplicates."""
+    items = []
+    for i in range(entities):
+        e = Phrase('phrase %d' % (i // 2), weight=i % 100)
+        for j in range(fields):
+            e += Field('field%d' % j, 'value %d' % j, display_name='Field %d' % j)
+        items.append(e)
+
+    def run():
+        response = MaltegoTransformResponseMessage().deduplicate()
+        for e in items:
+            response += e
+    return run
+
+
+@benchmark('message.entity_type_factory', uses_fields=False)
+def _entity_type_factory(entities, fields):
+    """EntityTypeFactory.create() for a mix of known and unknown entity types."""
+    types = sorted(EntityTypeFactory.registry) + ['unknown.Type']
+    types = [types[i % len(types)] for i in range(entities)]
+
+    def run():
+        for t in types:
+            EntityTypeFactory.create(t)
+    return run
+
+
+def _make_config(options):
+    config = CanariConfigParser()
+    config.add_section('bench')
+    values = ['string value', '1234', '12.5', 'a, b, c, d']
+    for i in range(options):
+        config.set('bench', 'option%d' % i, values[i % len(values)])
+    return config
+
+
+@benchmark('config.getitem')
+def _config_getitem(entities, fields):
+    """CanariConfigParser.__getitem__() lookups of previously accessed options."""
+    options = max(fields, 1)
+    config = _make_config(options)
+    keys = ['bench.option%d' % (i % options) for i in range(entities)]
+
+    def run():
+        for k in keys:
+            config[k]
+    return run
+
+
+@benchmark('config.getitem_uncached')
+def _config_getitem_uncached(entities, fields):
+    """CanariConfigParser.__getitem__() lookups after the configuration has been modified."""
+    options = max(fields, 1)
+    config = _make_config(options)
+    keys = ['bench.option%d' % (i % options) for i in range(entities)]
+
+    def run():
+        config.set('bench', 'option0', 'string value')
+        for k in keys:
+            config[k]
+    return run
+
+
+def case_name(name, entities, fields):
+    return '%s[entities=%d,fields=%d]' % (name, entities, fields)
+
+
+def iter_cases(patterns=None, entities=DEFAULT_ENTITIES, fields=DEFAULT_FIELDS, max_size=DEFAULT_MAX_SIZE):
+    """Yields (case name, benchmark, entities, fields) tuples for the benchmarks matching any of the glob patterns
+    (all of them by default). Benchmarks that don't depend on the number of fields are only run once per number of
+    entities."""
+    for b in benchmarks.values():
+        if patterns and not any(fnmatch.fnmatch(b.name, p) for p in patterns):
+            continue
+        for n in entities:
+            for f in (fields if b.uses_fields else (0,)):
+                if max_size and n * max(f, 1) > max_size:
+                    continue
+                yield case_name(b.name, n, f), b, n, f
+
+
+def measure(func, rounds=5, min_time=0.1):
+    """Times func, which takes no arguments. func is called enough times per round for a round to take at least
+    min_time seconds. Returns a dictionary with timing statistics in seconds per call."""
+    timer = timeit.Timer(func)
+    loops = 1
+    while True:
+        elapsed = timer.timeit(loops)
+        if elapsed >= min_time or loops >= 1000000:
+            break
+        loops = max(loops * 2, int(math.ceil(loops * min_time / max(elapsed, 1e-9) * 1.1)))
+        loops = min(loops, 1000000)
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        times = [timer.timeit(loops) / loops for _ in range(rounds)]
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    times.sort()
+    mean = sum(times) / len(times)
+    middle = len(times) // 2
+    median = times[middle] if len(times) % 2 else (times[middle - 1] + times[middle]) / 2
+    stddev = math.sqrt(sum((t - mean) ** 2 for t in times) / (len(times) - 1)) if len(times) > 1 else 0.0
+    return OrderedDict([
+        ('min', times[0]),
+        ('max', times[-1]),
+        ('mean', mean),
+        ('median', median),
+        ('stddev', stddev),
+        ('rounds', rounds),
+        ('loops', loops)
+    ])
+
+
+def run_benchmarks(patterns=None, entities=DEFAULT_ENTITIES, fields=DEFAULT_FIELDS, max_size=DEFAULT_MAX_SIZE,
+                   rounds=5, min_time=0.1, callback=None):
+    """Runs the matching benchmarks (see iter_cases()) and returns the results in the format used by save_results().
+    callback, if specified, is called with the case name and its statistics as soon as a case completes."""
+    results = OrderedDict()
+    for name, b, n, f in iter_cases(patterns, entities, fields, max_size):
+        stats = measure(b.setup(n, f), rounds, min_time)
+        results[name] = stats
+        if callback is not None:
+            callback(name, stats)
+    return OrderedDict([
+        ('version', RESULTS_FORMAT_VERSION),
+        ('created', datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')),
+        ('machine', OrderedDict([
+            ('canari', canari.__version__),
+            ('python', platform.python_version()),
+            ('implementation', platform.python_implementation()),
+            ('platform', platform.platform()),
+            ('processor', platform.processor() or platform.machine())
+        ])),
+        ('results', results)
+    ])
+
+
+def save_results(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        results = json.load(f, object_pairs_hook=OrderedDict)
+    if results.get('version') != RESULTS_FORMAT_VERSION:
+        raise ValueError('Unsupported benchmark results format in %r.' % path)
+    return results
+
+
+def compare_results(baseline, current, stat='min'):
+    """Compares the current results against the baseline results. Returns a list of (case name, baseline time, current
+    time, relative change) tuples for the cases that ran in both, i.e. a relative change of 0.1 is 10% slower."""
+    comparison = []
+    for name, stats in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        change = (stats[stat] - base[stat]) / base[stat] if base[stat] else 0.0
+        comparison.append((name, base[stat], stats[stat], change))
+    return comparison
+
+
+def regressions(comparison, threshold=0.1):
+    """Returns the entries of a comparison returned by compare_results() that are slower than threshold allows."""
+    return [c for c in comparison if c[3] > threshold]
@@ -0,0 +1,249 @@
+import csv
+import io
+import json
+import sys
+import time
+import traceback
+from collections import deque
+
+import click
+from six import string_types, text_type
+
+from canari.maltego.batch import is_batch_transform, iter_batches
+from canari.maltego.message import Entity, MaltegoException, MaltegoTransformExceptionMessage
+from canari.maltego.renderer import render_message
+from canari.maltego.runner import batch_transform_runner, load_object
+from canari.mode import set_canari_mode, get_canari_mode
+from canari.utils.fs import PushDir
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'batch_transform',
+    'guess_format',
+    'read_inputs',
+    'format_result',
+    'response_to_dict'
+]
+
+
+def guess_format(path):
+    """Returns the input format (csv, jsonl or text) of the file at path based on its extension."""
+    if path and path.endswith('.csv'):
+        return 'csv'
+    elif path and path.endswith(('.jsonl', '.json')):
+        return 'jsonl'
+    return 'text'
+
+
+def _read_csv(f):
+    """The first row is the header. The 'value' column (or the first column if there is none) holds the entity value
+    and the remaining non-empty columns are the entity fields."""
+    reader = csv.reader(f)
+    try:
+        header = next(reader)
+    except StopIteration:
+        return
+    value_column = header.index('value') if 'value' in header else 0
+    for row in reader:
+        if not row:
+            continue
+        fields = {k: v for i, (k, v) in enumerate(zip(header, row)) if i != value_column and v != ''}
+        yield row[value_column], fields
+
+
+def _read_jsonl(f):
+    """Each line is either a JSON string (the entity value) or an object with a 'value' and optional 'fields'
+    object."""
+    for n, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            raise click.BadParameter('invalid JSON on line %d: %s' % (n, e))
+        if isinstance(obj, string_types):
+            yield obj, {}
+        elif isinstance(obj, dict) and 'value' in obj:
+            yield text_type(obj['value']), {k: text_type(v) for k, v in (obj.get('fields') or {}).items()}
+        else:
+            raise click.BadParameter('expected a string or an object with a "value" key on line %d' % n)
+
+
+def _read_text(f):
+    for line in f:
+        line = line.rstrip('\r\n')
+        if line:
+            yield line, {}
+
+
+def read_inputs(f, input_format):
+    """Returns an iterator of (value, fields) tuples read from the file object f in the specified format (csv, jsonl,
+    or text)."""
+    return {'csv': _read_csv, 'jsonl': _read_jsonl, 'text': _read_text}[input_format](f)
+
+
+def response_to_dict(msg):
+    """Returns a JSON serializable representation of a MaltegoTransformResponseMessage."""
+    entities = []
+    for e in msg.entities:
+        if isinstance(e, Entity):
+            e = e.__entity__
+        entity = {'type': e.type, 'value': e.value, 'weight': e.weight}
+        if e.icon_url:
+            entity['icon_url'] = e.icon_url
+        if e.fields:
+            entity['fields'] = {f.name: f.value for f in e.fields.values()}
+        if e.labels:
+            entity['labels'] = {l.name: l.value for l in e.labels.values()}
+        entities.append(entity)
+    return {
+        'entities': entities,
+        'messages': [{'type': m.type, 'message': m.message} for m in msg.messages]
+    }
+
+
+# Per-process state used by the worker processes. The transform and config are loaded once per process.
+_worker_state = {}
+
+
+def _run_one(transform_name, params, mode, output_format, debug, batch_size, batch):
+    state = _worker_state.get(transform_name)
+    if state is None:
+        from canari.config import load_config
+        set_canari_mode(mode)
+        state = _worker_state[transform_name] = (load_object(transform_name), load_config())
+    return _execute(state[0], params, state[1], output_format, debug, batch_size, batch)
+
+
+def format_result(output_format, index, value, fields, error, msg):
+    """Returns the output line for the result of input number index: a Maltego message if output_format is xml or
+    a JSON object otherwise. error is the error message if the transform failed, in which case msg is ignored."""
+    if output_format == 'xml':
+        # Errors are written as exception messages just like Maltego would receive them.
+        if error is not None:
+            msg = MaltegoTransformExceptionMessage(exceptions=[MaltegoException(error)])
+        return render_message(msg, fragment=True)
+
+    result = {'index': index, 'value': value, 'fields': fields}
+    if error is not None:
+        result['error'] = error
+    else:
+        result.update(response_to_dict(msg))
+    return json.dumps(result, sort_keys=True)
+
+
+def _execute(transform, params, config, output_format, debug, batch_size, batch):
+    """Executes the transform for a batch of (index, value, fields) inputs. Errors are isolated and reported as part of
+    the results. An error that isn't specific to one input is reported for every input in the batch."""
+    results = [None] * len(batch)
+    error = None
+    try:
+        results = batch_transform_runner(transform, [(v, f) for _, v, f in batch], list(params), config, batch_size)
+    except MaltegoException as e:
+        error = str(e)
+    except Exception as e:
+        error = traceback.format_exc() if debug else '%s: %s' % (type(e).__name__, e)
+
+    formatted = []
+    for (index, value, fields), msg in zip(batch, results):
+        reason = str(msg) if isinstance(msg, MaltegoException) else error
+        formatted.append((index, reason, format_result(output_format, index, value, fields, reason, msg)))
+    return formatted
+
+
+def _iter_results(submit, batches, ordered, window):
+    from concurrent.futures import wait, FIRST_COMPLETED
+
+    pending = deque() if ordered else set()
+    for batch in batches:
+        future = submit(batch)
+        if ordered:
+            pending.append(future)
+            if len(pending) >= window:
+                for r in pending.popleft().result():
+                    yield r
+        else:
+            pending.add(future)
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    for r in f.result():
+                        yield r
+
+    if ordered:
+        while pending:
+            for r in pending.popleft().result():
+                yield r
+    else:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                for r in f.result():
+                    yield r
+
+
+def batch_transform(transform, params, input_file, input_format, output_file, output_format, workers, processes,
+                    ordered, project, config, debug=False, batch_size=None):
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+    input_format = input_format or guess_format(input_file)
+    if input_file in (None, '-'):
+        f = io.open(sys.stdin.fileno(), encoding='utf-8', newline='', closefd=False)
+    else:
+        f = io.open(input_file, encoding='utf-8', newline='')
+
+    to_stdout = output_file in (None, '-')
+    out = click.get_text_stream('stdout') if to_stdout else io.open(output_file, 'w', encoding='utf-8')
+
+    mode = get_canari_mode()
+    window = workers * 4
+    processed = failed = 0
+    start = time.time()
+
+    with PushDir(project.src_dir):
+        # Transforms that implement do_transform_batch get their inputs in batches; everything else one at a time.
+        transform_class = load_object(transform)
+        if is_batch_transform(transform_class):
+            batch_size = batch_size or transform_class.batch_size
+        else:
+            batch_size = 1
+
+        if processes:
+            executor = ProcessPoolExecutor(workers)
+
+            def submit(batch):
+                return executor.submit(_run_one, transform, params, mode, output_format, debug, batch_size, batch)
+        else:
+            executor = ThreadPoolExecutor(workers)
+
+            def submit(batch):
+                return executor.submit(_execute, transform_class, params, config, output_format, debug, batch_size,
+                                       batch)
+
+        inputs = ((i, v, fields) for i, (v, fields) in enumerate(read_inputs(f, input_format)))
+        try:
+            for index, error, data in _iter_results(submit, iter_batches(inputs, batch_size), ordered, window):
+                processed += 1
+                if error is not None:
+                    failed += 1
+                    click.echo('Input #%d failed: %s' % (index, error.strip()), err=True)
+                out.write(data)
+                out.write(u'\n')
+        finally:
+            executor.shutdown(wait=True)
+            out.flush()
+            if not to_stdout:
+                out.close()
+            f.close()
+
+    click.echo('Processed %d input(s) (%d failed) in %.2fs.' % (processed, failed, time.time() - start), err=True)
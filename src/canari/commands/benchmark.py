@@ -0,0 +1,67 @@
+import click
+
+from canari.benchmark import iter_cases, run_benchmarks, save_results, load_results, compare_results, regressions
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+
+def _format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if seconds * scale >= 1:
+            return '%.2f%s' % (seconds * scale, unit)
+    return '%.2fns' % (seconds * 1e9)
+
+
+def _print_result(name, stats):
+    click.echo('%-62s %10s %10s %9s  (%d x %d)' % (
+        name,
+        _format_time(stats['min']),
+        _format_time(stats['median']),
+        _format_time(stats['stddev']),
+        stats['rounds'],
+        stats['loops']
+    ))
+
+
+def benchmark(patterns, entities, fields, max_size, rounds, min_time, save, compare, threshold, list_only):
+    if list_only:
+        for name, b, _, _ in iter_cases(patterns, entities, fields, max_size):
+            click.echo('%-62s %s' % (name, b.description))
+        return
+
+    # Load the baseline first so that we don't find out that it is unusable after running all the benchmarks
+    baseline = load_results(compare) if compare else None
+
+    click.secho('%-62s %10s %10s %9s  %s' % ('benchmark', 'min', 'median', 'stddev', '(rounds x loops)'), bold=True)
+    results = run_benchmarks(patterns, entities, fields, max_size, rounds, min_time, _print_result)
+
+    if save:
+        save_results(results, save)
+        click.echo('Results saved to %r.' % save)
+
+    if baseline is None:
+        return
+
+    click.echo()
+    click.secho('Comparison against %r (created %s):' % (compare, baseline.get('created')), bold=True)
+    comparison = compare_results(baseline, results)
+    for name, before, after, change in comparison:
+        color = 'red' if change > threshold else 'green' if change < -threshold else None
+        click.echo('%-62s %10s -> %10s %s' % (
+            name, _format_time(before), _format_time(after), click.style('%+7.1f%%' % (change * 100), fg=color)
+        ))
+
+    slower = regressions(comparison, threshold)
+    if slower:
+        click.secho('%d benchmark(s) regressed by more than %.0f%%.' % (len(slower), threshold * 100), fg='red',
+                    err=True)
+        exit(1)
+    click.echo('No regressions beyond %.0f%%.' % (threshold * 100))
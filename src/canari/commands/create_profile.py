@@ -1,6 +1,8 @@
 import os
 import click
 
+from canari.utils.common import find_worker_dispatcher
+
 __author__ = 'Nadeem Douba'
 __copyright__ = 'Copyright 2012, Canari Project'
 __credits__ = []
@@ -12,7 +14,7 @@ __email__ = 'ndouba@redcanari.com'
 __status__ = 'Development'
 
 
-def create_profile(config_dir, project, transform_package):
+def create_profile(config_dir, project, transform_package, worker=False):
     try:
         mtz_dir = os.getcwd()
         in_project = project.is_valid and project.name == transform_package.name
@@ -20,7 +22,13 @@ def create_profile(config_dir, project, transform_package):
         if in_project:
             mtz_dir = project.root_dir
 
-        transform_package.create_profile(config_dir, mtz_dir, in_project=in_project)
+        dispatcher = None
+        if worker:
+            dispatcher = find_worker_dispatcher()
+            if not dispatcher:
+                raise ValueError('Could not find the worker-dispatcher script. Is Canari properly installed?')
+
+        transform_package.create_profile(config_dir, mtz_dir, in_project=in_project, dispatcher=dispatcher)
     except ValueError as e:
         click.echo(str(e), err=True)
         exit(-1)
@@ -1,3 +1,6 @@
+import click
+
+from canari import tracing
 from canari.maltego.runner import local_transform_runner, console_writer
 from canari.utils.fs import PushDir
 
@@ -12,6 +15,24 @@ __email__ = 'ndouba@redcanari.com'
 __status__ = 'Development'
 
 
-def debug_transform(transform, value, fields, params, project, config):
-    with PushDir(project.src_dir):
-        local_transform_runner(transform, value, fields, params, config, console_writer)
+def debug_transform(transform, value, fields, params, project, config, trace_file=None, profile_file=None):
+    # Both files are relative to the current directory, not the project's source directory
+    sink = tracing.ChromeTraceSink(trace_file) if trace_file else None
+    if sink is not None:
+        tracing.set_sink(sink)
+    profiler = tracing.Profiler() if profile_file else None
+    try:
+        with PushDir(project.src_dir):
+            if profiler is not None:
+                profiler.start()
+            with tracing.trace(), tracing.span('debug_transform', transform=transform):
+                local_transform_runner(transform, value, fields, params, config, console_writer)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            profiler.write(profile_file)
+            click.echo('Profile (%d samples) written to %r.' % (sum(profiler.samples.values()), profile_file), err=True)
+        if sink is not None:
+            tracing.set_sink(None)
+            sink.close()
+            click.echo('Trace written to %r.' % trace_file, err=True)
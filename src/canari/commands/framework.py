@@ -2,14 +2,14 @@ import os
 import re
 
 import click
-from mrbob.configurator import Configurator
 
 from canari.config import load_config
 from canari.mode import set_debug_mode, is_debug_exec_mode, set_canari_mode, CanariMode, get_canari_mode
-from canari.pkgutils.transform import TransformDistribution
-from canari.project import CanariProject
 from canari.utils.fs import PushDir
 
+# NOTE: mrbob, canari.project and canari.pkgutils.transform are imported where they are used. This module is loaded
+# by every canari command (including the dispatcher) and those modules are expensive to import.
+
 
 unescaped_equals = re.compile(r'(?<=[^\\])=')
 
@@ -60,6 +60,7 @@ class CanariContext(object):
     @property
     def project(self):
         if not self._project:
+            from canari.project import CanariProject
             self._project = CanariProject()
         return self._project
 
@@ -78,6 +79,8 @@ class CanariContext(object):
         if not os.path.lexists(self._config_dir):
             click.echo("Initializing Canari configuration: %s" % self._config_dir, err=True)
 
+            from mrbob.configurator import Configurator
+
             configurator = Configurator(
                 'canari.resources.templates:init_canari',
                 self._config_dir,
@@ -101,6 +104,10 @@ class CanariContext(object):
             self._config = load_config(self.config_file)
         return self._config
 
+    def reload_config(self):
+        self._config = None
+        return self.config
+
     @property
     def working_dir(self):
         return self._working_dir.cwd
@@ -120,6 +127,8 @@ class CanariPackage(click.ParamType):
     failure_message = 'required when this command is executed outside of a Canari project directory.'
 
     def convert(self, value, param, ctx):
+        from canari.pkgutils.transform import TransformDistribution
+
         if not value:
             if not ctx or not ctx.obj:
                 self.fail(self.failure_message)
@@ -0,0 +1,110 @@
+import json
+
+import click
+
+from canari.loadtest import synthetic_requests, load_corpus, run_load_test, summarize
+from canari.maltego.client import RemoteTransformClient
+from canari.maltego.message import Field, Limits
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+
+def _format_time(seconds):
+    if seconds is None:
+        return '-'
+    for unit, scale in (('s', 1), ('ms', 1e3)):
+        if seconds * scale >= 1:
+            return '%.2f%s' % (seconds * scale, unit)
+    return '%.2fus' % (seconds * 1e6)
+
+
+def _print_summary(summary):
+    latency = summary['latency']
+    sizes = summary['response_size']
+    click.secho('%-16s %d in %.2fs (%.1f requests/s)' % (
+        'requests', summary['requests'], summary['elapsed'], summary['throughput']), bold=True)
+    click.echo('%-16s %d (%.2f%%)' % ('errors', summary['errors'], summary['error_rate'] * 100))
+    for error, count in summary['error_types'].items():
+        click.echo('  %-14s %d' % (error, count))
+    click.echo('%-16s %s' % ('statuses', ', '.join('%s: %d' % s for s in summary['statuses'].items()) or '-'))
+    click.echo('%-16s %s' % ('latency', '  '.join(
+        '%s %s' % (k, _format_time(latency[k])) for k in ('min', 'mean', 'p50', 'p95', 'p99', 'max'))))
+    if summary['requests']:
+        click.echo('%-16s min %dB  mean %.0fB  max %dB  total %dB' % (
+            'response size', sizes['min'], sizes['mean'], sizes['max'], sizes['total']))
+
+
+def load_test(host, transform, ssl, base_path, codec, concurrency, rate, duration, requests, corpus, entity_type,
+              entities, fields, distribution, cardinality, payloads, seed, transform_parameter, soft_limit, hard_limit,
+              timeout, save, json_output):
+    if rate is not None and rate <= 0:
+        raise click.BadParameter('must be greater than 0.', param_hint='--rate')
+    if duration is None and requests is None:
+        duration = 10.0
+
+    params = []
+    for p in transform_parameter:
+        if '=' not in p:
+            raise click.BadParameter('expected a "name=value" pair, got %r.' % p, param_hint='--transform-parameter')
+        name, value = p.split('=', 1)
+        params.append(Field(name=name, value=value))
+    limits = Limits(soft=soft_limit, hard=hard_limit)
+
+    try:
+        client = RemoteTransformClient(host, base_path, ssl, codec, concurrency, timeout)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    if corpus:
+        messages = load_corpus(corpus)
+        if not messages:
+            raise click.UsageError('The corpus does not contain any request messages.')
+    else:
+        messages = synthetic_requests(payloads, entity_type, entities, fields, distribution, cardinality, params,
+                                      limits, seed)
+
+    # Requests are encoded ahead of time so that the cost of encoding them isn't measured
+    data = [client.codec.dumps(m) for m in messages]
+
+    if not json_output:
+        click.echo('Sending %s to %s://%s%s %s...' % (
+            '%d requests' % requests if requests is not None else 'requests for %gs' % duration,
+            'https' if ssl else 'http', host, client.path(transform),
+            'at %g requests/s (up to %d in flight)' % (rate, concurrency) if rate else
+            'from %d concurrent workers' % concurrency
+        ), err=True)
+
+    with client:
+        samples, elapsed = run_load_test(client, transform, data, concurrency, rate, duration, requests)
+
+    summary = summarize(
+        samples,
+        elapsed,
+        host=host,
+        transform=client.path(transform),
+        ssl=ssl,
+        codec=client.codec.name,
+        concurrency=concurrency,
+        rate=rate,
+        payloads=len(data),
+        corpus=list(corpus) or None,
+        connections=client.pool.created
+    )
+
+    if save:
+        with open(save, 'w') as f:
+            json.dump(summary, f, indent=2)
+    if json_output:
+        click.echo(json.dumps(summary, indent=2))
+    else:
+        _print_summary(summary)
+        if save:
+            click.echo('Results saved to %r.' % save)
@@ -0,0 +1,101 @@
+import re
+import subprocess
+import sys
+
+import click
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+# Follows the dispatcher (canari.entrypoints.dispatcher and run_transform) up to the point where the transform is
+# executed.
+startup_script = """
+import sys
+from canari.entrypoints import dispatcher
+from canari.commands.common import fix_binpath, fix_pypath
+from canari.commands.framework import CanariContext
+from canari.config import OPTION_LOCAL_PATH
+from canari.maltego.runner import load_object
+from canari.mode import CanariMode
+from canari.utils.fs import PushDir
+ctx = CanariContext()
+ctx.mode = CanariMode.Local
+fix_pypath()
+fix_binpath(ctx.config[OPTION_LOCAL_PATH])
+from canari.commands.run_transform import run_transform
+with PushDir(ctx.project.src_dir):
+    load_object(sys.argv[1])
+"""
+
+importtime_matcher = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(.+)$')
+
+
+class ImportTimeNode(object):
+    def __init__(self, name, self_us, cumulative_us, children=None):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.children = children or []
+
+
+def parse_importtime(lines):
+    """Parses the output of python -X importtime into a list of ImportTimeNode trees. The interpreter reports a module
+    only once it has finished importing, so children are listed before their parents (one level deeper)."""
+    pending = {}
+    for line in lines:
+        m = importtime_matcher.match(line.rstrip('\r\n'))
+        if not m:
+            continue
+        self_us, cumulative_us, indent, name = m.groups()
+        level = (len(indent) - 1) // 2
+        node = ImportTimeNode(name, int(self_us), int(cumulative_us), pending.pop(level + 1, []))
+        pending.setdefault(level, []).append(node)
+    return pending.get(0, [])
+
+
+def _print_tree(nodes, min_time, depth, max_depth):
+    for node in sorted(nodes, key=lambda n: n.cumulative_us, reverse=True):
+        if node.cumulative_us / 1000.0 < min_time:
+            continue
+        click.echo('%9.1f %9.1f  %s%s' % (
+            node.self_us / 1000.0,
+            node.cumulative_us / 1000.0,
+            '  ' * depth,
+            click.style(node.name, fg='green' if depth else 'yellow', bold=not depth)
+        ))
+        if max_depth is None or depth + 1 < max_depth:
+            _print_tree(node.children, min_time, depth + 1, max_depth)
+
+
+def profile_startup(transform, min_time, max_depth):
+    if sys.version_info < (3, 7):
+        click.echo('Profiling startup requires Python 3.7 or later (python -X importtime).', err=True)
+        exit(-1)
+
+    p = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', '-c', startup_script, transform],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True
+    )
+    _, err = p.communicate()
+
+    lines = err.splitlines()
+    if p.returncode:
+        click.echo('\n'.join(l for l in lines if not importtime_matcher.match(l)), err=True)
+        click.echo('Failed to load transform %r.' % transform, err=True)
+        exit(p.returncode)
+
+    nodes = parse_importtime(lines)
+    total = sum(n.cumulative_us for n in nodes) / 1000.0
+
+    click.secho('Import times for transform %r (total: %.1fms):' % (transform, total), bold=True)
+    click.echo('%9s %9s  %s' % ('self(ms)', 'cumul(ms)', 'module'))
+    _print_tree(nodes, min_time, 0, max_depth)
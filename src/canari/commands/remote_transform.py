@@ -1,9 +1,15 @@
+import io
+import sys
+import time
 import traceback
 
 import click
 
+from canari import tracing
+from canari.commands.batch_transform import read_inputs, guess_format, format_result
+from canari.maltego.client import RemoteTransformClient
 from canari.maltego.message import _Entity, Field, Limits, MaltegoMessage
-from canari.maltego.runner import remote_canari_transform_runner, console_writer
+from canari.maltego.runner import console_writer
 from canari.mode import set_canari_mode, CanariMode
 
 __author__ = 'Nadeem Douba'
@@ -28,41 +34,103 @@ def split_validate(value, type_):
     return value.split('=', 1)
 
 
-def remote_transform(host, transform, input, entity_field, transform_parameter, raw_output, 
-                     ssl, base_path, soft_limit, hard_limit, verbose):
+def _run_input_file(client, transform, entity_type, input_file, input_format, params, limits, raw_output, ordered):
+    input_format = input_format or guess_format(input_file)
+    if input_file == '-':
+        f = io.open(sys.stdin.fileno(), encoding='utf-8', newline='', closefd=False)
+    else:
+        f = io.open(input_file, encoding='utf-8', newline='')
+
+    # The inputs are kept around until their results are written
+    inputs = {}
+
+    def requests():
+        for index, (value, fields) in enumerate(read_inputs(f, input_format)):
+            inputs[index] = value, fields
+            yield transform, [_Entity(type=entity_type, value=value,
+                                      fields={k: Field(name=k, value=v) for k, v in fields.items()})]
+
+    out = click.get_text_stream('stdout')
+    output_format = 'xml' if raw_output else 'jsonl'
+    processed = failed = 0
+    start = time.time()
+    try:
+        for index, result in client.map(requests(), params, limits, ordered=ordered):
+            value, fields = inputs.pop(index)
+            processed += 1
+            error = None
+            if isinstance(result, Exception):
+                failed += 1
+                error = str(result)
+                click.echo('Input #%d failed: %s' % (index, error), err=True)
+                result = None
+            out.write(format_result(output_format, index, value, fields, error, result))
+            out.write(u'\n')
+    finally:
+        out.flush()
+        f.close()
+
+    click.echo('Processed %d input(s) (%d failed) in %.2fs (%d connection(s) opened).' % (
+        processed, failed, time.time() - start, client.pool.created), err=True)
+    exit(-1 if failed else 0)
+
+
+def remote_transform(host, transform, input, entity_field, transform_parameter, raw_output,
+                     ssl, base_path, soft_limit, hard_limit, verbose, codec='xml', input_file=None, input_format=None,
+                     entity_type='maltego.Phrase', workers=4, ordered=True):
+    try:
+        client = RemoteTransformClient(host, base_path, ssl, codec, workers)
+    except ValueError as e:
+        click.echo('ERROR: %s' % e, err=True)
+        exit(-1)
+
     if verbose:
         set_canari_mode(CanariMode.LocalDebug)
 
+    if (input is None) == (input_file is None):
+        click.echo('ERROR: Specify either an input entity or an input file (--input-file).', err=True)
+        exit(-1)
+
+    params = []
+    for p in transform_parameter:
+        name, value = split_validate(p, 'transform parameter')
+        params.append(Field(name=name, value=value))
+
+    limits = Limits(soft=soft_limit, hard=hard_limit)
+
+    if input_file is not None:
+        with client:
+            _run_input_file(client, transform, entity_type, input_file, input_format, params, limits, raw_output,
+                            ordered)
+
     entity_type, entity_value = split_validate(input, 'entity')
     fields = {}
-    params = []
 
     for f in entity_field:
         name, value = split_validate(f, 'entity field')
         fields[name] = Field(name=name, value=value)
 
-    for p in transform_parameter:
-        name, value = split_validate(p, 'transform parameter')
-        params.append(Field(name=name, value=value))
-
     try:
-        r = remote_canari_transform_runner(
-            host,
-            base_path,
-            transform,
-            [_Entity(type=entity_type, value=entity_value, fields=fields)],
-            params,
-            Limits(soft=soft_limit, hard=hard_limit),
-            ssl
-        )
+        # The trace ID is sent to the server, which can keep the spans of the request (see /status/traces)
+        with client, tracing.trace():
+            trace_id = tracing.current_trace_id()
+            r = client.send(
+                transform,
+                [_Entity(type=entity_type, value=entity_value, fields=fields)],
+                params,
+                limits
+            )
+
+        if verbose:
+            click.echo('Trace ID: %s' % trace_id, err=True)
 
         if r.status == 200:
-            data = r.read().decode('utf8')
+            # Servers that don't support the requested codec will respond in XML
             if raw_output:
-                click.echo(data, err=True)
+                click.echo(r.data if r.codec.binary else r.data.decode('utf8'), err=True)
                 exit(0)
             else:
-                console_writer(MaltegoMessage.parse(data))
+                console_writer(MaltegoMessage(message=r.message()))
                 exit(0)
 
         click.echo('ERROR: Received status %d for %s://%s/%s. Are you sure you got the right server?' % (
@@ -73,7 +141,7 @@ def remote_transform(host, transform, input, entity_field, transform_parameter,
         ), err=True)
         
         if verbose:
-            click.echo(r.read(), err=True)
+            click.echo(r.data, err=True)
     except Exception as e:
         click.echo('ERROR: %s' % e, err=True)
         if verbose:
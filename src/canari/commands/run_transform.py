@@ -1,3 +1,8 @@
+import sys
+
+import click
+
+from canari.maltego.codec import get_codec
 from canari.maltego.runner import local_transform_runner
 from canari.maltego.utils import message
 from canari.utils.fs import PushDir
@@ -13,6 +18,27 @@ __email__ = 'ndouba@redcanari.com'
 __status__ = 'Development'
 
 
-def run_transform(transform, value, fields, params, project, config):
+def codec_writer(codec):
+    """Returns a message writer that writes messages to stdout using codec instead of XML."""
+    def writer(m, fd=sys.stdout):
+        data = codec.dumps(m)
+        if codec.binary:
+            fd = click.get_binary_stream('stdout') if fd is sys.stdout else fd
+            fd.write(data)
+            fd.flush()
+        else:
+            click.echo(data.decode('utf-8'), file=fd)
+        exit(0)
+    return writer
+
+
+def run_transform(transform, value, fields, params, project, config, output_format='xml'):
+    if output_format == 'xml':
+        writer = message
+    else:
+        try:
+            writer = codec_writer(get_codec(output_format))
+        except ValueError as e:
+            raise click.UsageError(str(e))
     with PushDir(project.src_dir):
-        local_transform_runner(transform, value, fields, params, config, message)
+        local_transform_runner(transform, value, fields, params, config, writer)
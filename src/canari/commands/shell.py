@@ -7,7 +7,7 @@ import click
 
 import canari
 from canari.config import load_config
-from canari.maltego.runner import scriptable_transform_runner
+from canari.maltego.runner import scriptable_transform_runner, scriptable_batch_transform_runner
 from canari.utils.fs import PushDir
 
 __author__ = 'Nadeem Douba'
@@ -41,6 +41,14 @@ class ShellCommand(object):
             args = args[1:]
         return scriptable_transform_runner(self.transform, value, kwargs, list(args), self.config)
 
+    def batch(self, values, *args):
+        """Runs the transform over many values (or (value, fields) tuples) at once. Transforms that implement
+        do_transform_batch receive the values in batches."""
+        if os.name == 'posix' and self.transform.superuser and os.geteuid():
+            do_sudo()
+        inputs = [v if isinstance(v, tuple) else (v, {}) for v in values]
+        return scriptable_batch_transform_runner(self.transform, inputs, list(args), self.config)
+
 
 class MtgConsole(InteractiveConsole):
 
@@ -0,0 +1,28 @@
+import socket
+
+import click
+
+from canari.worker import serve, get_socket_path
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+
+def worker(ctx, packages, socket_path):
+    if not packages and ctx.project.is_valid:
+        packages = [ctx.project.name]
+    try:
+        serve(ctx, packages, socket_path or get_socket_path())
+    except RuntimeError as e:
+        click.echo(str(e), err=True)
+        exit(-1)
+    except (OSError, socket.error) as e:
+        click.echo('Could not start the worker on %s: %s' % (socket_path or get_socket_path(), e), err=True)
+        exit(-1)
@@ -5,6 +5,8 @@ import sys
 import os
 import re
 import string
+import threading
+import time
 
 from canari.mode import is_local_exec_mode, is_remote_exec_mode
 from canari.utils.fs import PushDir
@@ -29,7 +31,11 @@ __status__ = 'Development'
 
 __all__ = [
     'CanariConfigParser',
+    'ReadOnlyCanariConfigParser',
+    'ConfigCache',
+    'config_cache',
     'load_config',
+    'load_cached_config',
     'NoOptionError',
     'NoSectionError',
     'SECTION_LOCAL',
@@ -54,6 +60,11 @@ OPTION_REMOTE_PATH = 'canari.remote.path'
 OPTION_REMOTE_PACKAGES = 'canari.remote.packages'
 
 
+_int_matcher = re.compile(r'^\d+$')
+_float_matcher = re.compile(r'^\d+\.\d+$')
+_list_splitter = re.compile(r'\s*(?<=[^\\]),+\s*')
+
+
 def _interpolate_environment_variables(value):
     if isinstance(value, str):
         value = string.Template(value).safe_substitute(os.environ)
@@ -70,6 +81,8 @@ if sys.version_info[0] > 2:
     class CanariConfigParser(ConfigParser):
 
         def __init__(self, *args, **kwargs):
+            # ConfigParser.__init__ may call set() so our cache needs to exist beforehand
+            self._value_cache = {}
             super(CanariConfigParser, self).__init__(*args, interpolation=CustomInterpolation(), **kwargs)
 
         def __iadd__(self, other):
@@ -92,12 +105,12 @@ if sys.version_info[0] > 2:
                     value = m.__dict__[v]
                 except ImportError:
                     pass
-            elif re.match(r'^\d+$', value):
+            elif _int_matcher.match(value):
                 value = int(value)
-            elif re.match(r'^\d+\.\d+$', value):
+            elif _float_matcher.match(value):
                 value = float(value)
-            elif re.search(r'\s*(?<=[^\\]),+\s*', value):
-                l = re.split(r'\s*(?<=[^\\]),+\s*', value)
+            elif _list_splitter.search(value):
+                l = _list_splitter.split(value)
                 value = []
                 for v in l:
                     value.append(self._parse_value(v))
@@ -126,12 +139,44 @@ if sys.version_info[0] > 2:
             return key.rsplit('.', 1) if '.' in key else (key, '')
 
         def __getitem__(self, key):
-            section, option = self._get_option_value(key, True)
-            value = self.get(section, option)
-            value = self._parse_value(value)
-            if option == 'wordlist':
-                value = wordlist(value)
-            return value
+            # Parsed values (including resolved object:// references and wordlists) are memoized until the config is
+            # modified. object:// references are only resolved in local mode so the mode is part of the cache key.
+            cache_key = (key, is_local_exec_mode())
+            try:
+                value, copy = self._value_cache[cache_key]
+            except KeyError:
+                section, option = self._get_option_value(key, True)
+                value = self._parse_value(self.get(section, option))
+                if option == 'wordlist':
+                    value = wordlist(value)
+                # Hand out copies of parsed lists so callers can't modify our cached values. Wordlists can be large
+                # and are shared as is.
+                copy = isinstance(value, list) and option != 'wordlist'
+                self._value_cache[cache_key] = value, copy
+            return list(value) if copy else value
+
+        def _invalidate(self):
+            self._value_cache.clear()
+
+        def _read(self, *args, **kwargs):
+            self._invalidate()
+            return ConfigParser._read(self, *args, **kwargs)
+
+        def set(self, *args, **kwargs):
+            self._invalidate()
+            return ConfigParser.set(self, *args, **kwargs)
+
+        def add_section(self, *args, **kwargs):
+            self._invalidate()
+            return ConfigParser.add_section(self, *args, **kwargs)
+
+        def remove_option(self, *args, **kwargs):
+            self._invalidate()
+            return ConfigParser.remove_option(self, *args, **kwargs)
+
+        def remove_section(self, *args, **kwargs):
+            self._invalidate()
+            return ConfigParser.remove_section(self, *args, **kwargs)
 
         def __setitem__(self, key, value):
             section, option = self._get_option_value(key, True)
@@ -161,12 +206,18 @@ if sys.version_info[0] > 2:
         def update(self, other, **kwargs):
             if not isinstance(other, CanariConfigParser):
                 raise ValueError('Expected a CanariConfigParser, got %r instead' % type(other).__name__)
+            self._invalidate()
             self._sections.update(other._sections, **kwargs)
 
 
 else:
     class CanariConfigParser(SafeConfigParser):
 
+        def __init__(self, *args, **kwargs):
+            # SafeConfigParser.__init__ may call set() so our cache needs to exist beforehand
+            self._value_cache = {}
+            SafeConfigParser.__init__(self, *args, **kwargs)
+
         def __iadd__(self, other):
             self.add_section(other)
             return self
@@ -187,12 +238,12 @@ else:
                     value = m.__dict__[v]
                 except ImportError:
                     pass
-            elif re.match(r'^\d+$', value):
+            elif _int_matcher.match(value):
                 value = int(value)
-            elif re.match(r'^\d+\.\d+$', value):
+            elif _float_matcher.match(value):
                 value = float(value)
-            elif re.search(r'\s*(?<=[^\\]),+\s*', value):
-                l = re.split(r'\s*(?<=[^\\]),+\s*', value)
+            elif _list_splitter.search(value):
+                l = _list_splitter.split(value)
                 value = []
                 for v in l:
                     value.append(self._parse_value(v))
@@ -221,12 +272,44 @@ else:
             return key.rsplit('.', 1) if '.' in key else (key, '')
 
         def __getitem__(self, key):
-            section, option = self._get_option_value(key, True)
-            value = self.get(section, option)
-            value = self._parse_value(value)
-            if option == 'wordlist':
-                value = wordlist(value)
-            return value
+            # Parsed values (including resolved object:// references and wordlists) are memoized until the config is
+            # modified. object:// references are only resolved in local mode so the mode is part of the cache key.
+            cache_key = (key, is_local_exec_mode())
+            try:
+                value, copy = self._value_cache[cache_key]
+            except KeyError:
+                section, option = self._get_option_value(key, True)
+                value = self._parse_value(self.get(section, option))
+                if option == 'wordlist':
+                    value = wordlist(value)
+                # Hand out copies of parsed lists so callers can't modify our cached values. Wordlists can be large
+                # and are shared as is.
+                copy = isinstance(value, list) and option != 'wordlist'
+                self._value_cache[cache_key] = value, copy
+            return list(value) if copy else value
+
+        def _invalidate(self):
+            self._value_cache.clear()
+
+        def _read(self, *args, **kwargs):
+            self._invalidate()
+            return SafeConfigParser._read(self, *args, **kwargs)
+
+        def set(self, *args, **kwargs):
+            self._invalidate()
+            return SafeConfigParser.set(self, *args, **kwargs)
+
+        def add_section(self, *args, **kwargs):
+            self._invalidate()
+            return SafeConfigParser.add_section(self, *args, **kwargs)
+
+        def remove_option(self, *args, **kwargs):
+            self._invalidate()
+            return SafeConfigParser.remove_option(self, *args, **kwargs)
+
+        def remove_section(self, *args, **kwargs):
+            self._invalidate()
+            return SafeConfigParser.remove_section(self, *args, **kwargs)
 
         def __setitem__(self, key, value):
             section, option = self._get_option_value(key, True)
@@ -256,22 +339,162 @@ else:
         def update(self, other):
             if not isinstance(other, CanariConfigParser):
                 raise ValueError('Expected a CanariConfigParser, got %r instead' % type(other).__name__)
+            self._invalidate()
             self._sections.update(other._sections)
 
 
-def load_config(config_file=None, recursive_load=True):
+class ReadOnlyCanariConfigParser(CanariConfigParser):
+    """A CanariConfigParser that can no longer be modified once it has been frozen. Snapshots handed out by
+    load_cached_config() are shared across threads and requests, so they are frozen after they are loaded."""
+
+    _frozen = False
+
+    def freeze(self):
+        self._frozen = True
+        return self
+
+    def _check_frozen(self):
+        if self._frozen:
+            raise TypeError('Cached configurations are read-only. Use load_config() to get a private copy.')
+
+    def set(self, *args, **kwargs):
+        self._check_frozen()
+        return CanariConfigParser.set(self, *args, **kwargs)
+
+    def add_section(self, *args, **kwargs):
+        self._check_frozen()
+        return CanariConfigParser.add_section(self, *args, **kwargs)
+
+    def remove_option(self, *args, **kwargs):
+        self._check_frozen()
+        return CanariConfigParser.remove_option(self, *args, **kwargs)
+
+    def remove_section(self, *args, **kwargs):
+        self._check_frozen()
+        return CanariConfigParser.remove_section(self, *args, **kwargs)
+
+    def read(self, *args, **kwargs):
+        self._check_frozen()
+        return CanariConfigParser.read(self, *args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        self._check_frozen()
+        return CanariConfigParser.update(self, *args, **kwargs)
+
+
+def _resolve_config_file(config_file):
     if not config_file:
         config_file = os.path.join(os.getcwd(), 'canari.conf')
         if not os.path.lexists(config_file):
             config_file = os.path.join(os.path.expanduser('~'), '.canari', 'canari.conf')
+    return config_file
+
+
+def _read_config(config_parser, config_file, recursive_load):
+    """Reads config_file (and the configs it references if recursive_load is set) into config_parser. Returns the list
+    of absolute paths of all the files that were considered, whether they exist or not."""
+    config_dir = os.path.dirname(config_file)
+    files = [global_config, os.path.abspath(config_file)]
 
-    with PushDir(os.path.dirname(config_file)):
-        config_parser = CanariConfigParser()
+    with PushDir(config_dir):
         config_parser.read([global_config, config_file])
         if recursive_load:
+            configs = None
             if is_remote_exec_mode() and OPTION_REMOTE_CONFIGS in config_parser:
-                config_parser.read(config_parser[OPTION_REMOTE_CONFIGS])
+                configs = config_parser[OPTION_REMOTE_CONFIGS]
             elif OPTION_LOCAL_CONFIGS in config_parser:
-                config_parser.read(config_parser[OPTION_LOCAL_CONFIGS])
+                configs = config_parser[OPTION_LOCAL_CONFIGS]
+            if configs is not None:
+                config_parser.read(configs)
+                if isinstance(configs, string_types):
+                    configs = [configs] if configs else []
+                files.extend(os.path.abspath(c) for c in configs)
 
-        return config_parser
+    return files
+
+
+def load_config(config_file=None, recursive_load=True):
+    config_file = _resolve_config_file(config_file)
+    config_parser = CanariConfigParser()
+    _read_config(config_parser, config_file, recursive_load)
+    return config_parser
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class _ConfigSnapshot(object):
+    def __init__(self, config, files, checked):
+        self.config = config
+        self.files = files
+        self.checked = checked
+
+    @property
+    def is_stale(self):
+        for path, mtime in self.files.items():
+            if _mtime(path) != mtime:
+                return True
+        return False
+
+
+class ConfigCache(object):
+    """
+    ConfigCache keeps a parsed, read-only snapshot of each configuration (keyed by config file path, recursive_load and
+    execution mode) and hands out the same snapshot until one of the files it was loaded from changes. The files are
+    polled for changes (os.stat) at most once every interval seconds per configuration. Reloads build a new snapshot
+    and swap it in under a lock, so readers always see either the old or the new configuration in its entirety.
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.reloads = 0
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def get(self, config_file=None, recursive_load=True):
+        config_file = os.path.abspath(_resolve_config_file(config_file))
+        key = (config_file, recursive_load, is_remote_exec_mode())
+        snapshot = self._snapshots.get(key)
+        now = time.time()
+
+        if snapshot is not None:
+            if now - snapshot.checked < self.interval:
+                return snapshot.config
+            if not snapshot.is_stale:
+                snapshot.checked = now
+                return snapshot.config
+
+        with self._lock:
+            # Another thread may have already reloaded the configuration while we were waiting on the lock.
+            current = self._snapshots.get(key)
+            if current is not None and current is not snapshot:
+                return current.config
+
+            # Stat the main config files before they are read so that changes made while we are reading them trigger
+            # another reload.
+            mtimes = {f: _mtime(f) for f in (global_config, config_file)}
+            config_parser = ReadOnlyCanariConfigParser()
+            for f in _read_config(config_parser, config_file, recursive_load):
+                if f not in mtimes:
+                    mtimes[f] = _mtime(f)
+            self._snapshots[key] = _ConfigSnapshot(config_parser.freeze(), mtimes, now)
+            if snapshot is not None:
+                self.reloads += 1
+            return config_parser
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+
+
+config_cache = ConfigCache()
+
+
+def load_cached_config(config_file=None, recursive_load=True):
+    """Returns a shared, read-only snapshot of the configuration that is reloaded when any of its files change. Use
+    load_config() if you need a copy that can be modified."""
+    return config_cache.get(config_file, recursive_load)
@@ -51,6 +51,72 @@ def banner():
     banner()
 
 
+@main.command(name='batch-transform')
+@click.argument('transform', nargs=1, metavar='<transform>')
+@click.argument('params', nargs=-1, metavar='[param1 ... paramN]', required=False)
+@click.option('--input', '-i', 'input_file', metavar='<file>', default='-',
+              help='The file containing the input entities (default: stdin).')
+@click.option('--input-format', '-f', type=click.Choice(['csv', 'jsonl', 'text']), default=None,
+              help='The input file format. CSV files have a header row with a "value" column and any number of field '
+                   'columns. JSONL files contain a string or a {"value": ..., "fields": {...}} object per line. Text '
+                   'files contain one value per line (default: guessed from the file extension).')
+@click.option('--output', '-o', 'output_file', metavar='<file>', default='-',
+              help='The file to write the results to (default: stdout).')
+@click.option('--output-format', '-F', type=click.Choice(['jsonl', 'xml']), default='jsonl',
+              help='Write the results as JSON objects or Maltego messages, one per line (default: jsonl).')
+@click.option('--workers', '-n', type=click.IntRange(1), default=4, metavar='<workers>',
+              help='The number of inputs to process concurrently (default: 4).')
+@click.option('--processes', '-P', is_flag=True, default=False,
+              help='Use a pool of processes instead of threads (for CPU-bound transforms).')
+@click.option('--ordered/--unordered', default=True,
+              help='Write the results in the same order as the inputs or as soon as they are ready (default: ordered).')
+@click.option('--batch-size', '-b', type=click.IntRange(1), default=None, metavar='<size>',
+              help='The number of inputs passed at once to transforms that implement do_transform_batch (default: the '
+                   "transform's batch_size).")
+@pass_context
+def batch_transform(ctx, transform, params, input_file, input_format, output_file, output_format, workers, processes,
+                    ordered, batch_size):
+    """Runs a transform over many input entities in a single process."""
+    ctx.mode = CanariMode.LocalDispatch
+    fix_pypath()
+    fix_binpath(ctx.config[OPTION_LOCAL_PATH])
+    from canari.commands.batch_transform import batch_transform
+    batch_transform(transform, params, input_file, input_format, output_file, output_format, workers, processes,
+                    ordered, ctx.project, ctx.config, ctx.debug, batch_size)
+
+
+def _int_list(ctx, param, value):
+    try:
+        return tuple(int(v) for v in value.split(',') if v.strip())
+    except ValueError:
+        raise click.BadParameter('expected a comma separated list of integers.')
+
+
+@main.command()
+@click.argument('patterns', nargs=-1, metavar='[pattern1 ... patternN]', required=False)
+@click.option('--entities', '-e', default='1,100,1000,10000', callback=_int_list, metavar='<n1,n2,...>',
+              help='The number of entities in the synthetic messages (default: 1,100,1000,10000).')
+@click.option('--fields', '-f', default='0,10,200', callback=_int_list, metavar='<n1,n2,...>',
+              help='The number of fields per entity in the synthetic messages (default: 0,10,200).')
+@click.option('--max-size', type=int, default=100000, metavar='<n>',
+              help='Skip cases with more than this many entities times fields; 0 disables the limit (default: 100000).')
+@click.option('--rounds', '-r', type=click.IntRange(1), default=5, metavar='<n>',
+              help='The number of timed rounds per benchmark (default: 5).')
+@click.option('--min-time', type=float, default=0.1, metavar='<seconds>',
+              help='The minimum duration of a round (default: 0.1).')
+@click.option('--save', '-s', metavar='<file>', default=None, help='Save the results as JSON to this file.')
+@click.option('--compare', '-c', metavar='<file>', default=None, type=click.Path(exists=True, dir_okay=False),
+              help='Compare the results against a baseline saved using --save.')
+@click.option('--threshold', '-t', type=float, default=10.0, metavar='<percent>',
+              help='Fail when a benchmark is slower than the baseline by more than this percentage (default: 10).')
+@click.option('--list', '-l', 'list_only', is_flag=True, default=False,
+              help='List the benchmarks without running them.')
+def benchmark(patterns, entities, fields, max_size, rounds, min_time, save, compare, threshold, list_only):
+    """Benchmarks the message model, parser, renderer and config parser (patterns filter benchmarks by name)."""
+    from canari.commands.benchmark import benchmark
+    benchmark(patterns, entities, fields, max_size, rounds, min_time, save, compare, threshold / 100.0, list_only)
+
+
 @main.command(name='create-aws-lambda')
 @click.option('--bucket', '-b', metavar='<S3 bucket name>',
               help="The name of the bucket to store image and other binary resources for transforms in."
@@ -79,11 +145,13 @@ def create_package(package, author, email, description, create_example):
 
 @main.command(name='create-profile')
 @click.argument('package', nargs=1, type=CanariPackage(), default='', required=False)
+@click.option('--worker', '-W', is_flag=True, default=False,
+              help='Execute transforms using a running Canari worker (see "canari worker") when one is available.')
 @pass_context
-def create_profile(ctx, package):
+def create_profile(ctx, package, worker):
     """Creates an importable Maltego profile (*.mtz) file."""
     from canari.commands.create_profile import create_profile
-    create_profile(ctx.config_dir, ctx.project, package)
+    create_profile(ctx.config_dir, ctx.project, package, worker)
 
 
 @main.command(name='create-transform')
@@ -101,11 +169,17 @@ def create_transform(ctx, transform):
 @click.argument('value', metavar='<value>', callback=unescape_transform_value)
 @click.argument('fields', nargs=1, metavar='[field1=value1...#fieldN=valueN]', required=False,
                 callback=parse_transform_fields)
+@click.option('--trace', metavar='<file>', default=None,
+              help='Write the spans of the transform execution to a Chrome trace event file (chrome://tracing, '
+                   'Perfetto or speedscope).')
+@click.option('--profile', metavar='<file>', default=None,
+              help='Sample the call stack while the transform runs and write the samples as folded stacks '
+                   '(flamegraph.pl, inferno or speedscope).')
 @pass_context
-def debug_transform(ctx, transform, params, value, fields):
+def debug_transform(ctx, transform, params, value, fields, trace, profile):
     """Runs Canari local transforms in a terminal-friendly fashion."""
     from canari.commands.debug_transform import debug_transform
-    debug_transform(transform, value, fields, params, ctx.project, ctx.config)
+    debug_transform(transform, value, fields, params, ctx.project, ctx.config, trace, profile)
 
 
 @main.command(name='dockerize-package')
@@ -196,10 +270,77 @@ def load_plume_package(package, plume_dir, accept_defaults):
     load_plume_package(package, plume_dir, accept_defaults)
 
 
+@main.command(name='load-test')
+@click.argument('host', nargs=1, metavar='<host[:port]>')
+@click.argument('transform', metavar='<transform>', nargs=1)
+@click.option('--ssl', help='Perform requests over HTTPS (default: False).', is_flag=True, default=False)
+@click.option('--base-path', '-b', metavar='<base path>', default='/',
+              help='The base path of the Canari transform server (default: "/").')
+@click.option('--codec', '-c', type=click.Choice(['xml', 'json', 'msgpack']), default='xml',
+              help='The format used to exchange messages with the transform server (default: xml).')
+@click.option('--concurrency', '-n', type=click.IntRange(1), default=8, metavar='<n>',
+              help='The number of concurrent requests, or the maximum number of requests in flight with --rate '
+                   '(default: 8).')
+@click.option('--rate', '-R', type=float, default=None, metavar='<requests/s>',
+              help='Send requests at a fixed rate instead of as fast as the server responds.')
+@click.option('--duration', '-d', type=float, default=None, metavar='<seconds>',
+              help='How long to run the load test for (default: 10 unless --requests is specified).')
+@click.option('--requests', '-N', type=click.IntRange(1), default=None, metavar='<n>',
+              help='The number of requests to send.')
+@click.option('--corpus', '-C', type=click.Path(exists=True), multiple=True, default=[],
+              help='A request message file or a directory of them to send instead of synthetic requests. Can be '
+                   'specified multiple times.')
+@click.option('--entity-type', '-t', metavar='<entity name>', multiple=True, default=['maltego.Phrase'],
+              help='The type of the synthetic input entities. Can be specified multiple times (default: '
+                   'maltego.Phrase).')
+@click.option('--entities', '-e', type=click.IntRange(1), default=1, metavar='<n>',
+              help='The number of input entities per synthetic request (default: 1).')
+@click.option('--fields', '-f', type=click.IntRange(0), default=0, metavar='<n>',
+              help='The number of fields per synthetic input entity (default: 0).')
+@click.option('--distribution', type=click.Choice(['sequential', 'uniform', 'zipf']), default='uniform',
+              help='How synthetic entity values are picked (default: uniform).')
+@click.option('--cardinality', type=click.IntRange(1), default=1000, metavar='<n>',
+              help='The number of distinct synthetic entity values (default: 1000).')
+@click.option('--payloads', type=click.IntRange(1), default=1000, metavar='<n>',
+              help='The number of distinct synthetic requests, which are sent in turn (default: 1000).')
+@click.option('--seed', type=int, default=None, metavar='<n>', help='The seed used to generate synthetic requests.')
+@click.option(
+    '--transform-parameter', '-p', metavar='<name>=<value>',
+    help='Transform parameter name and value pair (e.g. "api.key=123"). Can be specified multiple times.',
+    multiple=True, default=[])
+@click.option('--soft-limit', type=int, default=500, metavar='<soft limit>', help='Set the soft limit (default: 500)')
+@click.option('--hard-limit', type=int, metavar='<hard limit>', default=10000,
+              help='Set the hard limit (default: 10000)')
+@click.option('--timeout', type=float, default=30.0, metavar='<seconds>',
+              help='The socket timeout (default: 30).')
+@click.option('--save', '-s', metavar='<file>', default=None, help='Save the results as JSON to this file.')
+@click.option('--json', 'json_output', is_flag=True, default=False,
+              help='Print the results as JSON instead of text.')
+def load_test(host, transform, ssl, base_path, codec, concurrency, rate, duration, requests, corpus, entity_type,
+              entities, fields, distribution, cardinality, payloads, seed, transform_parameter, soft_limit, hard_limit,
+              timeout, save, json_output):
+    """Measures the throughput and latency of a transform on a Canari transform server."""
+    from canari.commands.load_test import load_test
+    load_test(host, transform, ssl, base_path, codec, concurrency, rate, duration, requests, corpus, entity_type,
+              entities, fields, distribution, cardinality, payloads, seed, transform_parameter, soft_limit, hard_limit,
+              timeout, save, json_output)
+
+
+@main.command(name='profile-startup')
+@click.argument('transform', nargs=1, metavar='<transform>')
+@click.option('--min-time', '-m', type=float, default=1.0, metavar='<ms>',
+              help='Hide modules that took less than this many milliseconds to import (default: 1.0).')
+@click.option('--depth', '-d', type=int, default=None, metavar='<depth>', help='Maximum depth of the import tree.')
+def profile_startup(transform, min_time, depth):
+    """Reports the time spent importing modules when a transform is dispatched."""
+    from canari.commands.profile_startup import profile_startup
+    profile_startup(transform, min_time, depth)
+
+
 @main.command(name="remote-transform")
 @click.argument('host', nargs=1, metavar='<host[:port]>')
 @click.argument('transform', metavar='<transform>', nargs=1)
-@click.argument('input', metavar='<entity name>=<value>', nargs=1)
+@click.argument('input', metavar='[<entity name>=<value>]', nargs=1, required=False)
 @click.option(
     '--entity-field', '-f', metavar='<name>=<value>', multiple=True, default=[],
     help='The entity field name and value pair (e.g. "person.firstname=Bob"). Can be specified multiple times.'
@@ -217,12 +358,28 @@ def load_plume_package(package, plume_dir, accept_defaults):
 @click.option('--hard-limit', type=int, metavar='<hard limit>', default=10000,
               help='Set the hard limit (default: 10000)')
 @click.option('--verbose', '-v', help='Enable verbose debug mode.', is_flag=True, default=False)
+@click.option('--codec', '-c', type=click.Choice(['xml', 'json', 'msgpack']), default='xml',
+              help='The format used to exchange messages with the transform server (default: xml).')
+@click.option('--input-file', '-i', metavar='<file>', default=None,
+              help='Run the transform for each of the entity values in a file ("-" for stdin) instead of a single '
+                   'input entity. The requests are sent concurrently over keep-alive connections and the results are '
+                   'written as JSON objects (or Maltego messages with --raw-output), one per line.')
+@click.option('--input-format', type=click.Choice(['csv', 'jsonl', 'text']), default=None,
+              help='The input file format (see batch-transform; default: guessed from the file extension).')
+@click.option('--entity-type', '-t', metavar='<entity name>', default='maltego.Phrase',
+              help='The type of the entities read from the input file (default: maltego.Phrase).')
+@click.option('--workers', '-n', type=click.IntRange(1), default=4, metavar='<workers>',
+              help='The maximum number of requests in flight with --input-file (default: 4).')
+@click.option('--ordered/--unordered', default=True,
+              help='Write the results in the same order as the inputs or as soon as they are ready (default: ordered).')
 def remote_transform(host, transform, input, entity_field, transform_parameter, raw_output, ssl,
-                     base_path, soft_limit, hard_limit, verbose):
+                     base_path, soft_limit, hard_limit, verbose, codec, input_file, input_format, entity_type, workers,
+                     ordered):
     """Runs Canari local transforms in a terminal-friendly fashion."""
     from canari.commands.remote_transform import remote_transform
     remote_transform(host, transform, input, entity_field, transform_parameter, raw_output, ssl,
-                     base_path, soft_limit, hard_limit, verbose)
+                     base_path, soft_limit, hard_limit, verbose, codec, input_file, input_format, entity_type, workers,
+                     ordered)
 
 
 @main.command(name='run-transform', cls=CanariRunnerCommand)
@@ -231,14 +388,16 @@ def remote_transform(host, transform, input, entity_field, transform_parameter,
 @click.argument('value', metavar='<value>', callback=unescape_transform_value)
 @click.argument('fields', nargs=1, metavar='[field1=value1...#fieldN=valueN]', required=False,
                 callback=parse_transform_fields)
+@click.option('--output-format', '-o', type=click.Choice(['xml', 'json', 'msgpack']), default='xml',
+              help='The format of the transform output (default: xml).')
 @pass_context
-def run_transform(ctx, transform, params, value, fields):
+def run_transform(ctx, transform, params, value, fields, output_format):
     """Executes the transform like it would in Maltego"""
     ctx.mode = CanariMode.LocalDispatch
     fix_pypath()
     fix_binpath(ctx.config[OPTION_LOCAL_PATH])
     from canari.commands.run_transform import run_transform
-    run_transform(transform, value, fields, params, ctx.project, ctx.config)
+    run_transform(transform, value, fields, params, ctx.project, ctx.config, output_format)
 
 
 @main.command()
@@ -275,6 +434,17 @@ def version():
     version()
 
 
+@main.command()
+@click.argument('packages', nargs=-1, metavar='[package1 ... packageN]', required=False)
+@click.option('--socket', '-s', 'socket_path', metavar='<path>', default=None,
+              help='The path of the Unix domain socket to listen on (default: ~/.canari/worker.sock).')
+@pass_context
+def worker(ctx, packages, socket_path):
+    """Runs a long-lived worker that keeps transform packages loaded for the worker-dispatcher."""
+    from canari.commands.worker import worker
+    worker(ctx, packages, socket_path)
+
+
 @click.command(cls=CanariRunnerCommand)
 @click.argument('transform', nargs=1, metavar='<transform>')
 @click.argument('params', nargs=-1, metavar='[param1 ... paramN]', required=False)
@@ -1,10 +1,19 @@
+import functools
+import hashlib
+import json
 import os
 import re
+import sys
+import threading
+import time
 from subprocess import Popen, PIPE
 
-from canari.maltego.message import MaltegoMessage
+from canari import tracing
+from canari.maltego.message import MaltegoMessage, MaltegoTransformResponseMessage, MaltegoException, LimitReached
 from six import string_types
 
+from canari.maltego.renderer import render_message
+from canari.maltego.utils import to_response, is_awaitable_result, new_response
 from canari.mode import is_remote_exec_mode, is_local_exec_mode
 from canari.resource import external_resource
 from canari.utils.stack import calling_package
@@ -26,6 +35,8 @@ __all__ = [
     'EnableDebugWindow',
     'ExternalCommand',
     'RequestFilter',
+    'CacheResults',
+    'DeduplicateEntities',
     'classproperty'
 ]
 
@@ -109,6 +120,208 @@ class RequestFilter(object):
         raise ValueError('Expected callable (got %s instead).' % type(self.filter).__name__)
 
 
+class CacheResults(object):
+    """
+    Caches the results of a transform so that repeated requests for the same input don't hit upstream services again.
+    Results are keyed on the transform name, the input entity's type, value and fields, and the transform settings
+    (request.settings).
+
+    :param ttl: the number of seconds a result is fresh for.
+    :param key: an optional callable accepting the request object and returning a string used as the cache key
+                instead of the default (the transform name is always part of the key).
+    :param backend: a cache backend object (see canari.utils.cache), a cache URI (i.e. 'sqlite:///tmp/cache.db',
+                    'redis://localhost:6379/0', 'memory://?max_entries=100'), or None for the default backend (see
+                    canari.utils.cache.get_default_cache()).
+    :param stale_ttl: the number of seconds after a result has expired during which the stale result is returned
+                      while it is refreshed in the background (stale-while-revalidate). Stale results are refreshed
+                      synchronously by local transforms since they exit as soon as their results are written.
+    :param negative_ttl: the number of seconds for which a MaltegoException raised by the transform is cached and
+                         re-raised (default: 0, errors are not cached).
+
+    Transforms written as generators have their results collected (rather than streamed) before they are cached.
+    Responses that were cut short by an enforced hard limit are not cached.
+
+    :Example:
+
+    @CacheResults(ttl=3600, stale_ttl=600, negative_ttl=60)
+    class MyTransform(Transform):
+        pass
+    """
+
+    def __init__(self, ttl=3600, key=None, backend=None, stale_ttl=0, negative_ttl=0):
+        self.ttl = ttl
+        self.key = key
+        self.backend = backend
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self._cache = None
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            from canari.utils.cache import get_default_cache, cache_from_uri
+            if self.backend is None:
+                self._cache = get_default_cache()
+            elif isinstance(self.backend, string_types):
+                self._cache = cache_from_uri(self.backend)
+            else:
+                self._cache = self.backend
+        return self._cache
+
+    def make_key(self, transform, request):
+        if self.key is not None:
+            key = self.key(request)
+        else:
+            entity = request.entity
+            key = json.dumps([
+                entity.type,
+                entity.value,
+                sorted((n, f.value) for n, f in entity.fields.items()),
+                sorted(request.settings.items())
+            ])
+        return '%s:%s' % (transform.name, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def _lookup(self, key):
+        # A broken cache should never break the transform so treat errors as misses
+        try:
+            data = self.cache.get(key)
+            return json.loads(data.decode('utf-8')) if data is not None else None
+        except Exception:
+            return None
+
+    def _store(self, key, result=None, error=None):
+        if error is not None:
+            if not self.negative_ttl or not isinstance(error, MaltegoException):
+                return
+            entry, ttl = {'error': str(error)}, self.negative_ttl
+        elif isinstance(result, MaltegoTransformResponseMessage):
+            if result.limit_reached:
+                # Responses cut short by the hard limit would be served to requests with higher limits
+                return
+            entry, ttl = {'response': render_message(result, fragment=True)}, self.ttl + self.stale_ttl
+        else:
+            return
+        entry['created'] = time.time()
+        try:
+            self.cache.set(key, json.dumps(entry), ttl)
+        except Exception:
+            pass
+
+    def _execute(self, key, do_transform, transform, request, response, config):
+        try:
+            msg = do_transform(transform, request, response, config)
+            if is_awaitable_result(msg):
+                from canari.maltego.aio import collect_and_store
+                return collect_and_store(msg, response, lambda **kwargs: self._store(key, **kwargs))
+            msg = to_response(msg, response)
+        except LimitReached:
+            # The response is as complete as it's going to get
+            msg = response
+        except Exception as e:
+            self._store(key, error=e)
+            raise
+        self._store(key, result=msg)
+        return msg
+
+    def _revalidate(self, key, do_transform, transform, request, config):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                response = new_response(transform, request)
+                to_response(self._execute(key, do_transform, transform, request, response, config), response)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        # Make sure the refresh can still generate icon URLs for the current Plume request
+        flask = sys.modules.get('flask')
+        if flask is not None and flask.has_request_context():
+            refresh = flask.copy_current_request_context(refresh)
+        elif sys.version_info >= (3, 7):
+            import contextvars
+            refresh = functools.partial(contextvars.copy_context().run, refresh)
+
+        t = threading.Thread(target=refresh, name='canari-cache-refresh')
+        t.daemon = True
+        t.start()
+
+    def __call__(self, transform):
+        orig_do_transform = transform.do_transform
+
+        def do_transform(self_, request, response, config):
+            key = self.make_key(self_, request)
+            entry = self._lookup(key)
+            if entry is not None:
+                age = time.time() - entry['created']
+                if 'error' in entry:
+                    if age < self.negative_ttl:
+                        raise MaltegoException(entry['error'])
+                elif age < self.ttl:
+                    return MaltegoMessage.parse(entry['response']).message
+                elif age < self.ttl + self.stale_ttl and not is_local_exec_mode():
+                    self._revalidate(key, orig_do_transform, self_, request, config)
+                    return MaltegoMessage.parse(entry['response']).message
+            return self._execute(key, orig_do_transform, self_, request, response, config)
+
+        if sys.version_info >= (3, 6):
+            from canari.maltego.aio import is_async_transform, as_coroutine_function
+            if is_async_transform(transform):
+                do_transform = as_coroutine_function(do_transform)
+
+        transform.do_transform = do_transform
+        return transform
+
+
+def DeduplicateEntities(transform):
+    """
+    Merges duplicate entities (same type and value) returned by the transform before they are sent to Maltego. This is
+    useful for transforms that aggregate results from several sources. See
+    MaltegoTransformResponseMessage.deduplicate() for details on how entities are merged.
+
+    Transforms written as generators have their results collected (rather than streamed) so that they can be merged.
+
+    :Example:
+
+    @DeduplicateEntities
+    class MyTransform(Transform):
+        pass
+
+    :param transform: the transform class whose results will be deduplicated.
+    :return: the transform class.
+    """
+    orig_do_transform = transform.do_transform
+
+    def deduplicate(result=None, error=None):
+        # Transforms that return a response object of their own get it deduplicated after the fact
+        if isinstance(result, MaltegoTransformResponseMessage):
+            result.deduplicate()
+
+    def do_transform(self_, request, response, config):
+        msg = orig_do_transform(self_, request, response.deduplicate(), config)
+        if is_awaitable_result(msg):
+            from canari.maltego.aio import collect_and_store
+            return collect_and_store(msg, response, deduplicate)
+        msg = to_response(msg, response)
+        deduplicate(msg)
+        return msg
+
+    if sys.version_info >= (3, 6):
+        from canari.maltego.aio import is_async_transform, as_coroutine_function
+        if is_async_transform(transform):
+            do_transform = as_coroutine_function(do_transform)
+
+    transform.do_transform = do_transform
+    return transform
+
+
 def EnableDebugWindow(transform):
     """
     TODO.
@@ -168,13 +381,18 @@ class ExternalCommand(object):
                 )
             )
         if is_local_exec_mode():
-            p = Popen(self.args, env=self.env)
-            p.communicate()
+            with tracing.span('external_command', program=self.args[0]) as s:
+                p = Popen(self.args, env=self.env)
+                p.communicate()
+                s.set(returncode=p.returncode)
             exit(p.returncode)
         else:
-            p = Popen(self.args, env=self.env, stdout=PIPE)
-            out, _ = p.communicate()
-            return MaltegoMessage.parse(out)
+            with tracing.span('external_command', program=self.args[0]) as s:
+                p = Popen(self.args, env=self.env, stdout=PIPE)
+                out, _ = p.communicate()
+                s.set(returncode=p.returncode)
+            with tracing.span('parse'):
+                return MaltegoMessage.parse(out)
 
 
 class classproperty(object):
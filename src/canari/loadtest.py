@@ -0,0 +1,287 @@
+"""
+Load testing for Canari transform servers (Plume or AWS Lambda deployments). Transform requests are either synthetic
+(see synthetic_requests()) or read from a corpus of request messages and are sent over keep-alive connections (see
+canari.maltego.client) in one of two ways:
+
+- at a fixed concurrency, where each worker sends its next request as soon as the previous one completes; or
+- at a fixed arrival rate, where requests are sent on schedule regardless of how long earlier requests take. Latencies
+  are measured from the time a request was scheduled so that a server that falls behind can't hide it.
+
+The results are summarized as throughput, latency percentiles, error rates and response sizes. See the
+`canari load-test` command.
+"""
+import bisect
+import math
+import os
+import platform
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from timeit import default_timer
+
+from six.moves.queue import Queue
+
+import canari
+from canari.maltego.codec import get_codec
+from canari.maltego.message import MaltegoTransformRequestMessage, _Entity, Field, Limits
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'distributions',
+    'synthetic_requests',
+    'load_corpus',
+    'run_load_test',
+    'percentile',
+    'summarize'
+]
+
+
+def _sequential(cardinality, rng):
+    i = [-1]
+
+    def sample():
+        i[0] = (i[0] + 1) % cardinality
+        return i[0]
+    return sample
+
+
+def _uniform(cardinality, rng):
+    return lambda: rng.randrange(cardinality)
+
+
+def _zipf(cardinality, rng, s=1.1):
+    # A few values are very popular and the rest are rare, which is what transforms sitting behind caches usually see
+    weights = []
+    total = 0.0
+    for rank in range(1, cardinality + 1):
+        total += 1.0 / rank ** s
+        weights.append(total)
+    return lambda: min(bisect.bisect_left(weights, rng.random() * total), cardinality - 1)
+
+
+# Value distributions by name. Each one is called with the number of distinct values and a random.Random object and
+# returns a function that returns the index of the next value.
+distributions = OrderedDict([
+    ('sequential', _sequential),
+    ('uniform', _uniform),
+    ('zipf', _zipf)
+])
+
+
+def synthetic_requests(count, entity_types=('maltego.Phrase',), entities=1, fields=0, distribution='uniform',
+                       cardinality=1000, parameters=(), limits=None, seed=None):
+    """Returns a list of count transform request messages. Each request has the specified number of input entities,
+    which are of each of the entity types in turn and have the specified number of fields. Entity values are drawn from
+    cardinality distinct values using the named distribution (see distributions)."""
+    rng = random.Random(seed)
+    sample = distributions[distribution](max(cardinality, 1), rng)
+    requests = []
+    n = 0
+    for _ in range(count):
+        r = MaltegoTransformRequestMessage()
+        for _ in range(entities):
+            entity_type = entity_types[n % len(entity_types)]
+            n += 1
+            value = sample()
+            r += _Entity(
+                type=entity_type,
+                value='%s %d' % (entity_type.rsplit('.', 1)[-1].lower(), value),
+                fields=OrderedDict(
+                    ('field%d' % i, Field('field%d' % i, 'value %d-%d' % (value, i))) for i in range(fields)
+                )
+            )
+        for p in parameters:
+            r += p
+        r += limits or Limits()
+        requests.append(r)
+    return requests
+
+
+def load_corpus(paths):
+    """Returns the transform request messages in the files (or the files in the directories) listed in paths. Each file
+    holds a single request message. Files ending in .json or .msgpack are decoded using the matching codec and
+    everything else is read as XML."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, f) for f in os.listdir(path)
+                                if os.path.isfile(os.path.join(path, f))))
+        else:
+            files.append(path)
+
+    requests = []
+    for path in files:
+        codec = get_codec({'.json': 'json', '.msgpack': 'msgpack'}.get(os.path.splitext(path)[1].lower(), 'xml'))
+        with open(path, 'rb') as f:
+            requests.append(codec.loads_request(f.read()))
+    return requests
+
+
+def percentile(values, p):
+    """Returns the pth percentile (nearest rank) of a sorted list of values or None if the list is empty."""
+    if not values:
+        return None
+    return values[max(int(math.ceil(p / 100.0 * len(values))), 1) - 1]
+
+
+def _is_exception(data):
+    # Transform errors are reported in exception messages rather than HTTP errors. The tag name is left as is by all
+    # the codecs so there's no need to decode the response.
+    return b'MaltegoTransformExceptionMessage' in data
+
+
+def _send(client, transform, payload):
+    """Returns a (status, response size, error) tuple. error is None for successful requests."""
+    try:
+        r = client.send_raw(transform, payload)
+    except Exception as e:
+        return None, 0, type(e).__name__
+    if r.status != 200:
+        return r.status, len(r.data), 'HTTP %d' % r.status
+    elif _is_exception(r.data):
+        return r.status, len(r.data), 'MaltegoTransformExceptionMessage'
+    return r.status, len(r.data), None
+
+
+def _closed_loop(client, transform, payloads, concurrency, deadline, requests, samples):
+    lock = threading.Lock()
+    sent = [0]
+
+    def worker(results):
+        while True:
+            with lock:
+                i = sent[0]
+                if (requests is not None and i >= requests) or (deadline is not None and default_timer() >= deadline):
+                    return
+                sent[0] += 1
+            start = default_timer()
+            status, size, error = _send(client, transform, payloads[i % len(payloads)])
+            results.append((default_timer() - start, status, size, error))
+
+    _run_workers(worker, concurrency, samples)
+
+
+def _open_loop(client, transform, payloads, concurrency, rate, start, deadline, requests, samples):
+    queue = Queue()
+
+    def worker(results):
+        while True:
+            item = queue.get()
+            if item is None:
+                return
+            i, scheduled = item
+            status, size, error = _send(client, transform, payloads[i % len(payloads)])
+            results.append((default_timer() - scheduled, status, size, error))
+
+    def dispatch():
+        i = 0
+        while requests is None or i < requests:
+            scheduled = start + i / float(rate)
+            if deadline is not None and scheduled >= deadline:
+                break
+            delay = scheduled - default_timer()
+            if delay > 0:
+                time.sleep(delay)
+            queue.put((i, scheduled))
+            i += 1
+        for _ in range(concurrency):
+            queue.put(None)
+
+    _run_workers(worker, concurrency, samples, dispatch)
+
+
+def _run_workers(worker, concurrency, samples, dispatch=None):
+    # Each worker records its samples in its own list so that they don't contend for a lock
+    results = [[] for _ in range(concurrency)]
+    threads = [threading.Thread(target=worker, args=(r,)) for r in results]
+    for t in threads:
+        t.daemon = True
+        t.start()
+    if dispatch is not None:
+        dispatch()
+    for t in threads:
+        t.join()
+    for r in results:
+        samples.extend(r)
+
+
+def run_load_test(client, transform, payloads, concurrency=8, rate=None, duration=10.0, requests=None):
+    """
+    Sends transform requests to the server behind client (a RemoteTransformClient) until duration seconds have elapsed
+    or the specified number of requests has been sent, whichever comes first. The encoded request messages in payloads
+    are sent in turn.
+
+    :param concurrency: the number of requests in flight at once. If rate is specified, this is the maximum number of
+                        requests in flight.
+    :param rate: the number of requests to send per second. If None, requests are sent as fast as the server allows.
+    :return: a tuple of the samples and the elapsed time in seconds. Samples are (latency, status, response size, error)
+             tuples. error is None for successful requests. status is None and error is the exception's class name if
+             the request failed to complete.
+    """
+    if duration is None and requests is None:
+        raise ValueError('Either a duration or a number of requests is required.')
+    samples = []
+    start = default_timer()
+    deadline = start + duration if duration is not None else None
+    if rate is None:
+        _closed_loop(client, transform, payloads, concurrency, deadline, requests, samples)
+    else:
+        _open_loop(client, transform, payloads, concurrency, rate, start, deadline, requests, samples)
+    return samples, default_timer() - start
+
+
+def summarize(samples, elapsed, **info):
+    """Returns the summary of the samples returned by run_load_test() as a JSON serializable dictionary. info is stored
+    along with the summary (i.e. the host, transform and load test settings)."""
+    latencies = sorted(s[0] for s in samples)
+    sizes = [s[2] for s in samples]
+    errors = OrderedDict()
+    statuses = OrderedDict()
+    for _, status, _, error in samples:
+        if status is not None:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if error is not None:
+            errors[error] = errors.get(error, 0) + 1
+    failed = sum(errors.values())
+    total = len(samples)
+    return OrderedDict([
+        ('created', datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')),
+        ('machine', OrderedDict([
+            ('canari', canari.__version__),
+            ('python', platform.python_version()),
+            ('platform', platform.platform())
+        ])),
+        ('settings', OrderedDict(sorted(info.items()))),
+        ('elapsed', elapsed),
+        ('requests', total),
+        ('errors', failed),
+        ('error_rate', float(failed) / total if total else 0.0),
+        ('throughput', total / elapsed if elapsed else 0.0),
+        ('latency', OrderedDict([
+            ('min', latencies[0] if latencies else None),
+            ('mean', sum(latencies) / total if total else None),
+            ('p50', percentile(latencies, 50)),
+            ('p95', percentile(latencies, 95)),
+            ('p99', percentile(latencies, 99)),
+            ('max', latencies[-1] if latencies else None)
+        ])),
+        ('response_size', OrderedDict([
+            ('min', min(sizes) if sizes else None),
+            ('mean', float(sum(sizes)) / total if total else None),
+            ('max', max(sizes) if sizes else None),
+            ('total', sum(sizes))
+        ])),
+        ('statuses', statuses),
+        ('error_types', errors)
+    ])
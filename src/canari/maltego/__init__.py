@@ -11,5 +11,7 @@ __status__ = 'Development'
 __all__ = [
     'entities',
     'message',
+    'parser',
+    'renderer',
     'transform'
 ]
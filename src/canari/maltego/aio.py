@@ -0,0 +1,122 @@
+import asyncio
+import inspect
+import threading
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'is_async_transform',
+    'is_awaitable_result',
+    'collect_response',
+    'run_until_complete',
+    'as_coroutine_function',
+    'collect_and_store'
+]
+
+
+# Python 3.6+ only. This module is imported lazily by canari.maltego.utils when a transform returns a coroutine or an
+# asynchronous generator so that the rest of Canari remains importable by older interpreters.
+
+
+def is_async_transform(transform):
+    """Returns True if the transform's do_transform method is a coroutine function or asynchronous generator
+    function."""
+    do_transform = transform.do_transform
+    return inspect.iscoroutinefunction(do_transform) or inspect.isasyncgenfunction(do_transform)
+
+
+def is_awaitable_result(msg):
+    return inspect.iscoroutine(msg) or inspect.isasyncgen(msg)
+
+
+async def collect_response(msg, response):
+    """Awaits the coroutine returned by an async do_transform method or, if do_transform is an asynchronous generator,
+    collects the entities and UI messages it yields into response. The entities accumulated so far are returned if the
+    transform is stopped because response reached its hard limit."""
+    # Imported here since canari.maltego.message imports this module's users
+    from canari.maltego.message import LimitReached
+    try:
+        if inspect.isasyncgen(msg):
+            async for item in msg:
+                if item is not None and item is not response:
+                    response += item
+            return response
+        return await msg
+    except LimitReached:
+        if inspect.isasyncgen(msg):
+            await msg.aclose()
+        return response
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except AttributeError:
+        loop = asyncio.get_event_loop()
+        return loop if loop.is_running() else None
+    except RuntimeError:
+        return None
+
+
+def _run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def run_until_complete(msg, response):
+    """Runs an async transform's result to completion on a private event loop and returns the result. If an event
+    loop is already running in the calling thread (i.e. the scriptable API is used from within a coroutine) the
+    transform is executed on a separate thread to avoid blocking or re-entering the running loop."""
+    coro = collect_response(msg, response)
+    if _running_loop() is None:
+        return _run(coro)
+
+    result = {}
+
+    def target():
+        try:
+            result['value'] = _run(coro)
+        except BaseException as e:
+            result['error'] = e
+
+    t = threading.Thread(target=target, name='canari-transform-loop')
+    t.start()
+    t.join()
+    if 'error' in result:
+        raise result['error']
+    return result['value']
+
+
+def as_coroutine_function(func):
+    """Wraps func, which may return either a value or an awaitable, in a coroutine function. This is used by
+    decorators that replace the do_transform method of async transforms."""
+    async def wrapper(*args, **kwargs):
+        result = func(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+    return wrapper
+
+
+async def collect_and_store(msg, response, store):
+    """Awaits the result of an async do_transform method and passes it to store before returning it. Exceptions are
+    passed to store as well before being re-raised."""
+    try:
+        result = await collect_response(msg, response)
+    except Exception as e:
+        store(error=e)
+        raise
+    store(result=result)
+    return result
@@ -0,0 +1,113 @@
+from itertools import islice
+
+from six import string_types, get_unbound_function
+
+from canari.maltego.message import (MaltegoTransformResponseMessage, MaltegoTransformRequestMessage, MaltegoException,
+                                    UIMessage, UIMessageType, LimitReached)
+from canari.maltego.transform import Transform
+from canari.maltego.utils import to_response, new_response
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'is_batch_transform',
+    'iter_batches',
+    'split_request',
+    'execute_batch',
+    'run_batch',
+    'merge_responses'
+]
+
+
+def is_batch_transform(transform):
+    """Returns True if the transform class implements the do_transform_batch hook."""
+    return get_unbound_function(transform.do_transform_batch) is not \
+        get_unbound_function(Transform.do_transform_batch)
+
+
+def iter_batches(items, batch_size):
+    """Yields lists of at most batch_size items from the iterable items."""
+    items = iter(items)
+    batch_size = max(batch_size or 1, 1)
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def split_request(request):
+    """Returns a single entity request message for each of the input entities in request. The transform fields and
+    limits of request are shared by all of them."""
+    requests = []
+    for entity in request.entities:
+        r = MaltegoTransformRequestMessage()
+        r._parameters = request._parameters
+        r.limits = request.limits
+        r._entities = [entity]
+        requests.append(r)
+    return requests
+
+
+def _to_result(result):
+    if isinstance(result, (MaltegoTransformResponseMessage, MaltegoException)):
+        return result
+    elif isinstance(result, string_types):
+        return MaltegoException(result)
+    return MaltegoException('Could not resolve message type returned by transform.')
+
+
+def execute_batch(transform, requests, responses, config):
+    """
+    Internal API: Calls the do_transform_batch method of the transform object once for requests and returns a list with
+    a result for each request in the same order. Each result is either a MaltegoTransformResponseMessage or the
+    MaltegoException describing why that particular input failed. Exceptions raised by do_transform_batch itself are
+    propagated to the caller since they apply to the whole batch. If one of the responses reaches its hard limit, the
+    batch is stopped and the responses are returned as they are.
+    """
+    try:
+        results = to_response(transform.do_transform_batch(requests, responses, config), responses)
+    except LimitReached:
+        results = responses
+    if results is None:
+        results = responses
+    elif isinstance(results, string_types):
+        raise MaltegoException(results)
+    results = list(results)
+    if len(results) != len(requests):
+        raise MaltegoException('Transform returned %d results for %d inputs.' % (len(results), len(requests)))
+    return [_to_result(r) for r in results]
+
+
+def run_batch(transform, requests, config, batch_size=None):
+    """
+    Internal API: Runs the do_transform_batch method of the transform object over requests, at most batch_size
+    (defaults to the transform's batch_size) requests at a time. Returns a list of results as described in
+    execute_batch().
+    """
+    results = []
+    for batch in iter_batches(requests, batch_size or transform.batch_size):
+        results.extend(execute_batch(transform, batch, [new_response(transform, r) for r in batch], config))
+    return results
+
+
+def merge_responses(results, response=None):
+    """Merges the results returned by run_batch() into a single response message. Inputs that failed are reported as
+    partial errors so that the results of the other inputs still make it back to Maltego."""
+    if response is None:
+        response = MaltegoTransformResponseMessage()
+    for r in results:
+        if isinstance(r, MaltegoException):
+            response += UIMessage(str(r), type=UIMessageType.Partial)
+        else:
+            response.entities.extend(r.entities)
+            response.messages.extend(r.messages)
+    return response
@@ -0,0 +1,276 @@
+"""
+A client for Canari transform servers (i.e. Plume) that keeps connections alive between requests. Connections are
+pooled per host and TLS sessions are resumed when new connections have to be made, so scripts that drive a transform
+server don't pay for a TCP and TLS handshake on every request. Many requests can be run concurrently using
+RemoteTransformClient.map():
+
+    with RemoteTransformClient('localhost:8080', codec='json') as client:
+        for index, result in client.map(('mypkg.DNSToIP', [Domain(d)]) for d in domains):
+            ...
+"""
+import re
+import socket
+import ssl
+import sys
+import threading
+from collections import deque
+
+from six import string_types
+from six.moves import http_client
+
+from canari import tracing
+from canari.maltego.codec import get_codec, codec_for_content_type
+from canari.maltego.message import (MaltegoTransformRequestMessage, MaltegoTransformExceptionMessage, MaltegoException,
+                                    Limits)
+from canari.mode import is_debug_exec_mode
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'ConnectionPool',
+    'RemoteResponse',
+    'RemoteTransformClient'
+]
+
+
+class _HTTPSConnection(http_client.HTTPSConnection):
+    # The TLS session of a previous connection to the same host. Resuming it saves a full handshake. Once the
+    # connection is closed, this is the connection's own session.
+    session = None
+
+    def connect(self):
+        if self.session is None:
+            return http_client.HTTPSConnection.connect(self)
+        http_client.HTTPConnection.connect(self)
+        self.sock = self._context.wrap_socket(self.sock, server_hostname=self._tunnel_host or self.host,
+                                              session=self.session)
+
+    def close(self):
+        self.session = getattr(self.sock, 'session', None) or self.session
+        http_client.HTTPSConnection.close(self)
+
+
+class ConnectionPool(object):
+    """Keeps up to maxsize idle keep-alive connections to host around for reuse. Connections are created on demand so
+    more than maxsize connections can be in use at once; the extra ones are closed once they're released. HTTPS
+    connections share ssl_context (defaults to the default SSL context) and resume the TLS session of the last
+    connection that was released."""
+
+    def __init__(self, host, is_ssl=False, maxsize=4, timeout=None, ssl_context=None):
+        self.host = host
+        self.is_ssl = is_ssl
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.ssl_context = ssl_context or (ssl.create_default_context() if is_ssl else None)
+        self.tls_session = None
+        self.created = 0
+        self.reused = 0
+        self._idle = []
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        kwargs = {} if self.timeout is None else {'timeout': self.timeout}
+        if not self.is_ssl:
+            return http_client.HTTPConnection(self.host, **kwargs)
+        c = _HTTPSConnection(self.host, context=self.ssl_context, **kwargs)
+        c.session = self.tls_session
+        return c
+
+    def acquire(self):
+        """Returns a (connection, reused) tuple. reused is True if the connection was idle in the pool."""
+        with self._lock:
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop(), True
+            self.created += 1
+        return self._connect(), False
+
+    def release(self, connection, reusable=True):
+        """Returns a connection to the pool or closes it if it can't be reused or the pool is full."""
+        if self.is_ssl:
+            self.tls_session = getattr(connection.sock, 'session', None) or connection.session or self.tls_session
+        with self._lock:
+            if reusable and not self._closed and connection.sock is not None and len(self._idle) < self.maxsize:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        """Closes all the idle connections. Connections that are released afterwards are closed as well."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for c in idle:
+            c.close()
+
+
+class RemoteResponse(object):
+    """The HTTP response of a transform server. data is the raw response body and codec is the codec matching its
+    content type (the request's codec if the content type is unknown)."""
+
+    def __init__(self, status, reason, content_type, data, codec):
+        self.status = status
+        self.reason = reason
+        self.content_type = content_type
+        self.data = data
+        self.codec = codec
+
+    def message(self):
+        """Decodes the response body. Returns a MaltegoTransformResponseMessage or
+        MaltegoTransformExceptionMessage."""
+        with tracing.span('parse', codec=self.codec.name):
+            return self.codec.loads(self.data)
+
+
+class RemoteTransformClient(object):
+    """Sends transform requests to the Canari transform server at host over pooled keep-alive connections.
+
+    :param host: the server's host name and optional port (i.e. 'localhost:8080').
+    :param base_path: the path the transforms are mounted under.
+    :param is_ssl: whether or not to use HTTPS.
+    :param codec: the name of the codec (or the Codec object) used to encode requests (see canari.maltego.codec).
+    :param max_connections: the maximum number of idle connections kept alive and the default number of requests
+                            run concurrently by map().
+    :param timeout: the socket timeout in seconds.
+    :param ssl_context: the SSL context used for HTTPS connections.
+    """
+
+    def __init__(self, host, base_path='/', is_ssl=False, codec='xml', max_connections=4, timeout=None,
+                 ssl_context=None):
+        self.base_path = base_path
+        self.codec = get_codec(codec) if isinstance(codec, string_types) else codec
+        self.pool = ConnectionPool(host, is_ssl, max_connections, timeout, ssl_context)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.pool.close()
+
+    def path(self, transform):
+        return re.sub(r'/+', '/', '/'.join([self.base_path, transform]))
+
+    def _request(self, entities, parameters, limits):
+        m = MaltegoTransformRequestMessage()
+        for e in entities:
+            m += e
+        for p in parameters:
+            m += p
+        m += limits or Limits()
+        return m
+
+    def send(self, transform, entities, parameters=(), limits=None):
+        """Sends a transform request for entities and returns the server's RemoteResponse. Requests that fail because
+        the server closed an idle connection are retried on a new connection."""
+        with tracing.span('render', codec=self.codec.name):
+            data = self.codec.dumps(self._request(entities, parameters, limits))
+        return self.send_raw(transform, data)
+
+    def send_raw(self, transform, data):
+        """Same as send() but sends a request message that is already encoded using the client's codec. The current
+        trace ID (or a new one) is sent along in the X-Canari-Trace-Id header."""
+        path = self.path(transform)
+        headers = {
+            'Content-Type': self.codec.content_type,
+            'Accept': self.codec.content_type,
+            tracing.TRACE_HEADER: tracing.current_trace_id() or tracing.new_trace_id()
+        }
+
+        if is_debug_exec_mode():
+            sys.stderr.write("Sending following message to {}{}:\n{}\n\n".format(
+                self.pool.host, path, repr(data) if self.codec.binary else data.decode('utf-8')))
+
+        with tracing.span('remote_transform', host=self.pool.host, path=path) as s:
+            r, body = self._post(path, data, headers)
+            s.set(status=r.status, size=len(body))
+        content_type = r.getheader('Content-Type')
+        return RemoteResponse(r.status, r.reason, content_type, body, codec_for_content_type(content_type, self.codec))
+
+    def _post(self, path, data, headers):
+        while True:
+            c, reused = self.pool.acquire()
+            try:
+                c.request('POST', path, data, headers=headers)
+                r = c.getresponse()
+                body = r.read()
+            except socket.timeout:
+                c.close()
+                raise
+            except (http_client.BadStatusLine, socket.error):
+                c.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                c.close()
+                raise
+            self.pool.release(c, not r.will_close)
+            return r, body
+
+    def run(self, transform, entities, parameters=(), limits=None):
+        """Same as send() but returns the decoded MaltegoTransformResponseMessage. Raises a MaltegoException if the
+        server didn't respond with a response message."""
+        r = self.send(transform, entities, parameters, limits)
+        if r.status != 200:
+            raise MaltegoException('Received status %d (%s) for %s.' % (r.status, r.reason, self.path(transform)))
+        msg = r.message()
+        if isinstance(msg, MaltegoTransformExceptionMessage):
+            raise MaltegoException('; '.join(str(e) for e in msg.exceptions))
+        return msg
+
+    def map(self, requests, parameters=(), limits=None, window=None, ordered=True):
+        """Runs the (transform, entities) pairs in requests concurrently with at most window (defaults to
+        max_connections) requests in flight. requests can be any iterable and is consumed as requests complete.
+        Yields an (index, result) tuple for each request, where result is either the MaltegoTransformResponseMessage
+        returned by run() or the exception it raised. Results are yielded in the order of requests unless ordered is
+        False."""
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+        window = window or self.pool.maxsize
+
+        # Requests sent from the worker threads belong to the caller's trace
+        @tracing.bind
+        def call(index, transform, entities):
+            try:
+                return index, self.run(transform, entities, parameters, limits)
+            except Exception as e:
+                return index, e
+
+        executor = ThreadPoolExecutor(window)
+        pending = deque() if ordered else set()
+        try:
+            for index, (transform, entities) in enumerate(requests):
+                future = executor.submit(call, index, transform, entities)
+                if ordered:
+                    pending.append(future)
+                    if len(pending) >= window:
+                        yield pending.popleft().result()
+                else:
+                    pending.add(future)
+                    if len(pending) >= window:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for f in done:
+                            yield f.result()
+            while pending:
+                if ordered:
+                    yield pending.popleft().result()
+                else:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for f in done:
+                        yield f.result()
+        finally:
+            for f in pending:
+                f.cancel()
+            executor.shutdown(wait=True)
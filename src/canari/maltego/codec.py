@@ -0,0 +1,346 @@
+"""
+Wire codecs for Maltego messages. Besides the XML format spoken by Maltego, transform request, response and exception
+messages can be exchanged as JSON or, if the msgpack package is installed, as MessagePack. Both map 1:1 to the XML
+schema: elements become objects keyed by tag name, attributes become keys named after the attribute and element text
+is stored under the 'Value' key. For example, a response message looks like this in JSON:
+
+    {"MaltegoMessage": {"MaltegoTransformResponseMessage": {
+        "Entities": [{"Type": "maltego.Phrase", "Value": "foo", "Weight": 1,
+                      "AdditionalFields": [{"Name": "bar", "DisplayName": "Bar", "MatchingRule": "strict",
+                                            "Value": "baz"}],
+                      "DisplayInformation": [{"Name": "label", "Type": "text/text", "Value": "text"}]}],
+        "UIMessages": [{"MessageType": "Inform", "Value": "Done."}]
+    }}}
+
+The codec used for a request is picked by its Content-Type header and the codec used for the response by the Accept
+header (see codec_for_content_type() and negotiate()).
+"""
+import json
+from collections import OrderedDict
+
+from safedexml import ParseError
+from six import binary_type, string_types, text_type
+
+from canari.maltego.message import (MaltegoMessage, MaltegoTransformRequestMessage, MaltegoTransformResponseMessage,
+                                    MaltegoTransformExceptionMessage, MaltegoException, Entity, EntityRecord,
+                                    FieldRecord, LabelRecord, UIMessage, UIMessageType, MatchingRule)
+from canari.maltego.parser import LazyMaltegoTransformRequestMessage
+from canari.maltego.renderer import render_message
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'Codec',
+    'XMLCodec',
+    'JSONCodec',
+    'MsgPackCodec',
+    'codecs',
+    'register_codec',
+    'get_codec',
+    'codec_for_content_type',
+    'negotiate',
+    'message_to_dict',
+    'message_from_dict'
+]
+
+
+def _text(value):
+    # Values are sent as text, just like they would be in XML
+    return value if value is None or isinstance(value, string_types) else text_type(value)
+
+
+def _field_to_dict(f):
+    d = {'Name': f.name, 'MatchingRule': f.matching_rule or MatchingRule.Strict, 'Value': _text(f.value)}
+    if f.display_name is not None:
+        d['DisplayName'] = f.display_name
+    return d
+
+
+def _entity_to_dict(e):
+    if isinstance(e, Entity):
+        e = e.__entity__
+    d = {'Type': e.type, 'Value': _text(e.value) if e.value is not None else '', 'Weight': e.weight}
+    if e.icon_url:
+        d['IconURL'] = e.icon_url
+    fields = e._fields if type(e) is EntityRecord else e.fields
+    if fields:
+        d['AdditionalFields'] = [_field_to_dict(f) for f in fields.values()]
+    labels = e._labels if type(e) is EntityRecord else e.labels
+    if labels:
+        d['DisplayInformation'] = [{'Name': l.name, 'Type': l.type, 'Value': _text(l.value)} for l in labels.values()]
+    return d
+
+
+def message_to_dict(msg):
+    """Returns the dictionary representation of a request, response or exception message that is used by the JSON and
+    MessagePack codecs."""
+    if isinstance(msg, MaltegoMessage):
+        msg = msg.message
+    if isinstance(msg, MaltegoTransformResponseMessage):
+        tag = 'MaltegoTransformResponseMessage'
+        body = {
+            'Entities': [_entity_to_dict(e) for e in msg.entities],
+            'UIMessages': [{'MessageType': m.type, 'Value': m.message} for m in msg.messages]
+        }
+    elif isinstance(msg, MaltegoTransformExceptionMessage):
+        exceptions = []
+        for e in msg.exceptions:
+            exception = {'Value': e.value}
+            if e.code is not None:
+                exception['code'] = e.code
+            exceptions.append(exception)
+        tag = 'MaltegoTransformExceptionMessage'
+        body = {'Exceptions': exceptions}
+    elif isinstance(msg, MaltegoTransformRequestMessage):
+        tag = 'MaltegoTransformRequestMessage'
+        body = {
+            'Entities': [_entity_to_dict(e) for e in msg.entities],
+            'TransformFields': [_field_to_dict(f) for f in msg._parameters.values()]
+        }
+        if msg.limits is not None:
+            body['Limits'] = {'SoftLimit': msg.limits.soft, 'HardLimit': msg.limits.hard}
+    else:
+        raise ValueError("Can't convert %r to a Maltego message dictionary" % type(msg).__name__)
+    return {'MaltegoMessage': {tag: body}}
+
+
+def _as_list(obj, name):
+    value = obj.get(name)
+    if value is None:
+        return []
+    elif not isinstance(value, list):
+        raise ParseError('Expected a list for %r.' % name)
+    return value
+
+
+def _field_record(f):
+    return f.get('Name'), f.get('DisplayName'), f.get('MatchingRule'), f.get('Value', '')
+
+
+def _entity_records(body):
+    entities = []
+    for e in _as_list(body, 'Entities'):
+        entities.append((
+            e.get('Type'),
+            e.get('Value') or '',
+            e.get('Weight'),
+            e.get('IconURL'),
+            [_field_record(f) for f in _as_list(e, 'AdditionalFields')],
+            [(l.get('Name'), l.get('Type'), l.get('Value', '')) for l in _as_list(e, 'DisplayInformation')]
+        ))
+    return entities
+
+
+def _request_from_dict(body):
+    limits = body.get('Limits')
+    return LazyMaltegoTransformRequestMessage(
+        entities=_entity_records(body),
+        parameters=[_field_record(f) for f in _as_list(body, 'TransformFields')],
+        limits=(limits.get('SoftLimit'), limits.get('HardLimit')) if limits else None
+    )
+
+
+def _response_from_dict(body):
+    response = MaltegoTransformResponseMessage()
+    for type_, value, weight, icon_url, fields, labels in _entity_records(body):
+        response += EntityRecord(
+            type=type_,
+            value=value,
+            weight=weight,
+            icon_url=icon_url,
+            fields=OrderedDict((f[0], FieldRecord(f[0], f[3], f[1], f[2] or MatchingRule.Strict)) for f in fields),
+            labels=OrderedDict((l[0], LabelRecord(*l)) for l in labels)
+        )
+    for m in _as_list(body, 'UIMessages'):
+        response += UIMessage(m.get('Value'), type=m.get('MessageType') or UIMessageType.Inform)
+    return response
+
+
+def _exception_from_dict(body):
+    exceptions = []
+    for e in _as_list(body, 'Exceptions'):
+        exception = MaltegoException(e.get('Value'))
+        exception.code = e.get('code')
+        exceptions.append(exception)
+    return MaltegoTransformExceptionMessage(exceptions=exceptions)
+
+
+_message_types = {
+    'MaltegoTransformRequestMessage': _request_from_dict,
+    'MaltegoTransformResponseMessage': _response_from_dict,
+    'MaltegoTransformExceptionMessage': _exception_from_dict
+}
+
+
+def message_from_dict(d):
+    """Returns the message represented by a dictionary returned by message_to_dict(). Request messages are returned as
+    LazyMaltegoTransformRequestMessage objects. Raises a ParseError if the dictionary isn't a valid Maltego message."""
+    msg = d.get('MaltegoMessage') if isinstance(d, dict) else None
+    if not isinstance(msg, dict) or len(msg) != 1:
+        raise ParseError('Expected a MaltegoMessage object with a single message.')
+    (tag, body), = msg.items()
+    if tag not in _message_types or not isinstance(body, dict):
+        raise ParseError('Unknown message type %r.' % tag)
+    try:
+        return _message_types[tag](body)
+    except (AttributeError, TypeError, ValueError) as e:
+        raise ParseError('Invalid %s: %s' % (tag, e))
+
+
+class Codec(object):
+    """Base class for wire codecs. content_type is sent with encoded messages and content_types lists all the media
+    types the codec accepts."""
+    name = None
+    content_type = None
+    content_types = ()
+    binary = False
+
+    def dumps(self, msg):
+        """Encodes a request, response or exception message. Returns a byte string."""
+        raise NotImplementedError
+
+    def loads(self, data):
+        """Decodes a request, response or exception message from a string or byte string. Raises a ParseError if the
+        message is malformed."""
+        raise NotImplementedError
+
+    def loads_request(self, data):
+        """Same as loads() but raises a ParseError unless data is a transform request message."""
+        msg = self.loads(data)
+        if not isinstance(msg, MaltegoTransformRequestMessage):
+            raise ParseError('Expected a MaltegoTransformRequestMessage.')
+        return msg
+
+
+class XMLCodec(Codec):
+    name = 'xml'
+    content_type = 'text/xml'
+    content_types = ('text/xml', 'application/xml')
+
+    def dumps(self, msg):
+        if isinstance(msg, MaltegoMessage):
+            msg = msg.message
+        return render_message(msg, encoding='utf-8')
+
+    def loads(self, data):
+        return MaltegoMessage.parse(data).message
+
+    def loads_request(self, data):
+        return LazyMaltegoTransformRequestMessage.iterparse(data)
+
+
+class JSONCodec(Codec):
+    name = 'json'
+    content_type = 'application/json'
+    content_types = ('application/json',)
+
+    def dumps(self, msg):
+        return json.dumps(message_to_dict(msg), separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data):
+        if isinstance(data, binary_type):
+            data = data.decode('utf-8')
+        try:
+            d = json.loads(data)
+        except ValueError as e:
+            raise ParseError('Invalid JSON message: %s' % e)
+        return message_from_dict(d)
+
+
+class MsgPackCodec(Codec):
+    """Requires the msgpack package."""
+    name = 'msgpack'
+    content_type = 'application/msgpack'
+    content_types = ('application/msgpack', 'application/x-msgpack')
+    binary = True
+
+    def dumps(self, msg):
+        return msgpack.packb(message_to_dict(msg), use_bin_type=True)
+
+    def loads(self, data):
+        try:
+            d = msgpack.unpackb(data, raw=False)
+        except Exception as e:
+            raise ParseError('Invalid MessagePack message: %s' % e)
+        return message_from_dict(d)
+
+
+# All the available codecs by name
+codecs = OrderedDict()
+
+_content_types = {}
+
+
+def register_codec(codec):
+    """Makes codec available by name and for content negotiation."""
+    codecs[codec.name] = codec
+    for content_type in codec.content_types:
+        _content_types[content_type] = codec
+    return codec
+
+
+register_codec(XMLCodec())
+register_codec(JSONCodec())
+if msgpack is not None:
+    register_codec(MsgPackCodec())
+
+
+def get_codec(name):
+    """Returns the codec registered under name. Raises a ValueError for unknown (or unavailable) codecs."""
+    try:
+        return codecs[name]
+    except KeyError:
+        if name == MsgPackCodec.name:
+            raise ValueError('The msgpack codec requires the msgpack package (i.e. pip install msgpack).')
+        raise ValueError('Unknown codec %r. Expected one of: %s.' % (name, ', '.join(codecs)))
+
+
+def _media_type(value):
+    return value.split(';', 1)[0].strip().lower()
+
+
+def codec_for_content_type(content_type, default=None):
+    """Returns the codec for the media type in a Content-Type header or default if there is no such codec."""
+    if not content_type:
+        return default
+    return _content_types.get(_media_type(content_type), default)
+
+
+def negotiate(accept, default=None):
+    """Returns the codec that best matches an Accept header. default is returned if the header is missing, only matches
+    wildcards or doesn't match any of the codecs."""
+    if not accept:
+        return default
+    ranges = []
+    for i, media_range in enumerate(accept.split(',')):
+        media_type = _media_type(media_range)
+        q = 1.0
+        for param in media_range.split(';')[1:]:
+            k, _, v = param.partition('=')
+            if k.strip() == 'q':
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            ranges.append((-q, i, media_type))
+    for _, _, media_type in sorted(ranges):
+        if media_type.endswith('/*'):
+            return default
+        codec = _content_types.get(media_type)
+        if codec is not None:
+            return codec
+    return default
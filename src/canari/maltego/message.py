@@ -9,8 +9,10 @@ from collections import Iterable, OrderedDict
 from datetime import datetime, date, timedelta
 from numbers import Number
 import re
+import sys
 
-from six import string_types
+from six import string_types, text_type
+from six.moves import intern
 
 from canari.maltego.oxml import MaltegoElement, fields as fields_
 
@@ -28,6 +30,7 @@ __status__ = 'Development'
 __all__ = [
     'CompressedEntityField',
     'MaltegoException',
+    'LimitReached',
     'MaltegoTransformExceptionMessage',
     'MaltegoTransformRequestMessage',
     'Label',
@@ -59,7 +62,10 @@ __all__ = [
     'LinkColor',
     'LinkLabel',
     'LinkStyle',
-    'EntityTypeFactory'
+    'EntityTypeFactory',
+    'EntityRecord',
+    'FieldRecord',
+    'LabelRecord'
 ]
 
 
@@ -78,6 +84,11 @@ class MaltegoException(MaltegoElement, Exception):
         return self.value
 
 
+class LimitReached(Exception):
+    """Raised when an entity is added to a response that enforces its limits and already holds as many entities as the
+    hard limit allows. The transform runners stop the transform and return the entities accumulated so far."""
+
+
 class MaltegoTransformExceptionMessage(MaltegoElement):
     """
     MaltegoTransformExceptionMessage is the root container for the MaltegoException element.
@@ -146,13 +157,197 @@ class _Entity(MaltegoElement):
     icon_url = fields_.String(tagname='IconURL', required=False)
 
     def __iadd__(self, other):
-        if isinstance(other, Field):
+        if isinstance(other, (Field, FieldRecord)):
             self.fields[other.name] = other
-        elif isinstance(other, Label):
+        elif isinstance(other, (Label, LabelRecord)):
             self.labels[other.name] = other
         return self
 
 
+# Python 3.7+ dicts preserve insertion order and are considerably smaller than OrderedDicts.
+_ordered_dict = dict if sys.version_info >= (3, 7) else OrderedDict
+
+# Field schemas (name, display name and matching rule tuples) are shared by all the field records that have the same
+# schema. Schemas are only cached up to a point so that transforms generating field names on the fly can't grow the
+# cache indefinitely.
+_field_schemas = {}
+_max_field_schemas = 4096
+
+
+def _intern(s):
+    return intern(s) if type(s) is str else s
+
+
+def field_schema(name, display_name=None, matching_rule=MatchingRule.Strict):
+    """Returns the shared (name, display name, matching rule) schema tuple used by field records. Strings are
+    interned."""
+    key = (name, display_name, matching_rule)
+    schema = _field_schemas.get(key)
+    if schema is None:
+        schema = (_intern(name), _intern(display_name), _intern(matching_rule))
+        if len(_field_schemas) < _max_field_schemas:
+            _field_schemas[key] = schema
+    return schema
+
+
+class FieldRecord(object):
+    """FieldRecord is a compact equivalent of the Field model used to store entity fields in memory. The name, display
+    name and matching rule are kept in a schema tuple that is shared with the other fields of the same kind (i.e. all
+    the fields set through the same entity field descriptor). Records are only converted to Field models if a message
+    is rendered by safedexml."""
+    __slots__ = ('_schema', 'value', '_decoded')
+
+    def __init__(self, name=None, value=None, display_name=None, matching_rule=MatchingRule.Strict, schema=None):
+        self._schema = schema or field_schema(name, display_name, matching_rule)
+        self.value = value
+        # The value decoded by a typed entity field descriptor (see StringEntityField)
+        self._decoded = None
+
+    @classmethod
+    def from_model(cls, field):
+        return cls(field.name, field.value, field.display_name, field.matching_rule)
+
+    @property
+    def name(self):
+        return self._schema[0]
+
+    @name.setter
+    def name(self, name):
+        if name != self._schema[0]:
+            self._schema = field_schema(name, self._schema[1], self._schema[2])
+
+    @property
+    def display_name(self):
+        return self._schema[1]
+
+    @display_name.setter
+    def display_name(self, display_name):
+        self._schema = field_schema(self._schema[0], display_name, self._schema[2])
+
+    @property
+    def matching_rule(self):
+        return self._schema[2]
+
+    @matching_rule.setter
+    def matching_rule(self, matching_rule):
+        self._schema = field_schema(self._schema[0], self._schema[1], matching_rule)
+
+    def to_model(self):
+        return Field(name=self.name, value=self.value, display_name=self.display_name,
+                     matching_rule=self.matching_rule)
+
+    def _render(self, nsmap):
+        return self.to_model()._render(nsmap)
+
+    def __getstate__(self):
+        # The decoded value cache is left out since it holds the entity field descriptor that filled it
+        return self._schema, self.value
+
+    def __setstate__(self, state):
+        schema, self.value = state
+        self._schema = field_schema(*schema)
+        self._decoded = None
+
+    def __repr__(self):
+        return 'FieldRecord(name=%r, value=%r)' % (self.name, self.value)
+
+
+class LabelRecord(object):
+    """LabelRecord is a compact equivalent of the Label model used to store entity labels in memory."""
+    __slots__ = ('name', 'value', 'type')
+
+    def __init__(self, name=None, value=None, type='text/text'):
+        self.name = _intern(name)
+        self.value = value or ''
+        self.type = _intern(type)
+
+    @classmethod
+    def from_model(cls, label):
+        return cls(label.name, label.value, label.type)
+
+    def to_model(self):
+        return Label(name=self.name, value=self.value, type=self.type)
+
+    def _render(self, nsmap):
+        return self.to_model()._render(nsmap)
+
+    def __repr__(self):
+        return 'LabelRecord(name=%r, value=%r)' % (self.name, self.value)
+
+
+def _to_record(obj):
+    if isinstance(obj, Field):
+        return FieldRecord.from_model(obj)
+    elif isinstance(obj, Label):
+        return LabelRecord.from_model(obj)
+    return obj
+
+
+class EntityRecord(object):
+    """EntityRecord is a compact equivalent of the _Entity model used by Entity objects created by transforms. Fields
+    and labels are stored as FieldRecord and LabelRecord objects in dictionaries that are only created once they're
+    needed. Records are duck-typed by canari.maltego.renderer and are only converted to _Entity models if a message is
+    rendered by safedexml."""
+    __slots__ = ('type', 'value', '_weight', 'icon_url', '_fields', '_labels')
+
+    def __init__(self, type=None, value=None, weight=None, icon_url=None, fields=None, labels=None):
+        self.type = _intern(type)
+        self.value = value
+        self._weight = weight
+        self.icon_url = icon_url
+        self._fields = None
+        self._labels = None
+        if fields:
+            self._fields = _ordered_dict((k, _to_record(v)) for k, v in fields.items())
+        if labels:
+            self._labels = _ordered_dict((k, _to_record(v)) for k, v in labels.items())
+
+    @property
+    def weight(self):
+        return 1 if self._weight is None else self._weight
+
+    @weight.setter
+    def weight(self, weight):
+        self._weight = weight
+
+    @property
+    def fields(self):
+        if self._fields is None:
+            self._fields = _ordered_dict()
+        return self._fields
+
+    @property
+    def labels(self):
+        if self._labels is None:
+            self._labels = _ordered_dict()
+        return self._labels
+
+    def __iadd__(self, other):
+        if isinstance(other, (Field, FieldRecord)):
+            self.fields[other.name] = _to_record(other)
+        elif isinstance(other, (Label, LabelRecord)):
+            self.labels[other.name] = _to_record(other)
+        return self
+
+    def to_model(self):
+        return _Entity(
+            type=self.type,
+            value=self.value,
+            weight=self._weight,
+            icon_url=self.icon_url,
+            fields=OrderedDict((k, v.to_model() if isinstance(v, FieldRecord) else v)
+                               for k, v in (self._fields or {}).items()),
+            labels=OrderedDict((k, v.to_model() if isinstance(v, LabelRecord) else v)
+                               for k, v in (self._labels or {}).items())
+        )
+
+    def _render(self, nsmap):
+        return self.to_model()._render(nsmap)
+
+    def __repr__(self):
+        return 'EntityRecord(type=%r, value=%r)' % (self.type, self.value)
+
+
 class UIMessageType:
     Fatal = "FatalError"
     Partial = "PartialError"
@@ -168,19 +363,110 @@ class UIMessage(MaltegoElement):
     message = fields_.String(tagname='.')
 
 
+def _same_value(a, b):
+    # Field values set through typed entity field descriptors aren't converted to text until they're rendered
+    return a == b or (a is not None and b is not None and text_type(a) == text_type(b))
+
+
+def _merge_entity(target, other):
+    """Merges the fields, labels and weight of other into target unless one of other's strict fields has a different
+    value in target, in which case Maltego would treat them as two distinct entities. Fields and labels that target
+    already has are left untouched. Returns True if the entities were merged."""
+    fields = (target._fields if type(target) is EntityRecord else target.fields) or {}
+    other_fields = (other._fields if type(other) is EntityRecord else other.fields) or {}
+    for name, f in other_fields.items():
+        if f.matching_rule != MatchingRule.Loose and name in fields and not _same_value(fields[name].value, f.value):
+            return False
+    for name, f in other_fields.items():
+        if name not in fields:
+            target += f
+    labels = (target._labels if type(target) is EntityRecord else target.labels) or {}
+    for name, l in ((other._labels if type(other) is EntityRecord else other.labels) or {}).items():
+        if name not in labels:
+            target += l
+    if (other.weight or 0) > (target.weight or 0):
+        target.weight = other.weight
+    if not target.icon_url and other.icon_url:
+        target.icon_url = other.icon_url
+    return True
+
+
 class MaltegoTransformResponseMessage(MaltegoElement):
     messages = fields_.List(UIMessage, tagname='UIMessages')
     entities = fields_.List(_Entity, tagname='Entities')
+    _index = None  # Entities by type and value if duplicate entities are merged (see deduplicate()).
+    limits = None  # The limits of the request being processed (see apply_limits()).
+    enforce_limits = False
+    _relayed = 0  # Entities that were streamed to the client and removed from the response (i.e. by Plume).
 
     def __iadd__(self, other):
         if isinstance(other, Entity):
-            self.entities.append(other.__entity__)
-        elif isinstance(other, _Entity):
-            self.entities.append(other)
+            self._add_entity(other.__entity__)
+        elif isinstance(other, (_Entity, EntityRecord)):
+            self._add_entity(other)
         elif isinstance(other, UIMessage):
             self.messages.append(other)
         return self
 
+    def _add_entity(self, entity):
+        candidates = None
+        if self._index is not None:
+            candidates = self._index.setdefault((entity.type, entity.value), [])
+            for c in candidates:
+                if c is entity or _merge_entity(c, entity):
+                    return
+        if self.limit_reached:
+            raise LimitReached('The response already holds the maximum of %d entities.' % self.limits.hard)
+        if candidates is not None:
+            candidates.append(entity)
+        self.entities.append(entity)
+
+    def apply_limits(self, limits, enforce=False):
+        """Makes the response aware of the limits of the request being processed so that transforms can stop producing
+        results once the client has enough of them (see remaining and is_full).
+
+        :param limits: the request's Limits or None if there are none.
+        :param enforce: if True, adding an entity past the hard limit raises LimitReached.
+        :return: the response object."""
+        self.limits = limits
+        self.enforce_limits = enforce
+        return self
+
+    @property
+    def remaining(self):
+        """The number of entities that can be added before the soft limit is reached or None if there are no
+        limits."""
+        if self.limits is None:
+            return None
+        return max(self.limits.soft - len(self.entities) - self._relayed, 0)
+
+    @property
+    def is_full(self):
+        """True if the response holds as many entities as the soft limit asks for."""
+        return self.remaining == 0
+
+    @property
+    def limit_reached(self):
+        """True if the hard limit is enforced and the response holds as many entities as it allows, in which case the
+        transform's results may have been cut short."""
+        return self.enforce_limits and self.limits is not None and \
+            len(self.entities) + self._relayed >= self.limits.hard
+
+    def deduplicate(self):
+        """Merges entities of the same type and value as they are added to the response (using +=) instead of sending
+        duplicates to Maltego. Fields and labels missing from the entity that was added first are copied over from the
+        duplicates and the highest weight is kept. Entities with conflicting strict fields (see MatchingRule) are kept
+        apart. Entities that are already in the response are deduplicated right away.
+
+        :return: the response object."""
+        if self._index is None:
+            entities = list(self.entities)
+            del self.entities[:]
+            self._index = {}
+            for e in entities:
+                self._add_entity(e)
+        return self
+
 
 class ValidationError(MaltegoException):
     pass
@@ -190,6 +476,10 @@ class StringEntityField(object):
 
     error_msg = ''
 
+    # Typed fields decode the raw field value whenever the property is read. If cached is True, the decoded value is
+    # kept on the field object and reused for as long as the field's raw value isn't replaced.
+    cached = False
+
     def __init__(self, name, **extras):
         self.name = name
         self.decorator = extras.pop('decorator', None)
@@ -198,40 +488,68 @@ class StringEntityField(object):
         self.matching_rule = extras.pop('matching_rule', MatchingRule.Strict)
         self.alias = extras.pop('alias', None)
         self.error_msg = extras.pop('error_msg', self.error_msg)
+        # Shared by all the fields set through this descriptor
+        self.schema = field_schema(self.name, self.display_name, self.matching_rule)
+        # Resolved once here rather than on every access
+        self._alias = self.alias if self.alias is not None and self.alias != self.name else None
+        self._decorator = self.decorator if callable(self.decorator) else None
+
+    def _find(self, obj):
+        """Returns the field object holding this property's value or None if the property isn't set."""
+        e = obj._entity
+        fields = e._fields if type(e) is EntityRecord else e.fields
+        if not fields:
+            return None
+        f = fields.get(self.name)
+        if f is None and self._alias is not None:
+            f = fields.get(self._alias)
+        return f
+
+    def decode(self, value):
+        """Returns the property value for the raw field value. Raises a ValidationError for invalid values."""
+        return value
+
+    def materialize(self, decoded):
+        """Returns the property value for a (possibly cached) decoded value. Mutable values should be copied here."""
+        return decoded
 
     def __get__(self, obj, objtype):
         if obj is None:
             return self
         if self.is_value:
-            return obj.value
-        elif self.name in obj.fields:
-            return obj.fields[self.name].value
-        elif self.alias in obj.fields:
-            return obj.fields[self.alias].value
-        return None
+            value = obj.value
+            return None if value is None else self.decode(value)
+        f = self._find(obj)
+        if f is None:
+            return None
+        value = f.value
+        if value is None:
+            return None
+        if not self.cached:
+            return self.decode(value)
+        cache = getattr(f, '_decoded', None)
+        if cache is None or cache[0] is not self or cache[1] is not value:
+            cache = f._decoded = (self, value, self.decode(value))
+        return self.materialize(cache[2])
 
     def __set__(self, obj, val):
         if self.is_value:
             obj.value = val
         elif not val:
-            if self.name in obj.fields:
-                del obj.fields[self.name]
-            elif self.alias in obj.fields:
-                del obj.fields[self.alias]
+            fields = obj.fields
+            if self.name in fields:
+                del fields[self.name]
+            elif self._alias in fields:
+                del fields[self._alias]
         else:
-            if self.name not in obj.fields and self.alias not in obj.fields:
-                obj.fields[self.name] = Field(
-                    name=self.name,
-                    value=val,
-                    display_name=self.display_name,
-                    matching_rule=self.matching_rule
-                )
-            elif self.name in obj.fields:
-                obj.fields[self.name].value = val
+            f = self._find(obj)
+            if f is None:
+                obj.fields[self.name] = FieldRecord(value=val, schema=self.schema)
             else:
-                obj.fields[self.alias].value = val
-        if callable(self.decorator):
-            self.decorator(obj, val)
+                # Replacing the raw value invalidates the cached decoded value
+                f.value = val
+        if self._decorator is not None:
+            self._decorator(obj, val)
 
     def get_error_msg(self, field, value, **extras):
         return self.error_msg.format(field=field, value=value, **extras)
@@ -241,26 +559,26 @@ class CompressedEntityField(StringEntityField):
 
     error_msg = 'The field value ({value!r}) set for field {field!r} is not a serializable object.'
 
+    # The decompressed payload is cached but deserialized on every read so that callers get their own copy.
+    cached = True
+
     def __init__(self, name, compression=gzip, serdes=json, **extras):
         super(CompressedEntityField, self).__init__(name, **extras)
         self.compression = compression
         self.serdes = serdes
 
-    def __get__(self, obj, objtype):
-        if obj is None:
-            return self
-        value = super(CompressedEntityField, self).__get__(obj, objtype)
+    def decode(self, value):
         try:
-            return self.serdes.loads(
-                self.compression.decompress(
-                    base64.decodebytes(
-                        bytes(value, 'utf8')
-                    )
-                )
-            ) if value is not None else None
+            return self.compression.decompress(base64.decodebytes(bytes(value, 'utf8')))
         except:
             raise ValidationError(self.get_error_msg(self.display_name or self.name, value))
 
+    def materialize(self, decoded):
+        try:
+            return self.serdes.loads(decoded)
+        except:
+            raise ValidationError(self.get_error_msg(self.display_name or self.name, decoded))
+
     def __set__(self, obj, value):
         if not isinstance(value, (dict, list)):
             raise ValidationError(self.get_error_msg(self.display_name or self.name, value))
@@ -282,21 +600,19 @@ class EnumEntityField(StringEntityField):
         if not choices:
             raise ValueError('You must specify a non-empty set of choices.')
         self.choices = [str(c) if not isinstance(c, string_types) else c for c in choices]
+        self._choices = frozenset(self.choices)
         super(EnumEntityField, self).__init__(name, **extras)
 
-    def __get__(self, obj, objtype):
-        if obj is None:
-            return self
-        c = super(EnumEntityField, self).__get__(obj, objtype)
-        if c is not None and not isinstance(c, string_types):
+    def decode(self, c):
+        if not isinstance(c, string_types):
             c = str(c)
-        if c and c not in self.choices:
+        if c and c not in self._choices:
             raise ValidationError(self.get_error_msg(self.display_name or self.name, c, expected=self.choices))
         return c
 
     def __set__(self, obj, val):
         val = str(val) if not isinstance(val, string_types) else val
-        if val not in self.choices:
+        if val not in self._choices:
             raise ValidationError(self.get_error_msg(self.display_name or self.name, val, expected=self.choices))
         super(EnumEntityField, self).__set__(obj, val)
 
@@ -305,12 +621,9 @@ class IntegerEntityField(StringEntityField):
 
     error_msg = 'The field value ({value!r}) set for field {field!r} is not an integer.'
 
-    def __get__(self, obj, objtype):
-        if obj is None:
-            return self
-        i = super(IntegerEntityField, self).__get__(obj, objtype)
+    def decode(self, i):
         try:
-            return int(i) if i is not None else None
+            return int(i)
         except ValueError:
             raise ValidationError(self.get_error_msg(self.display_name or self.name, i))
 
@@ -324,11 +637,8 @@ class BooleanEntityField(StringEntityField):
 
     error_msg = 'The field value ({value!r}) set for field {field!r} is not a boolean.'
 
-    def __get__(self, obj, objtype):
-        if obj is None:
-            return self
-        b = super(BooleanEntityField, self).__get__(obj, objtype)
-        return b.startswith('t') or b == '1' if b is not None else None
+    def decode(self, b):
+        return b.startswith('t') or b == '1'
 
     def __set__(self, obj, val):
         if not isinstance(val, bool):
@@ -340,12 +650,9 @@ class FloatEntityField(StringEntityField):
 
     error_msg = 'The field value ({value!r}) set for field {field!r} is not a float.'
 
-    def __get__(self, obj, objtype):
-        if obj is None:
-            return self
-        f = super(FloatEntityField, self).__get__(obj, objtype)
+    def decode(self, f):
         try:
-            return float(f) if f is not None else None
+            return float(f)
         except ValueError:
             raise ValidationError(self.get_error_msg(self.display_name or self.name, f))
 
@@ -359,12 +666,9 @@ class LongEntityField(StringEntityField):
 
     error_msg = 'The field value ({value!r}) set for field {field!r} is not a long integer.'
 
-    def __get__(self, obj, objtype):
-        if obj is None:
-            return self
-        l = super(LongEntityField, self).__get__(obj, objtype)
+    def decode(self, l):
         try:
-            return long(l) if l is not None else None
+            return long(l)
         except ValueError:
             raise ValidationError(self.get_error_msg(self.display_name or self.name, l))
 
@@ -379,12 +683,19 @@ class DateTimeEntityField(StringEntityField):
     error_msg = 'The field value ({value!r}) set for field {field!r} is not a valid date time. Date time fields must ' \
                 'have the following format: YYYY-MM-DD HH:MM:SS.MS.'
 
-    def __get__(self, obj, objtype):
-        if obj is None:
-            return self
-        d = super(DateTimeEntityField, self).__get__(obj, objtype)
+    cached = True
+
+    # Matches the canonical format written by __set__. Anything else is left to strptime.
+    matcher = re.compile(r'([0-9]{4})-([0-9]{2})-([0-9]{2}) ([0-9]{2}):([0-9]{2}):([0-9]{2})\.([0-9]{1,6})\Z')
+
+    def decode(self, d):
         try:
-            return datetime.strptime(d, '%Y-%m-%d %H:%M:%S.%f') if d is not None else None
+            m = self.matcher.match(d)
+            if m is None:
+                return datetime.strptime(d, '%Y-%m-%d %H:%M:%S.%f')
+            year, month, day, hour, minute, second, microsecond = m.groups()
+            return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                            int(microsecond.ljust(6, '0')))
         except ValueError:
             raise ValidationError(self.get_error_msg(self.display_name or self.name, d))
 
@@ -399,12 +710,18 @@ class DateEntityField(StringEntityField):
     error_msg = 'The field value ({value!r}) set for field {field!r} is not a valid date. Date fields must have the ' \
                 'following format: YYYY-MM-DD.'
 
-    def __get__(self, obj, objtype):
-        if obj is None:
-            return self
-        d = super(DateEntityField, self).__get__(obj, objtype)
+    cached = True
+
+    # Matches the canonical format written by __set__. Anything else is left to strptime.
+    matcher = re.compile(r'([0-9]{4})-([0-9]{2})-([0-9]{2})\Z')
+
+    def decode(self, d):
         try:
-            return datetime.strptime(d, '%Y-%m-%d').date() if d is not None else None
+            m = self.matcher.match(d)
+            if m is None:
+                return datetime.strptime(d, '%Y-%m-%d').date()
+            year, month, day = m.groups()
+            return date(int(year), int(month), int(day))
         except ValueError:
             raise ValidationError(self.get_error_msg(self.display_name or self.name, d))
 
@@ -440,12 +757,11 @@ class TimeSpanEntityField(StringEntityField):
     error_msg = 'The field value ({value!r}) set for field {field!r} is not a valid time span. Time spans must have ' \
                 'the following format: DDd HHhMMmSS.MSs.'
 
-    def __get__(self, obj, objtype):
-        if obj is None:
-            return self
-        d = super(TimeSpanEntityField, self).__get__(obj, objtype)
+    cached = True
+
+    def decode(self, d):
         try:
-            return TimeSpan.fromstring(d) if d is not None else None
+            return TimeSpan.fromstring(d)
         except ValueError:
             raise ValidationError(self.get_error_msg(self.display_name or self.name, d))
 
@@ -461,14 +777,13 @@ class RegexEntityField(StringEntityField):
 
     error_msg = 'The field value ({value!r}) set for field {field!r} does not match the regular expression /{pattern}/.'
 
+    cached = True
+
     def __init__(self, name, pattern='.*', **extras):
         super(RegexEntityField, self).__init__(name, **extras)
         self.matcher = re.compile(pattern)
 
-    def __get__(self, obj, objtype):
-        if obj is None:
-            return self
-        v = super(RegexEntityField, self).__get__(obj, objtype)
+    def decode(self, v):
         if v and not self.matcher.match(v):
             raise ValidationError(self.get_error_msg(self.display_name or self.name, v, pattern=self.matcher.pattern))
         return v
@@ -533,6 +848,8 @@ class ArrayEntityField(StringEntityField):
                         'as a type of {element_type!r} in field {field!r}.'
     error_msg_array = 'Could not parse input array {value!r} as array of {element_type!r} for field {field!r}.'
 
+    cached = True
+
     def __init__(self, name, element_type=ElementType.string, **extras):
         super(ArrayEntityField, self).__init__(name, **extras)
         self.element_type = element_type
@@ -545,16 +862,17 @@ class ArrayEntityField(StringEntityField):
                     element_type=self.element_type.__name__, element_pos=i))
             yield e.replace(',', '\\,') if self.element_type is ElementType.string else str(e)
 
-    def __get__(self, obj, objtype):
-        if obj is None:
-            return self
-        a = super(ArrayEntityField, self).__get__(obj, objtype)
+    def decode(self, a):
         try:
-            return [self.element_type(e) for e in self.splitter.split(a)] if a is not None else None
+            # Only arrays with escaped commas need the (much slower) look-behind split
+            return [self.element_type(e) for e in (self.splitter.split(a) if '\\' in a else a.split(','))]
         except ValueError:
             raise ValidationError(self.error_msg_array.format(
                 field=self.display_name or self.name, value=a, element_type=self.element_type.__name__))
 
+    def materialize(self, decoded):
+        return list(decoded)
+
     def __set__(self, obj, val):
         if not isinstance(val, Iterable):
             raise ValidationError(self.get_error_msg(self.display_name or self.name, val))
@@ -676,10 +994,10 @@ class Entity(with_metaclass(EntityTypeFactory, object)):
                                               LinkDirection.Bidirectional], matching_rule=MatchingRule.Loose)
 
     def __init__(self, value='', **kwargs):
-        if isinstance(value, _Entity):
+        if isinstance(value, (_Entity, EntityRecord)):
             self._entity = value
         else:
-            self._entity = _Entity(
+            self._entity = EntityRecord(
                 type=kwargs.pop('type', self._type_),
                 value=value,
                 weight=kwargs.pop('weight', None),
@@ -757,7 +1075,7 @@ class Entity(with_metaclass(EntityTypeFactory, object)):
 
     def __setitem__(self, key, value):
         if key not in self._entity.fields:
-            self._entity.fields[key] = Field(key, value)
+            self._entity.fields[key] = FieldRecord(key, value)
         else:
             self._entity.fields[key].value = value
 
@@ -783,7 +1101,7 @@ class MaltegoTransformRequestMessage(MaltegoElement):
     def __iadd__(self, other):
         if isinstance(other, Entity):
             self.__entities.append(other.__entity__)
-        elif isinstance(other, _Entity):
+        elif isinstance(other, (_Entity, EntityRecord)):
             self.__entities.append(other)
         elif isinstance(other, Field):
             self._parameters[other.name] = other
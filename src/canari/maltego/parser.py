@@ -0,0 +1,212 @@
+import re
+from collections import OrderedDict
+from io import BytesIO
+
+from defusedxml.ElementTree import iterparse
+from safedexml import ParseError
+from six import binary_type, text_type
+
+from canari.maltego.message import (MaltegoTransformRequestMessage, EntityTypeFactory, Entity, Unknown, _Entity, Field,
+                                    Label, Limits)
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'LazyMaltegoTransformRequestMessage'
+]
+
+_encoding_matcher = re.compile(r'<\?xml [^>]*encoding=["\']([a-zA-Z0-9.\-_]+)["\'][^>]*?>')
+
+
+def _to_source(xml):
+    if isinstance(xml, binary_type):
+        return BytesIO(xml)
+    elif isinstance(xml, text_type):
+        m = _encoding_matcher.match(xml)
+        return BytesIO(xml.encode(m.group(1) if m else 'utf-8'))
+    elif hasattr(xml, 'read'):
+        return xml
+    raise ValueError("Can't convert %r to a transform request message" % type(xml).__name__)
+
+
+def _to_field(record):
+    name, display_name, matching_rule, value = record
+    return Field(name=name, value=value, display_name=display_name, matching_rule=matching_rule)
+
+
+def _to_label(record):
+    name, type_, value = record
+    return Label(name=name, value=value, type=type_)
+
+
+class LazyMaltegoTransformRequestMessage(MaltegoTransformRequestMessage):
+    """
+    LazyMaltegoTransformRequestMessage is a drop-in replacement for MaltegoTransformRequestMessage objects that are
+    parsed by safedexml. The request is scanned once using an incremental parser and only plain tuples are kept around.
+    The _Entity, Field and Limits models are only created when they are accessed by the transform.
+    """
+
+    class meta:
+        tagname = 'MaltegoTransformRequestMessage'
+
+    def __init__(self, entities=None, parameters=None, limits=None, **kwargs):
+        super(LazyMaltegoTransformRequestMessage, self).__init__(**kwargs)
+        self._raw_entities = entities or []
+        self._raw_parameters = parameters or []
+        self._raw_limits = limits
+        self._first_entity = None
+
+    @classmethod
+    def iterparse(cls, xml):
+        """Parses a MaltegoMessage containing a MaltegoTransformRequestMessage.
+
+        :param xml: the XML document as a string, bytes or a readable file-like object.
+        :return: a LazyMaltegoTransformRequestMessage object.
+        """
+        entities = []
+        parameters = []
+        limits = None
+        entity = None
+        in_transform_fields = False
+        is_request = False
+        depth = 0
+
+        for event, element in iterparse(_to_source(xml), events=('start', 'end')):
+            tag = element.tag
+            if event == 'start':
+                depth += 1
+                if depth == 1 and tag != 'MaltegoMessage':
+                    raise ParseError("Class 'MaltegoMessage' got tag '%s' (expected 'MaltegoMessage')" % tag)
+                elif depth == 2 and tag == 'MaltegoTransformRequestMessage':
+                    is_request = True
+                elif tag == 'Entity':
+                    entity = [element.get('Type'), '', None, None, [], []]
+                elif tag == 'TransformFields':
+                    in_transform_fields = True
+                continue
+
+            depth -= 1
+            if tag == 'Field':
+                record = (element.get('Name'), element.get('DisplayName'), element.get('MatchingRule'),
+                          element.text or '')
+                if entity is not None:
+                    entity[4].append(record)
+                elif in_transform_fields:
+                    parameters.append(record)
+            elif entity is not None:
+                if tag == 'Value':
+                    entity[1] = element.text or ''
+                elif tag == 'Weight':
+                    entity[2] = int(element.text)
+                elif tag == 'IconURL':
+                    entity[3] = element.text or ''
+                elif tag == 'Label':
+                    entity[5].append((element.get('Name'), element.get('Type'), element.text or ''))
+                elif tag == 'Entity':
+                    entities.append(tuple(entity))
+                    entity = None
+                    element.clear()
+            elif tag == 'TransformFields':
+                in_transform_fields = False
+                element.clear()
+            elif tag == 'Limits':
+                limits = (element.get('SoftLimit'), element.get('HardLimit'))
+
+        if not is_request:
+            raise ParseError('Expected a MaltegoTransformRequestMessage.')
+
+        return cls(entities=entities, parameters=parameters, limits=limits)
+
+    def _materialize_entity(self, record):
+        type_, value, weight, icon_url, fields, labels = record
+        return _Entity(
+            type=type_,
+            value=value,
+            weight=weight,
+            icon_url=icon_url,
+            fields=OrderedDict((f[0], _to_field(f)) for f in fields),
+            labels=OrderedDict((l[0], _to_label(l)) for l in labels)
+        )
+
+    def _wrap_entity(self, e):
+        return (EntityTypeFactory.create(e.type) or Unknown)(e)
+
+    def _entity_models(self):
+        models = self.__dict__.get('_MaltegoTransformRequestMessage__entities')
+        if models is None:
+            models = [self._materialize_entity(r) for r in self._raw_entities[1:]]
+            if self._raw_entities:
+                if self._first_entity is None:
+                    self._first_entity = self._wrap_entity(self._materialize_entity(self._raw_entities[0]))
+                models.insert(0, self._first_entity.__entity__)
+            self.__dict__['_MaltegoTransformRequestMessage__entities'] = models
+        return models
+
+    @property
+    def entity(self):
+        if self._entities:
+            return self._entities[0]
+        if not self._raw_entities:
+            return Entity('')
+        if self._first_entity is None:
+            self._first_entity = self._wrap_entity(self._materialize_entity(self._raw_entities[0]))
+        return self._first_entity
+
+    @property
+    def entities(self):
+        if not self._entities:
+            models = self._entity_models()
+            self._entities = [self._first_entity] + [self._wrap_entity(e) for e in models[1:]] if models else []
+        return self._entities
+
+    @property
+    def _parameters(self):
+        parameters = self.__dict__.get('_parameters')
+        if parameters is None:
+            parameters = self.__dict__['_parameters'] = OrderedDict(
+                (p[0], _to_field(p)) for p in self._raw_parameters
+            )
+        return parameters
+
+    @_parameters.setter
+    def _parameters(self, value):
+        self.__dict__['_parameters'] = value
+
+    @property
+    def limits(self):
+        if 'limits' not in self.__dict__:
+            limits = None
+            if self._raw_limits is not None:
+                soft, hard = self._raw_limits
+                limits = Limits(
+                    soft=int(soft) if soft is not None else None,
+                    hard=int(hard) if hard is not None else None
+                )
+            self.__dict__['limits'] = limits
+        return self.__dict__['limits']
+
+    @limits.setter
+    def limits(self, value):
+        self.__dict__['limits'] = value
+
+    @property
+    def settings(self):
+        if '_parameters' in self.__dict__:
+            return super(LazyMaltegoTransformRequestMessage, self).settings
+        return {p[0]: p[3] for p in self._raw_parameters}
+
+    def __iadd__(self, other):
+        self._entity_models()
+        return super(LazyMaltegoTransformRequestMessage, self).__iadd__(other)
+
+    def _render(self, nsmap):
+        self._entity_models()
+        return super(LazyMaltegoTransformRequestMessage, self)._render(nsmap)
@@ -0,0 +1,329 @@
+from safedexml import RenderError
+from six import string_types, text_type
+
+from canari.maltego.message import (MaltegoMessage, MaltegoTransformResponseMessage, Field, Label, UIMessage, _Entity,
+                                    Entity, UIMessageType, MaltegoException, EntityRecord, FieldRecord, LabelRecord)
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'render_message',
+    'render_entity',
+    'render_entities',
+    'iter_render_message'
+]
+
+
+# Escape tables mirroring xml.sax.saxutils.escape and quoteattr, which is what safedexml uses under the hood.
+_text_entities = (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'))
+_attr_entities = _text_entities + (('\n', '&#10;'), ('\r', '&#13;'), ('\t', '&#9;'))
+_text_specials = frozenset(c for c, _ in _text_entities)
+_attr_specials = frozenset(c for c, _ in _attr_entities) | {'"', "'"}
+
+
+def _to_text(value):
+    return value if isinstance(value, string_types) else text_type(value)
+
+
+def _escape(value):
+    value = _to_text(value)
+    if _text_specials.isdisjoint(value):
+        return value
+    for c, e in _text_entities:
+        value = value.replace(c, e)
+    return value
+
+
+def _quoteattr(value):
+    value = _to_text(value)
+    if _attr_specials.isdisjoint(value):
+        return '"%s"' % value
+    for c, e in _attr_entities:
+        value = value.replace(c, e)
+    if '"' in value:
+        if "'" in value:
+            return '"%s"' % value.replace('"', '&quot;')
+        return "'%s'" % value
+    return '"%s"' % value
+
+
+def _render_field(f, write):
+    name = f.name
+    value = f.value
+    if name is None:
+        raise RenderError("Field 'name' is missing")
+    if value is None:
+        raise RenderError("Field 'value' is missing")
+    display_name = f.display_name
+    matching_rule = f.matching_rule
+    write('<Field Name=')
+    write(_quoteattr(name))
+    if display_name is not None:
+        write(' DisplayName=')
+        write(_quoteattr(display_name))
+    if matching_rule is not None:
+        write(' MatchingRule=')
+        write(_quoteattr(matching_rule))
+    write('>')
+    write(_escape(value))
+    write('</Field>')
+
+
+def _render_label(l, write):
+    name = l.name
+    value = l.value
+    type_ = l.type
+    if name is None:
+        raise RenderError("Field 'name' is missing")
+    if value is None:
+        raise RenderError("Field 'value' is missing")
+    write('<Label')
+    if type_ is not None:
+        write(' Type=')
+        write(_quoteattr(type_))
+    write(' Name=')
+    write(_quoteattr(name))
+    write('><![CDATA[')
+    write(_to_text(value).replace(']]>', ']]]]><![CDATA[>'))
+    write(']]></Label>')
+
+
+def _render_model(m, write):
+    for data in m._render({}):
+        write(data)
+
+
+def _render_entity(e, write):
+    if isinstance(e, Entity):
+        e = e.__entity__
+    # Entity records are duck-typed; we just avoid creating their field and label dictionaries if they're empty.
+    if type(e) is EntityRecord:
+        fields = e._fields
+        labels = e._labels
+    elif type(e) is _Entity:
+        fields = e.fields
+        labels = e.labels
+    else:
+        return _render_model(e, write)
+
+    type_ = e.type
+    value = e.value
+    if type_ is None:
+        raise RenderError("Field 'type' is missing")
+    if value is None:
+        raise RenderError("Field 'value' is missing")
+
+    write('<Entity Type=')
+    write(_quoteattr(type_))
+    write('>')
+
+    if fields:
+        write('<AdditionalFields>')
+        for f in fields.values():
+            if type(f) is FieldRecord or type(f) is Field:
+                _render_field(f, write)
+            else:
+                _render_model(f, write)
+        write('</AdditionalFields>')
+
+    if labels:
+        write('<DisplayInformation>')
+        for l in labels.values():
+            if type(l) is LabelRecord or type(l) is Label:
+                _render_label(l, write)
+            else:
+                _render_model(l, write)
+        write('</DisplayInformation>')
+
+    value = _escape(value)
+    if value:
+        write('<Value>')
+        write(value)
+        write('</Value>')
+    else:
+        write('<Value />')
+
+    write('<Weight>')
+    write(_escape(e.weight))
+    write('</Weight>')
+
+    icon_url = e.icon_url
+    if icon_url is not None:
+        icon_url = _escape(icon_url)
+        if icon_url:
+            write('<IconURL>')
+            write(icon_url)
+            write('</IconURL>')
+        else:
+            write('<IconURL />')
+
+    write('</Entity>')
+
+
+def _render_ui_message(m, write):
+    message = m.message
+    if message is None:
+        raise RenderError("Field 'message' is missing")
+    write('<UIMessage MessageType=')
+    write(_quoteattr(m.type))
+    write('>')
+    write(_escape(message))
+    write('</UIMessage>')
+
+
+def _render_response(msg, write):
+    write('<MaltegoTransformResponseMessage>')
+
+    messages = msg.messages
+    if messages:
+        write('<UIMessages>')
+        for m in messages:
+            if type(m) is UIMessage:
+                _render_ui_message(m, write)
+            else:
+                _render_model(m, write)
+        write('</UIMessages>')
+    else:
+        write('<UIMessages />')
+
+    entities = msg.entities
+    if entities:
+        write('<Entities>')
+        for e in entities:
+            _render_entity(e, write)
+        write('</Entities>')
+    else:
+        write('<Entities />')
+
+    write('</MaltegoTransformResponseMessage>')
+
+
+def render_entity(entity):
+    """Renders a single entity (either an Entity, EntityRecord or _Entity object) as an XML fragment string."""
+    data = []
+    _render_entity(entity, data.append)
+    return ''.join(data)
+
+
+def render_entities(entities):
+    """Renders an iterable of entities as a concatenated XML fragment string (without the enclosing Entities tag)."""
+    data = []
+    write = data.append
+    for e in entities:
+        _render_entity(e, write)
+    return ''.join(data)
+
+
+def render_message(msg, encoding=None, fragment=False):
+    """Renders a message wrapped in a MaltegoMessage element. The output is identical to that of
+    MaltegoMessage(message=msg).render(encoding=encoding, fragment=fragment). MaltegoTransformResponseMessage
+    objects are serialized directly without walking the safedexml field descriptors; all other messages are handed
+    off to safedexml.
+
+    :param msg: the message to render.
+    :param encoding: the output encoding. If specified a byte string is returned, otherwise a unicode string.
+    :param fragment: if True, the leading XML declaration is omitted.
+    """
+    if not isinstance(msg, MaltegoTransformResponseMessage):
+        return MaltegoMessage(message=msg).render(encoding=encoding, fragment=fragment)
+
+    data = []
+    write = data.append
+    if not fragment:
+        if encoding:
+            write('<?xml version="1.0" encoding="%s" ?>' % encoding)
+        else:
+            write('<?xml version="1.0" ?>')
+    write('<MaltegoMessage>')
+    _render_response(msg, write)
+    write('</MaltegoMessage>')
+
+    xml = ''.join(data)
+    if encoding:
+        return xml.encode(encoding)
+    return xml
+
+
+def iter_render_message(response, items, encoding=None, fragment=False, chunk_size=100, on_error=None):
+    """Generator that renders a MaltegoTransformResponseMessage incrementally while the transform is still producing
+    results. Entities are flushed in chunks of chunk_size entities. UIMessages are buffered and written after the
+    Entities element since they can be yielded at any time. Entities that are added directly to the response object
+    (i.e. response += entity) are flushed along with the yielded ones.
+
+    :param response: the MaltegoTransformResponseMessage that was passed to the transform.
+    :param items: an iterable (typically a generator) of Entity, EntityRecord, _Entity, or UIMessage objects.
+    :param encoding: the output encoding. If specified byte strings are yielded, otherwise unicode strings.
+    :param fragment: if True, the leading XML declaration is omitted.
+    :param chunk_size: the number of entities to render before flushing a chunk.
+    :param on_error: a callable that accepts the exception raised by items and returns the error message to report in a
+                     PartialError UIMessage. If not specified, the exception is propagated.
+    """
+    data = []
+    write = data.append
+    if not fragment:
+        if encoding:
+            write('<?xml version="1.0" encoding="%s" ?>' % encoding)
+        else:
+            write('<?xml version="1.0" ?>')
+    write('<MaltegoMessage><MaltegoTransformResponseMessage><Entities>')
+
+    entities = response.entities
+    messages = response.messages
+    pending = 0
+    mark = len(data)
+
+    try:
+        for item in items:
+            mark = len(data)
+            if isinstance(item, (Entity, EntityRecord, _Entity)):
+                _render_entity(item, write)
+                pending += 1
+            elif isinstance(item, UIMessage):
+                messages.append(item)
+            elif item is not response and item is not None:
+                raise MaltegoException('Could not resolve message type returned by transform.')
+            if entities:
+                for e in entities:
+                    _render_entity(e, write)
+                pending += len(entities)
+                del entities[:]
+            if pending >= chunk_size:
+                xml = ''.join(data)
+                del data[:]
+                pending = 0
+                yield xml.encode(encoding) if encoding else xml
+            mark = len(data)
+    except Exception as e:
+        if on_error is None:
+            raise
+        # Drop whatever was partially rendered for the offending item so that the document stays well-formed
+        del data[mark:]
+        messages.append(UIMessage(on_error(e), type=UIMessageType.Partial))
+
+    for e in entities:
+        _render_entity(e, write)
+    del entities[:]
+    write('</Entities>')
+
+    if messages:
+        write('<UIMessages>')
+        for m in messages:
+            if type(m) is UIMessage:
+                _render_ui_message(m, write)
+            else:
+                _render_model(m, write)
+        write('</UIMessages>')
+    else:
+        write('<UIMessages />')
+    write('</MaltegoTransformResponseMessage></MaltegoMessage>')
+
+    xml = ''.join(data)
+    yield xml.encode(encoding) if encoding else xml
@@ -12,12 +12,14 @@ from safedexml import Model
 from six import string_types
 from six.moves import http_client
 
+from canari import tracing
 from canari.config import load_config
 from canari.maltego.message import (MaltegoTransformResponseMessage, UIMessage, MaltegoTransformRequestMessage, Field,
-                                    MaltegoException, EntityTypeFactory, Entity, MaltegoMessage, Limits)
-from canari.maltego.utils import message, on_terminate, to_entity, croak
+                                    MaltegoException, EntityTypeFactory, Entity, Limits)
+from canari.maltego.batch import is_batch_transform, run_batch
+from canari.maltego.codec import get_codec
+from canari.maltego.utils import message, on_terminate, to_entity, croak, to_response, new_response, call_transform
 from canari.mode import is_debug_exec_mode
-from canari.pkgutils.transform import TransformDistribution
 from canari.utils.common import find_pysudo
 
 __author__ = 'Nadeem Douba'
@@ -35,6 +37,8 @@ __all__ = [
     'local_transform_runner',
     'remote_canari_transform_runner',
     'scriptable_transform_runner',
+    'scriptable_batch_transform_runner',
+    'batch_transform_runner',
     'console_writer'
 ]
 
@@ -52,14 +56,40 @@ def load_object(classpath):
     module = import_module(package)
     if cls in module.__dict__:
         return module.__dict__[cls]
+
+    # Try the transform index written by create-profile/load-plume-package before importing the whole package
+    from canari.pkgutils.index import find_transform
+    t = find_transform(classpath, package, [os.getcwd(), os.path.join(os.path.expanduser('~'), '.canari')])
+    if t is not None:
+        return t
+
+    from canari.pkgutils.transform import TransformDistribution
     for t in TransformDistribution(package).transforms:
         if t.name == classpath:
             return t
     raise MaltegoException("Transform {!r} not found".format(classpath))
 
 
-def remote_canari_transform_runner(host, base_path, transform, entities, parameters, limits, is_ssl=False):
+def _local_request(transform, value, fields, params):
+    request = MaltegoTransformRequestMessage(
+        parameters={'canari.local.arguments': Field(name='canari.local.arguments', value=params)}
+    )
+
+    request._entities = [to_entity(transform.input_type, value, fields)]
+    request.limits = Limits(soft=10000)
+    return request
+
+
+def remote_canari_transform_runner(host, base_path, transform, entities, parameters, limits, is_ssl=False,
+                                   codec='xml'):
+    """
+    Internal API: Sends a transform request to a Canari transform server and returns the HTTP response. The request is
+    encoded using codec (the name of a codec or a Codec object; see canari.maltego.codec) and the server is asked to
+    respond in kind.
+    """
     c = http_client.HTTPSConnection(host) if is_ssl else http_client.HTTPConnection(host)
+    if isinstance(codec, string_types):
+        codec = get_codec(codec)
 
     m = MaltegoTransformRequestMessage()
 
@@ -71,15 +101,25 @@ def remote_canari_transform_runner(host, base_path, transform, entities, paramet
 
     m += limits
 
-    msg = MaltegoMessage(message=m).render(encoding='utf-8')
+    with tracing.span('render', codec=codec.name):
+        msg = codec.dumps(m)
     path = re.sub(r'/+', '/', '/'.join([base_path, transform]))
 
     if is_debug_exec_mode():
-        sys.stderr.write("Sending following message to {}{}:\n{}\n\n".format(host, path, msg))
-
-    c.request('POST', path, msg, headers={'Content-Type': 'application/xml'})
-
-    return c.getresponse()
+        sys.stderr.write("Sending following message to {}{}:\n{}\n\n".format(
+            host, path, repr(msg) if codec.binary else msg.decode('utf-8')))
+
+    # The trace ID is passed on to the transform server so that its spans can be tied to ours
+    headers = {
+        'Content-Type': codec.content_type,
+        'Accept': codec.content_type,
+        tracing.TRACE_HEADER: tracing.current_trace_id() or tracing.new_trace_id()
+    }
+    with tracing.span('remote_transform', host=host, path=path) as s:
+        c.request('POST', path, msg, headers=headers)
+        r = c.getresponse()
+        s.set(status=r.status)
+    return r
 
 
 def local_transform_runner(transform_py_name, value, fields, params, config, message_writer=message):
@@ -103,7 +143,8 @@ def local_transform_runner(transform_py_name, value, fields, params, config, mes
 
     transform = None
     try:
-        transform = load_object(transform_py_name)()
+        with tracing.span('instantiate', transform=transform_py_name):
+            transform = load_object(transform_py_name)()
 
         if os.name == 'posix' and transform.superuser and os.geteuid():
             rc = sudo(sys.argv)
@@ -117,20 +158,16 @@ def local_transform_runner(transform_py_name, value, fields, params, config, mes
 
         on_terminate(transform.on_terminate)
 
-        request = MaltegoTransformRequestMessage(
-            parameters={'canari.local.arguments': Field(name='canari.local.arguments', value=params)}
-        )
-
-        request._entities = [to_entity(transform.input_type, value, fields)]
-        request.limits = Limits(soft=10000)
+        with tracing.span('parse'):
+            request = _local_request(transform, value, fields, params)
 
-        msg = transform.do_transform(
-            request,
-            MaltegoTransformResponseMessage(),
-            config
-        )
+        with tracing.span('do_transform', transform=transform.name):
+            response = new_response(transform, request)
+            msg = to_response(call_transform(transform, request, response, config), response)
         if isinstance(msg, MaltegoTransformResponseMessage):
-            message_writer(msg)
+            # Message writers usually exit once the message is written
+            with tracing.span('render'):
+                message_writer(msg)
         elif isinstance(msg, string_types):
             raise MaltegoException(msg)
         else:
@@ -186,18 +223,15 @@ def scriptable_transform_runner(transform_, value, fields, params_, config_):
 
         Entity.run_transform = run_transform
 
-    request = MaltegoTransformRequestMessage(
-        parameters={'canari.local.arguments': Field(name='canari.local.arguments', value=params_)}
-    )
+    with tracing.span('parse'):
+        request = _local_request(transform_, value, fields, params_)
 
-    request._entities = [to_entity(transform_.input_type, value, fields)]
-    request.limits = Limits(soft=10000)
+    with tracing.span('instantiate', transform=transform_.name):
+        transform = transform_()
 
-    msg = transform_().do_transform(
-        request,
-        MaltegoTransformResponseMessage(),
-        config_
-    )
+    with tracing.span('do_transform', transform=transform_.name):
+        response = new_response(transform_, request)
+        msg = to_response(call_transform(transform, request, response, config_), response)
     if isinstance(msg, MaltegoTransformResponseMessage):
         return Response(msg)
     elif isinstance(msg, string_types):
@@ -206,6 +240,52 @@ def scriptable_transform_runner(transform_, value, fields, params_, config_):
         raise MaltegoException('Could not resolve message type returned by transform.')
 
 
+def batch_transform_runner(transform, inputs, params, config, batch_size=None):
+    """
+    Internal API: Executes a transform class in-process for each of the (value, fields) tuples in inputs and returns a
+    list with a result for each input in the same order. Transforms that implement do_transform_batch are called once
+    for every batch_size inputs (defaults to the transform's batch_size). Results are either
+    MaltegoTransformResponseMessage objects or, for inputs that a batch transform reported as failed,
+    MaltegoException objects. Any other error is raised to the caller. Unlike the local transform runner, privileged
+    transforms are never elevated using sudo.
+
+    This helper function is only used by the batch-transform command and the scriptable API.
+    """
+    if os.name == 'posix' and transform.superuser and os.geteuid():
+        raise MaltegoException('Transform %r requires root privileges.' % transform.name)
+
+    requests = [_local_request(transform, value, fields, params) for value, fields in inputs]
+
+    if is_batch_transform(transform):
+        return run_batch(transform(), requests, config, batch_size)
+
+    results = []
+    for request in requests:
+        response = new_response(transform, request)
+        msg = to_response(call_transform(transform(), request, response, config), response)
+        if isinstance(msg, MaltegoTransformResponseMessage):
+            results.append(msg)
+        elif isinstance(msg, string_types):
+            raise MaltegoException(msg)
+        else:
+            raise MaltegoException('Could not resolve message type returned by transform.')
+    return results
+
+
+def scriptable_batch_transform_runner(transform, inputs, params, config):
+    """
+    Internal API: Same as scriptable_transform_runner() but for many (value, fields) inputs at once. Transforms that
+    implement do_transform_batch receive the inputs in batches. Returns a list of Response objects in the same order as
+    inputs. The first failed input raises a MaltegoException.
+    """
+    results = []
+    for r in batch_transform_runner(transform, inputs, params, config):
+        if isinstance(r, MaltegoException):
+            raise r
+        results.append(Response(r))
+    return results
+
+
 def console_writer(msg, tab=-1):
     """
     Internal API: Returns a prettified tree-based output of an XML message for debugging purposes. This helper function
@@ -4,7 +4,7 @@ import sys
 from canari.framework import classproperty
 from canari.maltego.configuration import AuthenticationType
 from canari.maltego.entities import Unknown
-from canari.maltego.message import ValidationError, ElementType
+from canari.maltego.message import ValidationError, ElementType, MaltegoException
 
 __author__ = 'Nadeem Douba'
 __copyright__ = 'Copyright 2015, Canari Project'
@@ -133,6 +133,15 @@ class Transform(object):
 
     transform_settings = {}
 
+    # Specifies whether or not adding entities to the response past the request's hard limit stops the transform. The
+    # entities accumulated up to that point are returned to the client. Transforms can also check response.remaining
+    # or response.is_full to stop once the soft limit has been reached.
+    enforce_limits = False
+
+    # The maximum number of input entities passed to do_transform_batch at once. Only applicable to transforms that
+    # implement do_transform_batch.
+    batch_size = 100
+
     def do_transform(self, request, response, config):
         """
         This is the main entry point for the transform. Parameters and transform fields are passed via the config
@@ -156,9 +165,65 @@ class Transform(object):
                 for result in results:
                     response += WebSite(result)
                 return response
+
+        Alternatively, do_transform can be written as a generator that yields Entity and UIMessage objects. Remote
+        transforms written this way will have their results streamed back to Maltego as they are produced:
+
+        class GoogleTransform(MaltegoTransform):
+            # ...
+            def do_transform(self, request, response, config):
+                for result in google(request.value):
+                    yield WebSite(result)
+
+        On Python 3.6+, do_transform can also be a coroutine (or asynchronous generator) function. Async transforms
+        are run on an event loop; when served by the ASGI flavour of Plume (canari.tas.asgi) they share the server's
+        event loop so that many I/O-bound executions can be in flight at once:
+
+        class GoogleTransform(MaltegoTransform):
+            # ...
+            async def do_transform(self, request, response, config):
+                for result in await google(request.value):
+                    response += WebSite(result)
+                return response
+
+        Transforms that only implement do_transform_batch don't need to implement this method; the input entity is
+        passed to do_transform_batch as a batch of one instead.
         """
+        from canari.maltego.batch import is_batch_transform, execute_batch
+        if is_batch_transform(type(self)):
+            result = execute_batch(self, [request], [response], config)[0]
+            if isinstance(result, MaltegoException):
+                raise result
+            return result
         raise NotImplementedError("The 'do_transform' method needs to be implemented!")
 
+    def do_transform_batch(self, requests, responses, config):
+        """
+        This is an optional entry point for transforms that can process many input entities at once (i.e. by querying
+        an API's bulk endpoint). When a transform implements this method, the batch-transform command, the
+        scriptable API, and Plume (for requests carrying more than one input entity) group the input entities into
+        batches of at most batch_size entities and call this method once per batch instead of calling do_transform for
+        every entity.
+
+        :param requests: a list of MaltegoTransformRequest objects, each carrying a single input entity.
+        :param responses: a list of MaltegoTransformResponse objects, one for each request.
+        :param config: a CanariConfig object.
+        :return: The responses list should be returned (or None if the responses were populated in place). An item
+                 can be replaced by a MaltegoException or an error message if that particular input failed.
+
+        :Example:
+
+        class ThreatIntelTransform(MaltegoTransform):
+            # ...
+            def do_transform_batch(self, requests, responses, config):
+                reports = bulk_lookup([r.entity.value for r in requests])
+                for request, response in zip(requests, responses):
+                    for domain in reports.get(request.entity.value, []):
+                        response += Domain(domain)
+                return responses
+        """
+        raise NotImplementedError("The 'do_transform_batch' method is not implemented!")
+
     def get_setting(self, request, setting_name, default=None):
         request_settings = request.settings
 
@@ -4,7 +4,9 @@ import sys
 
 import click
 
-from canari.maltego.message import MaltegoMessage, MaltegoTransformExceptionMessage, MaltegoException, Field
+from canari.maltego.message import (MaltegoTransformExceptionMessage, MaltegoTransformResponseMessage, MaltegoException,
+                                    LimitReached)
+from canari.maltego.renderer import render_message
 
 __author__ = 'Nadeem Douba'
 __copyright__ = 'Copyright 2015, Canari Project'
@@ -21,6 +23,10 @@ __all__ = [
     'message',
     'croak',
     'to_entity',
+    'to_response',
+    'new_response',
+    'call_transform',
+    'is_awaitable_result',
     'get_transform_version',
     'debug',
     'progress'
@@ -40,9 +46,9 @@ def message(m, fd=sys.stdout):
 
     if sys.platform == 'win32':
         decoding = sys.stdout.encoding if sys.version_info[0] > 2 else 'cp1252'
-        click.echo(MaltegoMessage(message=m).render(fragment=True, encoding='utf-8').decode(decoding), file=fd)
+        click.echo(render_message(m, fragment=True, encoding='utf-8').decode(decoding), file=fd)
     else:
-        click.echo(MaltegoMessage(message=m).render(encoding='utf-8', fragment=True), file=fd)
+        click.echo(render_message(m, encoding='utf-8', fragment=True), file=fd)
     exit(0)
 
 
@@ -61,10 +67,58 @@ def to_entity(entity_type, value, fields):
     """
     e = entity_type(value)
     for k, v in fields.items():
-        e.fields[k] = Field(k, v)
+        e[k] = v
     return e
 
 
+def to_response(msg, response):
+    """
+    Internal API: Returns a MaltegoTransformResponseMessage for the value returned by a transform's do_transform method.
+    Transforms can either return the response object or be written as generators that yield Entity and UIMessage
+    objects. In the latter case, the yielded objects are collected into response. Coroutines and asynchronous
+    generators returned by async do_transform methods are run to completion on an event loop first. Anything else is
+    returned as is.
+    """
+    if inspect.isgenerator(msg):
+        try:
+            for item in msg:
+                if item is not None and item is not response:
+                    response += item
+        except LimitReached:
+            # The response is full so there's no point in letting the transform carry on
+            msg.close()
+        return response
+    elif is_awaitable_result(msg):
+        from canari.maltego.aio import run_until_complete
+        return to_response(run_until_complete(msg, response), response)
+    return msg
+
+
+def new_response(transform, request):
+    """
+    Internal API: Returns the MaltegoTransformResponseMessage passed to the transform's do_transform method for request.
+    The response is aware of the request's limits and enforces them if the transform's enforce_limits flag is set.
+    """
+    return MaltegoTransformResponseMessage().apply_limits(request.limits, transform.enforce_limits)
+
+
+def call_transform(transform, request, response, config):
+    """
+    Internal API: Calls the do_transform method of the transform object and returns its result. If the transform is
+    stopped because an entity was added to response past its hard limit, response is returned as is.
+    """
+    try:
+        return transform.do_transform(request, response, config)
+    except LimitReached:
+        return response
+
+
+def is_awaitable_result(msg):
+    """Internal API: Returns True if msg is a coroutine or asynchronous generator returned by an async do_transform
+    method."""
+    return sys.version_info >= (3, 6) and (inspect.iscoroutine(msg) or inspect.isasyncgen(msg))
+
+
 def get_transform_version(transform):
     """
     Internal API: Returns the version of the transform function based on the transform function's signature. Currently,
@@ -0,0 +1,157 @@
+from __future__ import print_function
+
+import importlib
+import json
+import os
+import sys
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'TransformIndex',
+    'index_path',
+    'find_transform'
+]
+
+
+def index_path(directory, package_name):
+    """Returns the path of the transform index file for package_name in directory."""
+    return os.path.join(directory, '%s.index.json' % package_name)
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _source_file(path):
+    if path and path.endswith(('.pyc', '.pyo')) and os.path.exists(path[:-1]):
+        return path[:-1]
+    return path
+
+
+class TransformIndex(object):
+    """
+    TransformIndex is a persisted summary of the transforms found in a Canari package. It maps each transform name
+    to the module and class implementing it, along with its input entity type, remote flag and transform settings.
+    The index records the modification times of the package's source files and directories so that it can be
+    discarded as soon as the package changes. Loading a transform from the index only imports the module that
+    defines it.
+    """
+
+    version = 1
+
+    def __init__(self, package, files=None, transforms=None):
+        self.package = package
+        self.files = files or {}
+        self.transforms = transforms or []
+        self._by_name = {t['name']: t for t in self.transforms}
+
+    @classmethod
+    def build(cls, distribution):
+        """Builds an index for a loaded TransformDistribution object."""
+        package = distribution.name
+        files = {}
+
+        for root, dirs, _ in os.walk(distribution.package_path):
+            dirs[:] = [d for d in dirs if d != '__pycache__']
+            files[root] = _mtime(root)
+
+        for name, module in list(sys.modules.items()):
+            if module is not None and (name == package or name.startswith(package + '.')):
+                path = _source_file(getattr(module, '__file__', None))
+                if path:
+                    files[os.path.abspath(path)] = _mtime(path)
+
+        transforms = []
+        for t in distribution.transforms:
+            transforms.append({
+                'name': t.name,
+                'module': t.__module__,
+                'class': t.__name__,
+                'input_type': t.input_type._type_,
+                'remote': bool(t.remote),
+                'settings': {
+                    k: {
+                        'display': s.display,
+                        'default_value': s.default_value,
+                        'optional': s.optional,
+                        'popup': s.popup
+                    } for k, s in t.transform_settings.items()
+                }
+            })
+
+        return cls(package, files, transforms)
+
+    @classmethod
+    def load(cls, path):
+        """Loads the index stored at path. Returns None if the index does not exist, cannot be read, or is stale."""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get('version') != cls.version:
+            return None
+        index = cls(data['package'], data['files'], data['transforms'])
+        return index if index.is_valid else None
+
+    def save(self, path):
+        data = {
+            'version': self.version,
+            'package': self.package,
+            'files': self.files,
+            'transforms': self.transforms
+        }
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        if os.name != 'posix' and os.path.exists(path):
+            os.remove(path)
+        os.rename(tmp, path)
+
+    @property
+    def is_valid(self):
+        for path, mtime in self.files.items():
+            if _mtime(path) != mtime:
+                return False
+        return True
+
+    @property
+    def remote_transforms(self):
+        return [t for t in self.transforms if t['remote']]
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def get(self, name):
+        return self._by_name.get(name)
+
+    def load_transform(self, name):
+        """Imports and returns the transform class registered under name."""
+        entry = self._by_name[name]
+        module = importlib.import_module(entry['module'])
+        return getattr(module, entry['class'])
+
+
+def find_transform(name, package_name, directories):
+    """Looks up transform name in the first valid index for package_name found in directories. Returns the transform
+    class or None if no valid index contains the transform."""
+    for directory in directories:
+        index = TransformIndex.load(index_path(directory, package_name))
+        if index is not None and name in index:
+            try:
+                return index.load_transform(name)
+            except (ImportError, AttributeError):
+                return None
+    return None
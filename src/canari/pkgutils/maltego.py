@@ -285,7 +285,7 @@ class MaltegoDistribution(object):
     def _get_module_author(self, module_name):
         return getattr(import_module(module_name), '__author__', '')
 
-    def add_transform(self, working_dir, transform_repository, transform, server=None):
+    def add_transform(self, working_dir, transform_repository, transform, server=None, dispatcher=None):
         transform_repository_dir = self.get_transform_repository_dir(transform_repository)
 
         py_name = '.'.join([transform.__module__, transform.__name__])
@@ -334,7 +334,7 @@ class MaltegoDistribution(object):
                   file=sys.stderr)
 
         transform_settings_def = TransformSettings(properties=[
-            CmdLineTransformPropertySetting(find_dispatcher()),
+            CmdLineTransformPropertySetting(dispatcher or find_dispatcher()),
             CmdParmTransformPropertySetting(py_name),
             CmdCwdTransformPropertySetting(working_dir),
             CmdDbgTransformPropertySetting(transform.debug)
@@ -7,18 +7,17 @@ import sys
 from pkgutil import iter_modules
 
 import click
-from mrbob.configurator import Configurator
 from six import string_types
-from pkg_resources import resource_listdir, resource_filename
 
 from canari.config import CanariConfigParser, OPTION_LOCAL_CONFIGS, SECTION_LOCAL, OPTION_REMOTE_PACKAGES, \
     SECTION_REMOTE, OPTION_REMOTE_CONFIGS
 from canari.maltego.message import EntityTypeFactory
 from canari.maltego.transform import Transform
-from canari.pkgutils.maltego import MaltegoDistribution, MtzDistribution
-from canari.project import CanariProject
 from canari.utils.fs import PushDir
 
+# NOTE: mrbob, pkg_resources, canari.pkgutils.maltego and canari.project are only needed to install and configure
+# transform packages. They are imported where they are used to keep transform execution startup times down.
+
 __author__ = 'Nadeem Douba'
 __copyright__ = 'Copyright 2012, Canari Project'
 __credits__ = []
@@ -97,11 +96,7 @@ class TransformDistribution(object):
             self._remote_transforms = [t for t in self._transforms if t.remote]
             self._entities = list({v for v in EntityTypeFactory.registry.values()
                                    if v.__module__.startswith(self._package_name)})
-            try:
-                self._machines = [
-                    m for m in resource_listdir(self.get_resource_module('maltego'), '') if m.endswith('.machine')]
-            except ImportError or ModuleNotFoundError:
-                self._machines = []
+            self._machines = None
             if not self.has_transforms:
                 raise ValueError('Error: no transforms found...')
         print('Package loaded.', file=sys.stderr)
@@ -159,14 +154,23 @@ class TransformDistribution(object):
 
     @property
     def machines(self):
+        if self._machines is None:
+            from pkg_resources import resource_listdir
+            try:
+                self._machines = [
+                    m for m in resource_listdir(self.get_resource_module('maltego'), '') if m.endswith('.machine')]
+            except ImportError or ModuleNotFoundError:
+                self._machines = []
         return self._machines
 
     @property
     def entities_file(self):
+        from pkg_resources import resource_filename
         return resource_filename(self.get_resource_module('maltego'), 'entities.mtz')
 
     @property
     def profile_file(self):
+        from pkg_resources import resource_filename
         return resource_filename(self.get_resource_module('maltego'), 'profile.mtz')
 
     @property
@@ -273,6 +277,9 @@ class TransformDistribution(object):
                 click.confirm('%s already exists. Would you like to overwrite it?' % dst, default=False))
 
     def configure(self, install_prefix, load=True, remote=False, defaults=False, **kwargs):
+        from mrbob.configurator import Configurator
+        from pkg_resources import resource_filename
+
         dst_canari_conf = os.path.join(install_prefix, 'canari.conf')
         if load and self._check_file_exists(dst_canari_conf, defaults):
             print('Writing fresh copy of canari.conf to %r...' % dst_canari_conf, file=sys.stderr)
@@ -295,6 +302,18 @@ class TransformDistribution(object):
                 package_config = resource_filename(self.get_resource_module('etc'), self.config_file)
                 self._write_config(package_config, dst_package_conf, defaults)
             self._update_config(dst_canari_conf, load, remote, **kwargs)
+            self._update_index(install_prefix, load)
+
+    def _update_index(self, install_prefix, load=True):
+        from canari.pkgutils.index import TransformIndex, index_path
+
+        path = index_path(install_prefix, self.name)
+        if load:
+            print('Writing transform index %r...' % path, file=sys.stderr)
+            TransformIndex.build(self).save(path)
+        elif os.path.lexists(path):
+            print('Removing transform index %r...' % path, file=sys.stderr)
+            os.remove(path)
 
     def _init_install_prefix(self, install_prefix):
         if not install_prefix:
@@ -303,7 +322,9 @@ class TransformDistribution(object):
             os.makedirs(install_prefix)
         return install_prefix
 
-    def install(self, install_prefix, distribution, configure=True, is_remote=False, in_project=False):
+    def install(self, install_prefix, distribution, configure=True, is_remote=False, in_project=False, dispatcher=None):
+        from canari.pkgutils.maltego import MaltegoDistribution, MtzDistribution
+
         if isinstance(distribution, string_types) or not distribution:
             distribution = MaltegoDistribution(distribution)
         if not isinstance(distribution, MtzDistribution):
@@ -313,20 +334,23 @@ class TransformDistribution(object):
 
         install_prefix = self._init_install_prefix(install_prefix)
 
-        self._install_transforms(install_prefix, distribution, in_project)
+        self._install_transforms(install_prefix, distribution, in_project, dispatcher)
         self._install_entities(distribution)
         self._install_machines(distribution)
 
         if configure:
             self.configure(install_prefix, remote=is_remote)
 
-    def _install_transforms(self, prefix, distribution, in_project=False):
+    def _install_transforms(self, prefix, distribution, in_project=False, dispatcher=None):
         if in_project:
+            from canari.project import CanariProject
             prefix = CanariProject().src_dir
         for transform in self.transforms:
-            distribution.add_transform(prefix, 'Local', transform, server='Local')
+            distribution.add_transform(prefix, 'Local', transform, server='Local', dispatcher=dispatcher)
 
     def _install_entities(self, distribution):
+        from canari.pkgutils.maltego import MtzDistribution
+
         try:
             src = self.entities_file
             if not os.path.lexists(src):
@@ -348,6 +372,8 @@ class TransformDistribution(object):
             pass
 
     def _install_machines(self, distribution):
+        from pkg_resources import resource_filename
+
         try:
             package = self.get_resource_module('maltego')
             for machine in self.machines:
@@ -357,6 +383,8 @@ class TransformDistribution(object):
             pass
 
     def uninstall(self, install_prefix, maltego_prefix=None):
+        from canari.pkgutils.maltego import MaltegoDistribution
+
         distribution = MaltegoDistribution(maltego_prefix)
         if distribution.version >= '3.4.0':
             raise ValueError("""
@@ -386,11 +414,13 @@ class TransformDistribution(object):
         for transform in self.transforms:
             distribution.remove_transform('Local', transform, server='Local')
 
-    def create_profile(self, install_prefix, mtz_dir, configure=True, in_project=False):
+    def create_profile(self, install_prefix, mtz_dir, configure=True, in_project=False, dispatcher=None):
         mtz = os.path.join(mtz_dir, '%s.mtz' % self.name)
         print('Creating profile %s...' % mtz, file=sys.stderr)
+
+        from canari.pkgutils.maltego import MtzDistribution
         mtz = MtzDistribution(mtz, 'w')
-        self.install(install_prefix, mtz, configure, in_project=in_project)
+        self.install(install_prefix, mtz, configure, in_project=in_project, dispatcher=dispatcher)
         mtz.close()
 
         print("""
@@ -7,10 +7,11 @@ from importlib import import_module
 import sys
 
 import canari
-from mrbob.parsing import parse_config
-
 from canari.utils.fs import PushDir
 
+# NOTE: mrbob is imported where it is used. The dispatcher constructs a CanariProject for every transform it runs and
+# mrbob is expensive to import.
+
 __author__ = 'Nadeem Douba'
 __copyright__ = 'Copyright 2016, canari Project'
 __credits__ = []
@@ -118,6 +119,7 @@ class CanariProject(object):
     def project_tree(self, path):
         with PushDir(path):
             root = self._project_root()
+            from mrbob.parsing import parse_config
             self._configuration = parse_config(os.path.join(root, '.mrbob.ini'))
 
             tree = dict(
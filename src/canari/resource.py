@@ -2,8 +2,6 @@ import os
 from imghdr import what
 from os.path import abspath
 
-from pkg_resources import resource_filename, resource_listdir, resource_isdir
-
 from canari.utils.stack import calling_package
 
 __author__ = 'Nadeem Douba'
@@ -33,6 +31,7 @@ def external_resource(name, package=None):
     :param package: package name in dotted format.
     :return: the absolute path to the external resource.
     """
+    from pkg_resources import resource_filename
     if not package:
         package = '%s.resources.external' % calling_package()
     return resource_filename(package, name)
@@ -47,6 +46,7 @@ def icon_resource(name, package=None):
     :param package: package name in dotted format.
     :return: the file URI path to the image resource (i.e. file:///foo/bar/image.png).
     """
+    from pkg_resources import resource_filename
     if not package:
         package = '%s.resources.images' % calling_package()
     name = resource_filename(package, name)
@@ -64,6 +64,7 @@ def image_resources(package=None, directory='resources'):
     :param directory: path relative to package path of the resources directory.
     :return: a list of images under the specified resources path.
     """
+    from pkg_resources import resource_filename, resource_listdir, resource_isdir
     if not package:
         package = calling_package()
     package_dir = '.'.join([package, directory])
@@ -79,5 +80,6 @@ def image_resources(package=None, directory='resources'):
     return images
 
 
-# etc
-global_config = os.path.abspath(resource_filename('canari.resources.etc', 'canari.conf'))
+# etc - resolved relative to this module rather than through pkg_resources, which is expensive to import and would
+# otherwise be loaded on every transform execution (canari is not zip safe).
+global_config = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', 'etc', 'canari.conf')
@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+"""
+An ASGI flavour of Plume. Transforms with async do_transform methods are executed directly on the server's event loop
+while regular transforms are handed off to Plume's transform executor so that they don't block the loop. Both are
+subject to the per-transform concurrency limits configured in the [canari.remote.concurrency] section.
+
+Run it using any ASGI server from the Plume directory, e.g.:
+
+    $ uvicorn canari.tas.asgi:application --port 8080
+
+Python 3.7+ only.
+"""
+import asyncio
+import contextvars
+import json
+import traceback
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+import canari.tas.plume as plume
+from canari import tracing
+from canari.config import load_cached_config
+from canari.maltego.aio import is_async_transform, collect_response
+from canari.maltego.batch import is_batch_transform, run_batch, split_request, merge_responses
+from canari.maltego.codec import codec_for_content_type, negotiate
+from canari.maltego.entities import Unknown
+from canari.maltego.message import MaltegoTransformResponseMessage, MaltegoTransformExceptionMessage, MaltegoException
+from canari.maltego.utils import to_response, new_response, call_transform
+from canari.tas.executor import ExecutorSaturated
+from canari.tas.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from canari.tas.static import CHUNK_SIZE
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'AsgiPlume',
+    'application'
+]
+
+# Icon URLs are generated using the host URL of the request being processed.
+_host_url = contextvars.ContextVar('canari_host_url', default='')
+plume.host_url_resolver = _host_url.get
+
+
+def _header(scope, name):
+    for k, v in scope.get('headers') or []:
+        if k.lower() == name:
+            return v.decode('latin-1')
+    return None
+
+
+def _host_url_from_scope(scope):
+    host = _header(scope, b'host') or ''
+    if not host and scope.get('server'):
+        host = '%s:%d' % tuple(scope['server'])
+    return '%s://%s/' % (scope.get('scheme', 'http'), host)
+
+
+class AsgiPlume(object):
+    """ASGI application serving the transforms loaded by a Plume application."""
+
+    def __init__(self, app):
+        self.app = app
+        self.executor = app.executor
+        self._pending = defaultdict(int)
+        self.async_completed = 0
+        self.async_rejected = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        elif scope['type'] != 'http':
+            return
+
+        method = scope['method']
+        path = scope['path'].lstrip('/')
+
+        if method == 'GET':
+            if path == 'status/executor':
+                return await self._send(send, 200, json.dumps(self.stats()), 'application/json')
+            elif path == 'status/traces':
+                return await self._traces(scope, send)
+            elif path == 'metrics':
+                return await self._send(send, 200, self.app.metrics.render(), METRICS_CONTENT_TYPE)
+            elif path.startswith('static/'):
+                return await self._static(scope, send, path)
+            elif path in self.app.transforms:
+                return await self._send(send, 200, 'Yes?')
+        elif method == 'POST' and path in self.app.transforms:
+            body = await self._read_body(receive)
+            if not body:
+                return await self._send(send, 200, 'Yes?')
+            codec = codec_for_content_type(_header(scope, b'content-type'), plume.xml_codec)
+            response_codec = negotiate(_header(scope, b'accept'), codec)
+            trace_id = tracing.parse_trace_id(_header(scope, tracing.TRACE_HEADER.lower().encode('latin-1')))
+            token = _host_url.set(_host_url_from_scope(scope))
+            try:
+                status, data, headers = await self.do_transform(
+                    self.app.transforms[path], path, body, codec, response_codec, trace_id)
+            finally:
+                _host_url.reset(token)
+            return await self._send(
+                send, status, data, response_codec.content_type if status == 200 else 'text/plain', headers)
+
+        return await self._send(send, 404, self.app.four_o_four)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def _read_body(receive):
+        body = b''
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return body
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                return body
+
+    @staticmethod
+    async def _send(send, status, data, content_type='text/plain', headers=None):
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+        response_headers = [
+            (b'content-type', content_type.encode('latin-1')),
+            (b'content-length', str(len(data)).encode('latin-1'))
+        ]
+        for k, v in (headers or {}).items():
+            response_headers.append((k.lower().encode('latin-1'), str(v).encode('latin-1')))
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': data})
+
+    async def _traces(self, scope, send):
+        # Spans are only kept around by the memory sink
+        sink = tracing.get_sink()
+        if not isinstance(sink, tracing.RingBufferSink):
+            return await self._send(send, 404, self.app.four_o_four)
+        trace_id = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('trace_id', [None])[0]
+        return await self._send(send, 200, json.dumps({'spans': [s.to_dict() for s in sink.spans(trace_id)]}),
+                                'application/json')
+
+    async def _static(self, scope, send, path):
+        asset = self.app.assets.get(path[len('static/'):])
+        if asset is None:
+            return await self._send(send, 404, self.app.four_o_four)
+        headers = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in asset.headers]
+        if asset.not_modified(_header(scope, b'if-none-match'), _header(scope, b'if-modified-since')):
+            await send({'type': 'http.response.start', 'status': 304, 'headers': headers})
+            return await send({'type': 'http.response.body', 'body': b''})
+        headers.append((b'content-type', asset.content_type.encode('latin-1')))
+        headers.append((b'content-length', str(asset.size).encode('latin-1')))
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+        if asset.data is not None:
+            return await send({'type': 'http.response.body', 'body': asset.data})
+        # Large assets are streamed from disk in chunks that are read in a thread so that they don't block the loop
+        loop = asyncio.get_event_loop()
+        f = await loop.run_in_executor(None, asset.open)
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, f.read, CHUNK_SIZE)
+                if not chunk:
+                    break
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            f.close()
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def _run_async(self, transform, name, req, response, metrics):
+        limit = self.executor.limit(name)
+        if limit is not None and self._pending[name] >= limit:
+            self.async_rejected += 1
+            raise ExecutorSaturated(name, self.executor.retry_after)
+        self._pending[name] += 1
+        try:
+            # Spans are tracked per task so this one can safely stay open while the transform is awaited
+            with metrics.timed('transform'), tracing.span('do_transform', transform=name):
+                return await collect_response(call_transform(transform(), req, response, load_cached_config()),
+                                              response)
+        finally:
+            self._pending[name] -= 1
+            self.async_completed += 1
+
+    def _run_sync(self, transform, name, req, response, metrics):
+        def run():
+            with metrics.timed('transform'), tracing.span('do_transform', transform=name):
+                if is_batch_transform(transform) and len(req.entities) > 1:
+                    return merge_responses(run_batch(transform(), split_request(req), load_cached_config()), response)
+                return to_response(call_transform(transform(), req, response, load_cached_config()), response)
+        # Copy the context so that the host URL and the current trace are visible to the transform in the worker thread
+        future = self.executor.submit(name, contextvars.copy_context().run, run)
+        return asyncio.wrap_future(future)
+
+    async def do_transform(self, transform, name, body, codec=plume.xml_codec, response_codec=None, trace_id=None):
+        """Executes transform with the request in body, which is decoded using codec. Returns a tuple of the status
+        code, response body (encoded using response_codec, which defaults to codec) and any extra headers. The spans
+        are recorded as part of the trace_id trace, if specified, which is also echoed back in the headers."""
+        response_codec = response_codec or codec
+        metrics = self.app.metrics.get(name)
+        metrics.started()
+        try:
+            with tracing.attach((trace_id, None) if trace_id else None), \
+                    tracing.span('plume', transform=name) as s:
+                status, data, headers = await self._do_transform(transform, name, body, codec, response_codec, metrics)
+                s.set(status=status)
+            if trace_id:
+                headers = dict(headers or {}, **{tracing.TRACE_HEADER: trace_id})
+            return status, data, headers
+        finally:
+            metrics.finished()
+
+    async def _do_transform(self, transform, name, body, codec, response_codec, metrics):
+        def croak(cause):
+            return 200, response_codec.dumps(MaltegoTransformExceptionMessage(exceptions=[MaltegoException(cause)])), \
+                None
+
+        try:
+            with metrics.timed('parse'), tracing.span('parse', codec=codec.name):
+                req = codec.loads_request(body)
+
+            if transform.input_type and transform.input_type is not Unknown and \
+                    not isinstance(req.entity, transform.input_type):
+                return 404, self.app.four_o_four, None
+
+            response = new_response(transform, req)
+            try:
+                if is_async_transform(transform):
+                    msg = await self._run_async(transform, name, req, response, metrics)
+                else:
+                    msg = await self._run_sync(transform, name, req, response, metrics)
+            except ExecutorSaturated as e:
+                return 429, str(e), {'Retry-After': e.retry_after}
+
+            if isinstance(msg, MaltegoTransformResponseMessage):
+                with metrics.timed('render'), tracing.span('render', codec=response_codec.name):
+                    data = response_codec.dumps(msg)
+                metrics.response(len(msg.entities), len(data))
+                return 200, data, None
+            raise MaltegoException(str(msg))
+        except MaltegoException as me:
+            metrics.error(me)
+            return croak(str(me))
+        except Exception as e:
+            metrics.error(e)
+            if self.app.debug:
+                return croak(traceback.format_exc())
+            return croak('Transform execution failed.')
+
+    def stats(self):
+        stats = self.executor.stats()
+        stats['async'] = {
+            'running': sum(self._pending.values()),
+            'completed': self.async_completed,
+            'rejected': self.async_rejected,
+            'transforms': {n: c for n, c in sorted(self._pending.items()) if c}
+        }
+        return stats
+
+
+application = AsgiPlume(plume.application)
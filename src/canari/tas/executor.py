@@ -0,0 +1,177 @@
+import threading
+from collections import defaultdict
+
+from concurrent.futures import ThreadPoolExecutor
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'TransformExecutor',
+    'ExecutorSaturated',
+    'executor_from_config'
+]
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a transform execution cannot be admitted because either the executor's queue is full or the
+    transform has reached its concurrency limit."""
+
+    def __init__(self, name, retry_after):
+        super(ExecutorSaturated, self).__init__('Too many pending executions for transform %r.' % name)
+        self.name = name
+        self.retry_after = retry_after
+
+
+class TransformExecutor(object):
+    """A thread pool that executes transforms on behalf of Plume. Each submission is accounted against the transform
+    that is being executed so that a single slow transform can be prevented from occupying every worker thread.
+
+    Executions are rejected with ExecutorSaturated instead of being queued indefinitely when:
+
+    - the number of executions waiting for a worker thread reaches max_queue; or,
+    - the number of pending (queued or running) executions of a transform reaches its limit.
+
+    :param max_workers: the number of worker threads.
+    :param max_queue: the maximum number of executions waiting for a worker thread (default: 10 * max_workers).
+    :param limits: a dictionary mapping transform names (case-insensitive) to their maximum number of pending
+                   executions.
+    :param default_limit: the limit for transforms without an entry in limits (default: unlimited).
+    :param retry_after: the number of seconds clients should wait before retrying a rejected execution.
+    """
+
+    def __init__(self, max_workers=10, max_queue=None, limits=None, default_limit=None, retry_after=1):
+        self.max_workers = max_workers
+        self.max_queue = max_workers * 10 if max_queue is None else max_queue
+        self.limits = {k.lower(): v for k, v in (limits or {}).items()}
+        self.default_limit = default_limit
+        self.retry_after = retry_after
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self._queued = defaultdict(int)
+        self._running = defaultdict(int)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers)
+
+    def limit(self, name):
+        """Returns the maximum number of pending executions for transform name or None if it is unlimited."""
+        return self.limits.get(name.lower(), self.default_limit)
+
+    @property
+    def queued(self):
+        return sum(self._queued.values())
+
+    @property
+    def running(self):
+        return sum(self._running.values())
+
+    def _admit(self, name):
+        limit = self.limit(name)
+        if self.queued + self.running >= self.max_workers + self.max_queue:
+            return False
+        elif limit is not None and self._queued[name] + self._running[name] >= limit:
+            return False
+        return True
+
+    def submit(self, name, fn, *args, **kwargs):
+        """Schedules fn(*args, **kwargs) for execution on behalf of transform name and returns a Future. Raises
+        ExecutorSaturated if the execution cannot be admitted."""
+        with self._lock:
+            if not self._admit(name):
+                self.rejected += 1
+                raise ExecutorSaturated(name, self.retry_after)
+            self._queued[name] += 1
+            self.submitted += 1
+
+        def run():
+            with self._lock:
+                self._queued[name] -= 1
+                self._running[name] += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running[name] -= 1
+                    self.completed += 1
+
+        def cancelled(future):
+            if future.cancelled():
+                with self._lock:
+                    self._queued[name] -= 1
+
+        try:
+            future = self._pool.submit(run)
+        except Exception:
+            with self._lock:
+                self._queued[name] -= 1
+            raise
+        future.add_done_callback(cancelled)
+        return future
+
+    def stats(self):
+        """Returns a snapshot of the executor's counters and the number of queued and running executions per
+        transform."""
+        with self._lock:
+            names = set(n for n, c in self._queued.items() if c) | set(n for n, c in self._running.items() if c)
+            return {
+                'workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'queued': self.queued,
+                'running': self.running,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'transforms': {
+                    n: {'queued': self._queued[n], 'running': self._running[n], 'limit': self.limit(n)}
+                    for n in sorted(names)
+                }
+            }
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait)
+
+
+def _non_negative_int(value, option, default):
+    if value == '' or value is None:
+        return default
+    if not isinstance(value, int) or value < 0:
+        raise ValueError('Expected a non-negative integer for option %r got %r instead.' % (option, value))
+    return value
+
+
+def _get_option(config, option, default):
+    return _non_negative_int(config[option] if option in config else None, option, default)
+
+
+def executor_from_config(config):
+    """Creates a TransformExecutor using the following options in the [canari.remote] section of config:
+
+    - max_workers: the number of worker threads (default: 10).
+    - max_queue: the number of executions that can wait for a worker thread (default: 10 * max_workers).
+    - max_concurrency: the default maximum number of pending executions per transform (default: unlimited).
+    - retry_after: the value of the Retry-After header sent to rejected clients (default: 1).
+
+    Per-transform limits are read from the [canari.remote.concurrency] section where the option names are transform
+    names and the values are their maximum number of pending executions.
+    """
+    limits = {}
+    if config.has_section('canari.remote.concurrency'):
+        for name in config.options('canari.remote.concurrency'):
+            # Transform names contain dots so we can't use the config's dotted key lookups here.
+            value = config._parse_value(config.get('canari.remote.concurrency', name))
+            limits[name] = _non_negative_int(value, name, None)
+    return TransformExecutor(
+        max_workers=_get_option(config, 'canari.remote.max_workers', 10) or 1,
+        max_queue=_get_option(config, 'canari.remote.max_queue', None),
+        limits=limits,
+        default_limit=_get_option(config, 'canari.remote.max_concurrency', None),
+        retry_after=_get_option(config, 'canari.remote.retry_after', 1)
+    )
@@ -0,0 +1,219 @@
+"""
+Per-transform metrics for Plume, exposed in the Prometheus text format at /metrics. The collectors for each transform
+are allocated when Plume starts and each one is guarded by its own lock, which is only held long enough to bump a few
+counters, so they're cheap enough to leave on in production.
+"""
+import threading
+from bisect import bisect_left
+from timeit import default_timer
+
+from canari.maltego.message import MaltegoException
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'CONTENT_TYPE',
+    'Histogram',
+    'TransformMetrics',
+    'Metrics'
+]
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# The phases of a transform request that are timed separately
+PHASES = ('parse', 'transform', 'render')
+
+# Errors are split into MaltegoExceptions raised on purpose by transforms and any other (unhandled) exception
+ERROR_TYPES = ('maltego', 'unhandled')
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ENTITY_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class Histogram(object):
+    """A histogram with fixed bucket upper bounds. Not thread-safe; TransformMetrics serializes access to it."""
+
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def snapshot(self):
+        """Returns a list of (upper bound, cumulative count) tuples ending with the +Inf bucket, the sum and the
+        count."""
+        buckets = []
+        total = 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets, self.sum, total
+
+
+class TransformMetrics(object):
+    """The collectors of a single transform."""
+
+    def __init__(self, name):
+        self.name = name
+        self.requests = 0
+        self.in_flight = 0
+        self.errors = dict.fromkeys(ERROR_TYPES, 0)
+        self.phases = {p: Histogram(LATENCY_BUCKETS) for p in PHASES}
+        self.entities = Histogram(ENTITY_BUCKETS)
+        self.sizes = Histogram(SIZE_BUCKETS)
+        self._lock = threading.Lock()
+
+    def started(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+
+    def finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def observe(self, phase, seconds):
+        with self._lock:
+            self.phases[phase].observe(seconds)
+
+    def error(self, exception):
+        """Counts the exception that failed a request."""
+        kind = 'maltego' if isinstance(exception, MaltegoException) else 'unhandled'
+        with self._lock:
+            self.errors[kind] += 1
+
+    def response(self, entities, size):
+        with self._lock:
+            self.entities.observe(entities)
+            self.sizes.observe(size)
+
+    def timed(self, phase):
+        """Returns a context manager that times the phase."""
+        return _Timer(self, phase)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'in_flight': self.in_flight,
+                'errors': dict(self.errors),
+                'phases': {p: h.snapshot() for p, h in self.phases.items()},
+                'entities': self.entities.snapshot(),
+                'sizes': self.sizes.snapshot()
+            }
+
+
+class _Timer(object):
+    __slots__ = ('metrics', 'phase', 'start')
+
+    def __init__(self, metrics, phase):
+        self.metrics = metrics
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = default_timer()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.metrics.observe(self.phase, default_timer() - self.start)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(**labels):
+    return '{%s}' % ','.join('%s="%s"' % (k, _escape(v)) for k, v in sorted(labels.items()))
+
+
+class Metrics(object):
+    """The metrics of all the transforms served by Plume, along with its executor and the configuration cache."""
+
+    def __init__(self, names=(), executor=None, config_cache=None):
+        self.transforms = {}
+        self.executor = executor
+        self.config_cache = config_cache
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        self.transforms[name] = TransformMetrics(name)
+        return self.transforms[name]
+
+    def get(self, name):
+        return self.transforms.get(name)
+
+    def render(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def metric(name, type_, help_, samples):
+            lines.append('# HELP %s %s' % (name, help_))
+            lines.append('# TYPE %s %s' % (name, type_))
+            for suffix, labels, value in samples:
+                lines.append('%s%s%s %s' % (name, suffix, _labels(**labels) if labels else '', _format_value(value)))
+
+        def histogram(snapshot, **labels):
+            buckets, sum_, count = snapshot
+            samples = [('_bucket', dict(labels, le=_format_value(le)), c) for le, c in buckets]
+            samples.append(('_sum', labels, sum_))
+            samples.append(('_count', labels, count))
+            return samples
+
+        snapshots = [(n, self.transforms[n].snapshot()) for n in sorted(self.transforms)]
+
+        metric('canari_transform_requests_total', 'counter', 'Transform requests received.',
+               [('', {'transform': n}, s['requests']) for n, s in snapshots])
+        metric('canari_transform_errors_total', 'counter',
+               'Transform requests that failed with a MaltegoException (maltego) or any other exception (unhandled).',
+               [('', {'transform': n, 'type': t}, s['errors'][t]) for n, s in snapshots for t in ERROR_TYPES])
+        metric('canari_transform_in_flight', 'gauge', 'Transform requests being processed.',
+               [('', {'transform': n}, s['in_flight']) for n, s in snapshots])
+        metric('canari_transform_duration_seconds', 'histogram',
+               'Time spent parsing requests, executing transforms and rendering responses.',
+               [x for n, s in snapshots for p in PHASES for x in histogram(s['phases'][p], transform=n, phase=p)])
+        metric('canari_transform_response_entities', 'histogram', 'Entities returned per response.',
+               [x for n, s in snapshots for x in histogram(s['entities'], transform=n)])
+        metric('canari_transform_response_bytes', 'histogram', 'Response sizes in bytes.',
+               [x for n, s in snapshots for x in histogram(s['sizes'], transform=n)])
+
+        if self.config_cache is not None:
+            metric('canari_config_reloads_total', 'counter', 'Times the configuration was reloaded after a change.',
+                   [('', None, self.config_cache.reloads)])
+
+        if self.executor is not None:
+            stats = self.executor.stats()
+            metric('canari_executor_workers', 'gauge', 'Executor worker threads.', [('', None, stats['workers'])])
+            metric('canari_executor_queued', 'gauge', 'Transform executions waiting for a worker.',
+                   [('', None, stats['queued'])])
+            metric('canari_executor_running', 'gauge', 'Transform executions running.',
+                   [('', None, stats['running'])])
+            for counter in ('submitted', 'completed', 'rejected'):
+                metric('canari_executor_%s_total' % counter, 'counter', 'Transform executions %s.' % counter,
+                       [('', None, stats[counter])])
+
+        return '\n'.join(lines) + '\n'
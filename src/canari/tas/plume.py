@@ -6,29 +6,49 @@ import sys
 
 if sys.version_info[0] > 2:
     from configparser import NoSectionError
+    from queue import Queue, Full
 else:
     # noinspection PyUnresolvedReferences
     from ConfigParser import NoSectionError
+    # noinspection PyUnresolvedReferences
+    from Queue import Queue, Full
 
 # Builtin imports
+import inspect
 import logging
 import os
+import shutil
 import tempfile
+import threading
+import time
 import traceback
 from hashlib import md5
 from logging.handlers import RotatingFileHandler
+from timeit import default_timer
 
-from flask import Flask, Response, request, safe_join
+from flask import (Flask, Response, request, stream_with_context, copy_current_request_context, jsonify,
+                   has_request_context)
+from werkzeug.wsgi import wrap_file
 
 import canari.resource
+from canari import tracing
 from canari.commands.common import fix_binpath, fix_pypath
-from canari.config import load_config, OPTION_REMOTE_PATH
+from canari.config import load_config, load_cached_config, config_cache, OPTION_REMOTE_PATH
+from canari.maltego.batch import is_batch_transform, run_batch, split_request, merge_responses
+from canari.maltego.codec import get_codec, codec_for_content_type, negotiate
 from canari.maltego.entities import Phrase, Unknown
 from canari.maltego.message import (MaltegoMessage, MaltegoTransformResponseMessage, MaltegoTransformExceptionMessage,
-                                    MaltegoException)
+                                    MaltegoException, UIMessage, UIMessageType, Entity, EntityRecord, _Entity,
+                                    LimitReached)
+from canari.maltego.renderer import iter_render_message
+from canari.maltego.utils import to_response, is_awaitable_result, new_response, call_transform
 from canari.maltego.transform import Transform
 from canari.mode import set_canari_mode, CanariMode
+from canari.pkgutils.index import TransformIndex, index_path
 from canari.pkgutils.transform import TransformDistribution
+from canari.tas.executor import executor_from_config, ExecutorSaturated
+from canari.tas.metrics import Metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from canari.tas.static import StaticAssets
 
 __author__ = 'Nadeem Douba'
 __copyright__ = 'Copyright 2015, Canari Project'
@@ -54,8 +74,21 @@ def get_image_path(i):
     return os.path.join('static', md5(b(i)).hexdigest())
 
 
+# Server flavours that don't use Flask's request context (i.e. canari.tas.asgi) can set this to a callable that returns
+# the host URL of the request currently being processed.
+host_url_resolver = None
+
+
+def get_host_url():
+    if has_request_context():
+        return request.host_url
+    elif host_url_resolver is not None:
+        return host_url_resolver()
+    return ''
+
+
 def get_image_url(i):
-    return '%s/static/%s' % (request.host_url, md5(b(i)).hexdigest())
+    return '%s/static/%s' % (get_host_url(), md5(b(i)).hexdigest())
 
 
 # Monkey patch our resource lib to automatically rewrite icon urls
@@ -84,7 +117,9 @@ class Plume(Flask):
     def __init__(self, import_name, *args, **kwargs):
         super(Plume, self).__init__(import_name, *args, **kwargs)
         self.transforms = {}
-        self.resources = []
+        self.assets = StaticAssets()
+        self.executor = None
+        self.metrics = None
         self._initialize()
 
     def _copy_images(self, pkg):
@@ -92,12 +127,24 @@ class Plume(Flask):
             pkg = pkg.replace('.transforms', '')
         for i in canari.resource.image_resources(pkg):
             img_name = get_image_path(i)
-            self.resources.append(img_name)
-            if not os.path.exists(img_name):
+            # Images are only copied if they are new or have changed since they were last copied. copy2() preserves
+            # the modification time of the original so it can be compared on the next startup.
+            src = os.stat(i)
+            dst = os.stat(img_name) if os.path.exists(img_name) else None
+            if dst is None or dst.st_size != src.st_size or int(dst.st_mtime) != int(src.st_mtime):
                 print('Copying %s to %s...' % (i, img_name), file=sys.stderr)
-                with open(i, mode='rb') as src:
-                    with open(img_name, mode='wb') as dst:
-                        dst.write(src.read())
+                shutil.copy2(i, img_name)
+            self.assets.add(os.path.basename(img_name), img_name, i)
+
+    def _find_remote_transforms(self, package):
+        # Use the transform index written by load-plume-package if it is still fresh. This saves us from having to
+        # import every module in the package.
+        if package.endswith('.transforms'):
+            package = package.replace('.transforms', '')
+        index = TransformIndex.load(index_path(os.getcwd(), package))
+        if index is not None:
+            return [index.load_transform(t['name']) for t in index.remote_transforms]
+        return TransformDistribution(package).remote_transforms
 
     def _initialize(self):
 
@@ -121,6 +168,12 @@ class Plume(Flask):
         elif isinstance(packages, string_types):
             packages = [packages]
 
+        # Transforms are executed in a thread pool with per-transform concurrency limits
+        self.executor = executor_from_config(config)
+
+        # Spans are discarded unless a trace sink is configured
+        tracing.set_sink(tracing.sink_from_config(config))
+
         # Create the static directory for static file loading
         if not os.path.exists('static'):
             os.mkdir('static', 0o755)
@@ -129,11 +182,9 @@ class Plume(Flask):
         for p in packages:
             # Copy all the image resource files in case they are used as entity icons
 
-            distribution = TransformDistribution(p)
-
             print('Loading transform package %s' % repr(p), file=sys.stderr)
 
-            for transform in distribution.remote_transforms:
+            for transform in self._find_remote_transforms(p):
                 transform_name = transform().name
                 print('Loading transform %s at /%s...' % (repr(transform_name), transform_name), file=sys.stderr)
                 if os.name == 'posix' and transform.superuser and os.geteuid() and __name__.startswith('_mod_wsgi_'):
@@ -151,35 +202,236 @@ class Plume(Flask):
 
         self.transforms['canari.Version'] = Version
 
+        # The metrics collectors of every transform are allocated up front
+        self.metrics = Metrics(self.transforms, self.executor, config_cache)
+
 
 # Create our Flask app.
 application = Plume(__name__)
 
+# Transform requests and responses are exchanged as XML by default
+xml_codec = get_codec('xml')
+
 
-def croak(cause):
+def croak(cause, codec=None):
     """Throw an exception in the Maltego GUI containing cause.
 
     :param cause: a string containing the issue description.
+    :param codec: the codec used to encode the response. If not specified, the rendered XML message is returned instead
+                  of a response object.
     """
-    return MaltegoMessage(
-        message=MaltegoTransformExceptionMessage(
-            exceptions=[
-                MaltegoException(cause)
-            ]
-        )
-    ).render()
+    msg = MaltegoTransformExceptionMessage(
+        exceptions=[
+            MaltegoException(cause)
+        ]
+    )
+    if codec is None:
+        return MaltegoMessage(message=msg).render()
+    return message(msg, codec)
 
 
-def message(msg):
+def message(msg, codec=None):
     """Write a MaltegoMessage to stdout and exit successfully"""
-    v = MaltegoMessage(message=msg).render(encoding='utf-8')
-    return Response(v, status=200, mimetype='text/xml')
+    codec = codec or xml_codec
+    return Response(codec.dumps(msg), status=200, mimetype=codec.content_type)
 
 
-def do_transform(transform):
+def _stream_error(error):
+    if isinstance(error, MaltegoException):
+        return str(error)
+    elif application.debug:
+        return traceback.format_exc()
+    return 'Transform execution failed.'
+
+
+def stream(response, items, metrics=None):
+    """Stream a MaltegoMessage back to the client in chunks as the transform yields its entities"""
+    v = iter_render_message(response, items, encoding='utf-8', on_error=_stream_error)
+    if metrics is not None:
+        v = _observe_stream(v, items, metrics, tracing.current_context())
+    return Response(stream_with_context(v), status=200, mimetype='text/xml')
+
+
+def _observe_stream(chunks, relay, metrics, context):
+    # Only the time spent producing chunks counts towards rendering, less the time spent waiting on the transform.
+    started = time.time()
+    rendering = 0
+    size = 0
+    while True:
+        start = default_timer()
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            break
+        rendering += default_timer() - start
+        size += len(chunk)
+        yield chunk
+    rendering = max(rendering - relay.waited, 0)
+    metrics.observe('render', rendering)
+    metrics.response(relay.entities, size)
+    tracing.emit('render', started, rendering, context, streamed=True, entities=relay.entities, size=size)
+
+
+def collect(response, items):
+    """Collect the results of a streaming transform into response for clients that don't speak XML"""
     try:
-        # Let's get an XML object tree
-        req = MaltegoMessage.parse(request.data).message
+        for item in items:
+            if item is not None and item is not response:
+                response += item
+    except Exception as e:
+        response += UIMessage(_stream_error(e), type=UIMessageType.Partial)
+    return response
+
+
+# The number of streamed items that can be queued up for the request thread before the transform is suspended (four
+# chunks' worth) and how often a suspended transform checks whether the client went away.
+RELAY_QUEUE_SIZE = 400
+RELAY_POLL_INTERVAL = 0.1
+
+
+def _put(results, cancelled, item):
+    """Puts item in the results queue, waiting for the request thread to make room for it. Returns False if the client
+    went away in the meantime."""
+    while True:
+        try:
+            results.put(item, timeout=RELAY_POLL_INTERVAL)
+            return True
+        except Full:
+            if cancelled.is_set():
+                return False
+
+
+def _execute(transform, req, response, results, cancelled, metrics=None):
+    """Runs in one of the executor's worker threads and relays the transform's results back to the request thread
+    through the results queue."""
+    start = default_timer()
+    # The span covers the whole execution, including the relaying of streamed results
+    with tracing.span('do_transform', transform=transform.name):
+        try:
+            with tracing.span('instantiate', transform=transform.name):
+                instance = transform()
+            # The config is a shared, read-only snapshot that is only reloaded when the config files change.
+            if is_batch_transform(transform) and len(req.entities) > 1:
+                # Requests carrying many input entities are split up and passed to do_transform_batch in batches
+                results.put(('result', merge_responses(
+                    run_batch(instance, split_request(req), load_cached_config()), response
+                )))
+                return
+            msg = call_transform(instance, req, response, load_cached_config())
+            if is_awaitable_result(msg):
+                # Async transforms get their own event loop in the worker thread under WSGI
+                msg = to_response(msg, response)
+            if not inspect.isgenerator(msg):
+                results.put(('result', msg))
+                return
+
+            # Transforms written as generators get their results relayed as they are yielded. Entities and messages
+            # that are added directly to the response object are relayed along with them. Relayed entities don't
+            # accumulate in the response object so they are counted on it to enforce the hard limit and keep
+            # response.remaining and response.is_full accurate.
+            results.put(('stream', None))
+            limit = response.limits.hard if response.enforce_limits and response.limits is not None else None
+            messages = 0
+
+            def relay(items):
+                for i in items:
+                    if isinstance(i, (Entity, EntityRecord, _Entity)):
+                        if response._relayed == limit:
+                            return False
+                        response._relayed += 1
+                    if not _put(results, cancelled, ('item', i)):
+                        return False
+                return True
+
+            try:
+                for item in msg:
+                    if cancelled.is_set():
+                        msg.close()
+                        break
+                    pending = response.entities + response.messages[messages:] + [item]
+                    del response.entities[:]
+                    messages = len(response.messages)
+                    if not relay(pending):
+                        msg.close()
+                        break
+                else:
+                    relay(response.entities + response.messages[messages:])
+            except LimitReached:
+                relay(response.entities + response.messages[messages:])
+            _put(results, cancelled, ('end', None))
+        except Exception as e:
+            _put(results, cancelled, ('error', e))
+        except BaseException:
+            _put(results, cancelled, ('error', MaltegoException('Transform execution was aborted.')))
+            raise
+        finally:
+            if metrics is not None:
+                metrics.observe('transform', default_timer() - start)
+
+
+class _Relay(object):
+    """Relays the items of a streaming transform from the results queue. The time spent waiting on the transform and
+    the number of entities relayed are kept for the metrics."""
+
+    def __init__(self, results, cancelled, metrics):
+        self.results = results
+        self.cancelled = cancelled
+        self.metrics = metrics
+        self.waited = 0
+        self.entities = 0
+
+    def __iter__(self):
+        try:
+            while True:
+                start = default_timer()
+                kind, value = self.results.get()
+                self.waited += default_timer() - start
+                if kind == 'item':
+                    if isinstance(value, (Entity, EntityRecord, _Entity)):
+                        self.entities += 1
+                    yield value
+                elif kind == 'error':
+                    self.metrics.error(value)
+                    raise value
+                else:
+                    return
+        finally:
+            # Stop the transform if the client went away
+            self.cancelled.set()
+
+
+def do_transform(transform, transform_name):
+    metrics = application.metrics.get(transform_name)
+    metrics.started()
+    # Requests that carry a trace ID continue the client's trace. Otherwise, a new trace is started by the first span.
+    trace_id = tracing.parse_trace_id(request.headers.get(tracing.TRACE_HEADER))
+    response = None
+    try:
+        with tracing.attach((trace_id, None) if trace_id else None), \
+                tracing.span('plume', transform=transform_name) as s:
+            response = _do_transform(transform, transform_name, metrics)
+            s.set(status=response.status_code)
+        if trace_id:
+            response.headers[tracing.TRACE_HEADER] = trace_id
+        return response
+    finally:
+        if response is not None and response.is_streamed:
+            # Streamed responses are still in flight until the server is done sending them
+            response.call_on_close(metrics.finished)
+        else:
+            metrics.finished()
+
+
+def _do_transform(transform, transform_name, metrics):
+    # Requests are decoded according to their content type (XML unless stated otherwise) and responses are encoded
+    # in the same format unless the client asks for another one.
+    codec = codec_for_content_type(request.content_type, xml_codec)
+    response_codec = negotiate(request.headers.get('Accept'), codec)
+    try:
+        # Let's get a lazily materialized request object
+        data = request.data
+        with metrics.timed('parse'), tracing.span('parse', codec=codec.name):
+            req = codec.loads_request(data)
 
         # If our transform define an input entity type then we should check
         # whether the request contains the right type
@@ -187,27 +439,54 @@ def do_transform(transform):
                 not isinstance(req.entity, transform.input_type):
             return Response(application.four_o_four, status=404)
 
-        # Execute it!
-        msg = transform().do_transform(
-            req,
-            MaltegoTransformResponseMessage(),
-            load_config()
-        )
+        # Execute it! Tell the client to back off if the transform is at its concurrency limit or the executor is
+        # saturated.
+        response = new_response(transform, req)
+        # The queue is bounded so that streaming transforms can't get ahead of slow clients
+        results = Queue(RELAY_QUEUE_SIZE)
+        cancelled = threading.Event()
+        try:
+            application.executor.submit(
+                transform_name,
+                tracing.bind(copy_current_request_context(_execute)),
+                transform, req, response, results, cancelled, metrics
+            )
+        except ExecutorSaturated as e:
+            return Response(str(e), status=429, headers={'Retry-After': str(e.retry_after)})
+
+        kind, msg = results.get()
+        if kind == 'error':
+            raise msg
+        elif kind == 'stream':
+            relay = _Relay(results, cancelled, metrics)
+            if response_codec is xml_codec:
+                r = stream(MaltegoTransformResponseMessage(), relay, metrics)
+                # The relay may never be iterated if the client goes away early so the transform is also stopped when
+                # the response is closed
+                r.call_on_close(cancelled.set)
+                return r
+            # Only XML responses can be streamed
+            msg = collect(MaltegoTransformResponseMessage(), relay)
 
         # Let's serialize the return response and clean up whatever mess was left behind
         if isinstance(msg, MaltegoTransformResponseMessage):
-            return message(msg)
+            with metrics.timed('render'), tracing.span('render', codec=response_codec.name):
+                r = message(msg, response_codec)
+            metrics.response(len(msg.entities), r.calculate_content_length())
+            return r
         else:
             raise MaltegoException(str(msg))
 
     # Unless we croaked somewhere, then we need to fix things up here...
     except MaltegoException as me:
-        return croak(str(me))
-    except Exception:
+        metrics.error(me)
+        return croak(str(me), response_codec)
+    except Exception as e:
+        metrics.error(e)
         if application.debug:
-            return croak(traceback.format_exc())
+            return croak(traceback.format_exc(), response_codec)
         else:
-            return croak('Transform execution failed.')
+            return croak('Transform execution failed.', response_codec)
 
 
 # This is where the TDS will ask: "Are you a transform?" and we say "200 - Yes I am!" or "404 - PFO"
@@ -220,10 +499,18 @@ def transform_checker(transform_name):
 
 @application.route('/static/<resource_name>', methods=['GET'])
 def static_fetcher(resource_name):
-    resource_name = safe_join('static', resource_name)
-    if resource_name in application.resources:
-        return Response(open(resource_name, mode='rb').read(), status=200, mimetype='application/octet-stream')
-    return Response(application.four_o_four, status=404)
+    asset = application.assets.get(resource_name)
+    if asset is None:
+        return Response(application.four_o_four, status=404)
+    if asset.not_modified(request.headers.get('If-None-Match'), request.headers.get('If-Modified-Since')):
+        return Response(status=304, headers=asset.headers)
+    if asset.data is not None:
+        return Response(asset.data, status=200, mimetype=asset.content_type, headers=asset.headers)
+    # Large assets are handed to the server's file wrapper, which can use sendfile()
+    response = Response(wrap_file(request.environ, asset.open()), status=200, mimetype=asset.content_type,
+                        headers=asset.headers, direct_passthrough=True)
+    response.content_length = asset.size
+    return response
 
 
 # This is where we process a transform request.
@@ -233,7 +520,26 @@ def transform_runner(transform_name):
         return Response(application.four_o_four, status=404)
     if not request.content_length:
         return Response('Yes?', status=200)
-    return do_transform(application.transforms[transform_name])
+    return do_transform(application.transforms[transform_name], transform_name)
+
+
+@application.route('/status/executor', methods=['GET'])
+def executor_status():
+    return jsonify(application.executor.stats())
+
+
+@application.route('/status/traces', methods=['GET'])
+def trace_status():
+    # Spans are only kept around by the memory sink
+    sink = tracing.get_sink()
+    if not isinstance(sink, tracing.RingBufferSink):
+        return Response(application.four_o_four, status=404)
+    return jsonify(spans=[s.to_dict() for s in sink.spans(request.args.get('trace_id'))])
+
+
+@application.route('/metrics', methods=['GET'])
+def metrics_exporter():
+    return Response(application.metrics.render(), status=200, content_type=METRICS_CONTENT_TYPE)
 
 
 # To run Flask standalone just type `python -m canari.tas.plume`
@@ -0,0 +1,138 @@
+"""
+The table of static assets (i.e. entity icons) served by Plume. The table is built once on startup and is keyed by the
+asset's name in the static directory (the md5 hash of the resource's path). Small assets are kept in memory and larger
+ones are streamed from disk (see StaticAssets.max_memory_size). Every asset has a strong ETag derived from its content
+so that clients can revalidate their cached copies using conditional requests.
+"""
+import mimetypes
+import os
+from email.utils import formatdate, parsedate_tz, mktime_tz
+from hashlib import md5
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'StaticAsset',
+    'StaticAssets'
+]
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _parse_http_date(value):
+    try:
+        return mktime_tz(parsedate_tz(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _etags(value):
+    # Weak comparison is used for If-None-Match so the weakness indicator is ignored
+    for tag in value.split(','):
+        tag = tag.strip()
+        yield tag[2:] if tag.startswith('W/') else tag
+
+
+class StaticAsset(object):
+    """A static asset. data holds the asset's content if it is kept in memory; otherwise it is None and the content
+    has to be read from path."""
+
+    __slots__ = ('name', 'path', 'size', 'mtime', 'etag', 'content_type', 'data', 'headers')
+
+    def __init__(self, name, path, content_type, cache_control, keep_in_memory):
+        self.name = name
+        self.path = path
+        self.content_type = content_type
+        self.mtime = int(os.path.getmtime(path))
+        self.data = None
+
+        h = md5()
+        chunks = []
+        with open(path, mode='rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                h.update(chunk)
+                if keep_in_memory:
+                    chunks.append(chunk)
+        if keep_in_memory:
+            self.data = b''.join(chunks)
+        self.size = os.path.getsize(path) if self.data is None else len(self.data)
+        self.etag = '"%s"' % h.hexdigest()
+
+        # The headers sent with both 200 and 304 responses
+        self.headers = [
+            ('ETag', self.etag),
+            ('Last-Modified', formatdate(self.mtime, usegmt=True)),
+            ('Cache-Control', cache_control)
+        ]
+
+    def not_modified(self, if_none_match=None, if_modified_since=None):
+        """Returns True if the client's cached copy is still valid given the request's If-None-Match and
+        If-Modified-Since headers, in which case a 304 response should be sent."""
+        if if_none_match:
+            # If-Modified-Since is ignored when If-None-Match is present (RFC 7232, section 3.3)
+            return any(tag == '*' or tag == self.etag for tag in _etags(if_none_match))
+        elif if_modified_since:
+            since = _parse_http_date(if_modified_since)
+            return since is not None and self.mtime <= since
+        return False
+
+    def open(self):
+        return open(self.path, mode='rb')
+
+    def iter_chunks(self):
+        """Yields the asset's content in chunks."""
+        if self.data is not None:
+            yield self.data
+            return
+        with self.open() as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                yield chunk
+
+
+class StaticAssets(object):
+    """The table of static assets keyed by name. Assets up to max_memory_size bytes are kept in memory. Clients are
+    allowed to cache assets for max_age seconds before they have to revalidate them."""
+
+    max_memory_size = 1024 * 1024
+    max_age = 7 * 24 * 60 * 60
+
+    def __init__(self, max_memory_size=None, max_age=None):
+        if max_memory_size is not None:
+            self.max_memory_size = max_memory_size
+        if max_age is not None:
+            self.max_age = max_age
+        self._assets = {}
+
+    def add(self, name, path, source=None):
+        """Adds the file at path to the table under name. The content type is guessed from the file name of source (the
+        file the asset was copied from) or path. Returns the StaticAsset."""
+        content_type = mimetypes.guess_type(source or path)[0] or 'application/octet-stream'
+        asset = self._assets[name] = StaticAsset(
+            name,
+            path,
+            content_type,
+            'public, max-age=%d' % self.max_age,
+            os.path.getsize(path) <= self.max_memory_size
+        )
+        return asset
+
+    def get(self, name):
+        """Returns the StaticAsset named name or None if there is no such asset."""
+        return self._assets.get(name)
+
+    def __contains__(self, name):
+        return name in self._assets
+
+    def __len__(self):
+        return len(self._assets)
+
+    def __iter__(self):
+        return iter(self._assets.values())
@@ -0,0 +1,432 @@
+"""
+Lightweight tracing for transform execution. Spans are recorded around the hot paths of the transform runners, Plume
+and ExternalCommand (i.e. request parsing, transform instantiation, do_transform, rendering and subprocesses) and are
+handed to the current sink:
+
+    from canari import tracing
+
+    tracing.set_sink(tracing.ChromeTraceSink('trace.json'))
+    with tracing.trace(), tracing.span('lookup', host=host):
+        ...
+
+Tracing is off by default (see NullSink), in which case span() returns a shared no-op context manager. Trace IDs are
+sent to transform servers in the X-Canari-Trace-Id header so that the spans of a transform that calls other transform
+servers can be tied together. Spans are tracked per thread (and per asyncio task on Python 3.7+); use bind() to carry
+the current trace over to another thread.
+"""
+import atexit
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import deque, Counter
+from importlib import import_module
+from timeit import default_timer
+
+try:
+    import contextvars
+except ImportError:
+    contextvars = None
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'TRACE_HEADER',
+    'Span',
+    'Sink',
+    'NullSink',
+    'RingBufferSink',
+    'ChromeTraceSink',
+    'Profiler',
+    'get_sink',
+    'set_sink',
+    'sink_from_config',
+    'new_trace_id',
+    'parse_trace_id',
+    'current_trace_id',
+    'current_context',
+    'trace',
+    'attach',
+    'bind',
+    'span',
+    'emit'
+]
+
+TRACE_HEADER = 'X-Canari-Trace-Id'
+
+# Trace IDs received from clients are only accepted if they look sane
+trace_id_matcher = re.compile(r'^[\w.-]{1,64}$')
+
+
+class Span(object):
+    """A timed operation. start is a UNIX timestamp and duration is in seconds. parent_id is the span_id of the
+    enclosing span (if any) and error is the name of the exception that was raised during the span (if any)."""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start', 'duration', 'thread', 'attributes', 'error')
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.start = None
+        self.duration = None
+        self.thread = threading.current_thread().ident
+        self.attributes = attributes or {}
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {s: getattr(self, s) for s in self.__slots__}
+
+    def __repr__(self):
+        return '<Span %s %s/%s %.6fs>' % (self.name, self.trace_id, self.span_id, self.duration or 0)
+
+
+class Sink(object):
+    """The base class of span sinks. Sinks receive every finished span through emit(), which can be called from any
+    thread."""
+
+    enabled = True
+
+    def emit(self, span):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class NullSink(Sink):
+    """Discards spans. This is the default sink and disables tracing altogether."""
+
+    enabled = False
+
+    def emit(self, span):
+        pass
+
+
+class RingBufferSink(Sink):
+    """Keeps the last capacity spans in memory."""
+
+    def __init__(self, capacity=1024):
+        self._spans = deque(maxlen=capacity)
+
+    def emit(self, span):
+        self._spans.append(span)
+
+    def spans(self, trace_id=None):
+        """Returns the buffered spans, oldest first, optionally only those that belong to trace_id."""
+        spans = list(self._spans)
+        if trace_id is not None:
+            spans = [s for s in spans if s.trace_id == trace_id]
+        return spans
+
+    def clear(self):
+        self._spans.clear()
+
+
+class ChromeTraceSink(Sink):
+    """Writes spans to path as Chrome trace events (JSON array format), which can be loaded in chrome://tracing,
+    Perfetto or speedscope. Events are written as spans finish; the closing bracket is written when the sink is
+    closed, although viewers don't require it."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'w')
+        self._file.write('[\n')
+        self._count = 0
+        self._pid = os.getpid()
+        atexit.register(self.close)
+
+    def emit(self, span):
+        args = dict(span.attributes, trace_id=span.trace_id, span_id=span.span_id)
+        if span.parent_id:
+            args['parent_id'] = span.parent_id
+        if span.error:
+            args['error'] = span.error
+        event = json.dumps({
+            'name': span.name,
+            'cat': 'canari',
+            'ph': 'X',
+            'ts': span.start * 1e6,
+            'dur': span.duration * 1e6,
+            'pid': self._pid,
+            'tid': span.thread,
+            'args': args
+        }, default=str)
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(',\n' + event if self._count else event)
+            self._count += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.write('\n]\n')
+                self._file.close()
+                self._file = None
+
+
+_sink = NullSink()
+
+
+def get_sink():
+    return _sink
+
+
+def set_sink(sink):
+    """Sets the sink that receives spans and returns the previous one. Passing None disables tracing."""
+    global _sink
+    previous = _sink
+    _sink = sink or NullSink()
+    return previous
+
+
+def sink_from_config(config):
+    """Creates a sink using the following options in the [canari.remote] section of config:
+
+    - trace_sink: "none" (default), "memory" (RingBufferSink), "chrome" (ChromeTraceSink) or the dotted path of a Sink
+      class that takes no arguments.
+    - trace_buffer: the number of spans kept by the memory sink (default: 1024).
+    - trace_file: the file written by the chrome sink (default: canari-trace.json).
+    """
+    kind = config['canari.remote.trace_sink'] if 'canari.remote.trace_sink' in config else None
+    kind = kind or 'none'
+    if kind == 'none':
+        return NullSink()
+    elif kind == 'memory':
+        return RingBufferSink(int(config['canari.remote.trace_buffer'])
+                              if 'canari.remote.trace_buffer' in config else 1024)
+    elif kind == 'chrome':
+        return ChromeTraceSink(config['canari.remote.trace_file']
+                               if 'canari.remote.trace_file' in config else 'canari-trace.json')
+    module, _, name = kind.rpartition('.')
+    if not module:
+        raise ValueError('Invalid trace sink %r.' % kind)
+    return getattr(import_module(module), name)()
+
+
+def new_trace_id():
+    return uuid.uuid4().hex
+
+
+def parse_trace_id(value):
+    """Returns the trace ID in the value of an X-Canari-Trace-Id header or None if it isn't a valid trace ID."""
+    if value and trace_id_matcher.match(value):
+        return value
+    return None
+
+
+# Each thread has a stack of (trace ID, span ID) tuples. The top of the stack is the current trace and span. The stacks
+# are immutable so that they can be kept in a context variable where available, which gives each task running on an
+# event loop (which all share the loop's thread) a stack of its own.
+if contextvars is not None:
+    _context_stack = contextvars.ContextVar('canari_trace_stack', default=())
+
+    def _stack():
+        return _context_stack.get()
+
+    def _push(context):
+        _context_stack.set(_context_stack.get() + (context,))
+
+    def _pop():
+        _context_stack.set(_context_stack.get()[:-1])
+else:
+    _local = threading.local()
+
+    def _stack():
+        return getattr(_local, 'stack', ())
+
+    def _push(context):
+        _local.stack = _stack() + (context,)
+
+    def _pop():
+        _local.stack = _stack()[:-1]
+
+
+def current_trace_id():
+    stack = _stack()
+    return stack[-1][0] if stack else None
+
+
+def current_context():
+    """Returns the (trace ID, span ID) of the current thread's trace or None."""
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+class attach(object):
+    """Makes context, a (trace ID, span ID) tuple returned by current_context(), the current context for the duration
+    of the with block."""
+
+    __slots__ = ('context',)
+
+    def __init__(self, context):
+        self.context = context
+
+    def __enter__(self):
+        if self.context is not None:
+            _push(self.context)
+        return self.context
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.context is not None:
+            _pop()
+
+
+def trace(trace_id=None):
+    """Starts a trace with trace_id (a new one if not specified) for the duration of the with block. Spans started
+    within the block belong to the trace."""
+    return attach((trace_id or new_trace_id(), None))
+
+
+def bind(func):
+    """Returns a wrapper for func that runs it in the current context, no matter which thread calls it."""
+    context = current_context()
+
+    def wrapper(*args, **kwargs):
+        with attach(context):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class _NoopSpan(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def set(self, **attributes):
+        pass
+
+
+_noop = _NoopSpan()
+
+
+class _SpanContext(object):
+    __slots__ = ('span', '_start')
+
+    def __init__(self, name, attributes):
+        self.span = Span(name, None, attributes=attributes)
+
+    def __enter__(self):
+        span = self.span
+        stack = _stack()
+        if stack:
+            span.trace_id, span.parent_id = stack[-1]
+        else:
+            span.trace_id = new_trace_id()
+        _push((span.trace_id, span.span_id))
+        span.start = time.time()
+        self._start = default_timer()
+        return span
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        span = self.span
+        span.duration = default_timer() - self._start
+        _pop()
+        if exc_type is not None and issubclass(exc_type, Exception):
+            span.error = exc_type.__name__
+        _sink.emit(span)
+
+
+def span(name, **attributes):
+    """Returns a context manager that records a span named name around the with block. The span becomes a child of the
+    current span and starts a new trace if there is none. The Span is returned by the with statement so that more
+    attributes can be set using Span.set()."""
+    if not _sink.enabled:
+        return _noop
+    return _SpanContext(name, attributes)
+
+
+def emit(name, start, duration, context=None, **attributes):
+    """Records a span that has already finished. Useful for operations that don't fit in a with block (i.e. streaming
+    responses). context is the (trace ID, span ID) of the parent and defaults to the current context."""
+    if not _sink.enabled:
+        return
+    context = context or current_context() or (new_trace_id(), None)
+    s = Span(name, context[0], context[1], attributes)
+    s.start = start
+    s.duration = duration
+    _sink.emit(s)
+
+
+class Profiler(object):
+    """A sampling profiler that records the call stack of a thread (the calling thread by default) every interval
+    seconds. The samples can be written as folded stacks, the input format of flamegraph.pl, inferno and speedscope.
+
+        with Profiler() as p:
+            ...
+        p.write('profile.folded')
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.samples = Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        if self.thread_id is None:
+            self.thread_id = threading.current_thread().ident
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='canari-profiler')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        me = threading.current_thread().ident
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or self.thread_id == me:
+                continue
+            self.sample(frame)
+
+    def sample(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append('%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+            frame = frame.f_back
+        self.samples[';'.join(reversed(stack))] += 1
+
+    def folded(self):
+        """Returns the samples as folded stacks, one "frame;frame;... count" line per unique stack."""
+        return ''.join('%s %d\n' % (s, c) for s, c in sorted(self.samples.items()))
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            f.write(self.folded())
@@ -0,0 +1,264 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from six import text_type
+from six.moves.urllib import parse
+
+from canari.mode import is_local_exec_mode
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'MemoryCache',
+    'SQLiteCache',
+    'RedisCache',
+    'RedisError',
+    'cache_from_uri',
+    'get_default_cache'
+]
+
+
+def _to_bytes(value):
+    return value.encode('utf-8') if isinstance(value, text_type) else value
+
+
+class MemoryCache(object):
+    """A thread-safe, in-process cache that evicts the least recently used entries once it holds max_entries
+    entries."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.time():
+                return None
+            # Re-insert to mark the entry as the most recently used
+            self._entries[key] = entry
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (_to_bytes(value), time.time() + ttl if ttl else None)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache(object):
+    """A cache stored in an SQLite database file which makes it suitable for sharing results across local transform
+    executions. Expired entries are purged periodically."""
+
+    purge_interval = 300
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._last_purge = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with self._connection() as c:
+            c.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires REAL)')
+
+    def _connection(self):
+        # SQLite connections can't be shared across threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = sqlite3.connect(self.path, timeout=10)
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return bytes(row[0])
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        with self._connection() as c:
+            c.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                (key, sqlite3.Binary(_to_bytes(value)), now + ttl if ttl else None)
+            )
+            if now - self._last_purge > self.purge_interval:
+                self._last_purge = now
+                c.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+
+    def delete(self, key):
+        with self._connection() as c:
+            c.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        with self._connection() as c:
+            c.execute('DELETE FROM cache')
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisCache(object):
+    """A cache backed by a Redis (or Redis protocol compatible) server. This is a minimal RESP client which only
+    implements the handful of commands required for caching so that no additional dependencies are required."""
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, timeout=5, prefix='canari:'):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.prefix = prefix
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), self.timeout)
+        self._local.sock = sock
+        self._local.fp = sock.makefile('rb')
+        if self.password:
+            self._command('AUTH', self.password)
+        if self.db:
+            self._command('SELECT', self.db)
+
+    def _close(self):
+        for attr in ('fp', 'sock'):
+            obj = getattr(self._local, attr, None)
+            if obj is not None:
+                try:
+                    obj.close()
+                except (IOError, OSError, socket.error):
+                    pass
+                setattr(self._local, attr, None)
+
+    def _read_reply(self):
+        line = self._local.fp.readline()
+        if not line.endswith(b'\r\n'):
+            raise EOFError('Connection closed by server.')
+        kind, data = line[:1], line[1:-2]
+        if kind == b'+':
+            return data
+        elif kind == b'-':
+            raise RedisError(data.decode('utf-8', 'replace'))
+        elif kind == b':':
+            return int(data)
+        elif kind == b'$':
+            n = int(data)
+            if n < 0:
+                return None
+            value = self._local.fp.read(n + 2)
+            return value[:-2]
+        elif kind == b'*':
+            n = int(data)
+            return None if n < 0 else [self._read_reply() for _ in range(n)]
+        raise RedisError('Unexpected reply type %r.' % kind)
+
+    def _command(self, *args):
+        data = [b'*%d\r\n' % len(args)]
+        for a in args:
+            a = _to_bytes(a if isinstance(a, (bytes, text_type)) else str(a))
+            data.append(b'$%d\r\n' % len(a))
+            data.append(a)
+            data.append(b'\r\n')
+        self._local.sock.sendall(b''.join(data))
+        return self._read_reply()
+
+    def execute(self, *args):
+        """Sends a command to the server and returns its reply. Broken connections are re-established once."""
+        for attempt in (0, 1):
+            if getattr(self._local, 'sock', None) is None:
+                self._connect()
+            try:
+                return self._command(*args)
+            except (IOError, OSError, socket.error, EOFError):
+                self._close()
+                if attempt:
+                    raise
+
+    def get(self, key):
+        return self.execute('GET', self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self.execute('SET', self.prefix + key, _to_bytes(value), 'PX', int(ttl * 1000))
+        else:
+            self.execute('SET', self.prefix + key, _to_bytes(value))
+
+    def delete(self, key):
+        self.execute('DEL', self.prefix + key)
+
+    def close(self):
+        self._close()
+
+
+def cache_from_uri(uri):
+    """Creates a cache backend from a URI of the form:
+
+    - memory://?max_entries=1024
+    - sqlite:///path/to/cache.db
+    - redis://[:password@]host[:port][/db]
+    """
+    u = parse.urlparse(uri)
+    query = dict(parse.parse_qsl(u.query))
+    if u.scheme == 'memory':
+        return MemoryCache(int(query.get('max_entries', 1024)))
+    elif u.scheme == 'sqlite':
+        return SQLiteCache(os.path.expanduser(u.netloc + u.path))
+    elif u.scheme == 'redis':
+        return RedisCache(
+            host=u.hostname or 'localhost',
+            port=u.port or 6379,
+            db=int(u.path.strip('/') or 0),
+            password=parse.unquote(u.password) if u.password else None,
+            prefix=query.get('prefix', 'canari:')
+        )
+    raise ValueError('Unsupported cache URI %r.' % uri)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Returns the default cache backend. The backend can be specified using the CANARI_CACHE environment variable
+    (see cache_from_uri()). Otherwise, local transforms, which run in a new process each time, share an SQLite cache
+    in ~/.canari/cache.db while remote transforms use an in-memory cache."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            uri = os.environ.get('CANARI_CACHE')
+            if uri:
+                _default_cache = cache_from_uri(uri)
+            elif is_local_exec_mode():
+                _default_cache = SQLiteCache(os.path.join(os.path.expanduser('~'), '.canari', 'cache.db'))
+            else:
+                _default_cache = MemoryCache()
+        return _default_cache
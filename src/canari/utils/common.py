@@ -1,6 +1,5 @@
 import sys
 import os
-from distutils.spawn import find_executable
 
 __author__ = 'Nadeem Douba'
 __copyright__ = 'Copyright 2012, Canari Project'
@@ -15,6 +14,7 @@ __status__ = 'Development'
 __all__ = [
     'find_pysudo',
     'find_dispatcher',
+    'find_worker_dispatcher',
     'find_canari'
 ]
 
@@ -24,6 +24,8 @@ bin_dir = os.path.dirname(sys.executable)
 def find_script(name):
     exe = os.path.join(bin_dir, name)
     if not os.path.lexists(exe):
+        # distutils is slow to import and is only needed when the script isn't installed alongside the interpreter.
+        from distutils.spawn import find_executable
         return find_executable(name)
     return exe
 
@@ -32,6 +34,10 @@ def find_dispatcher():
     return find_script('dispatcher')
 
 
+def find_worker_dispatcher():
+    return find_script('worker-dispatcher')
+
+
 def find_canari():
     return find_script('canari')
 
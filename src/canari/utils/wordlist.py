@@ -1,6 +1,12 @@
 from six import string_types
-from six.moves.urllib import request
+from six.moves.urllib import request, parse, error
 
+from bisect import bisect_left
+import codecs
+import hashlib
+import io
+import json
+import os
 import zlib
 import re
 
@@ -15,15 +21,289 @@ __email__ = 'ndouba@redcanari.com'
 __status__ = 'Development'
 
 __all__ = [
-    'wordlist'
+    'wordlist',
+    'iter_lines',
+    'get_cache_dir',
+    'SortedWordList',
+    'WordTrie'
 ]
 
+_chunk_size = 64 * 1024
 
-def wordlist(uri, match='(.+?)[\n\r]*', ignore='^\s*#.*', strip=None, decompressor=None):
+
+def get_cache_dir():
+    """Returns the directory where downloaded wordlists are cached. Can be overridden using the CANARI_WORDLIST_CACHE
+    environment variable."""
+    return os.environ.get('CANARI_WORDLIST_CACHE') or os.path.join(os.path.expanduser('~'), '.canari', 'wordlists')
+
+
+class SortedWordList(object):
+    """An immutable, de-duplicated and sorted sequence of words. Membership and prefix lookups are performed using a
+    binary search which makes this a lot more compact than a set for large wordlists."""
+
+    def __init__(self, words=()):
+        self._words = tuple(sorted(set(words)))
+
+    def __contains__(self, word):
+        i = bisect_left(self._words, word)
+        return i != len(self._words) and self._words[i] == word
+
+    def __iter__(self):
+        return iter(self._words)
+
+    def __len__(self):
+        return len(self._words)
+
+    def __getitem__(self, i):
+        return self._words[i]
+
+    def startswith(self, prefix):
+        """Returns an iterator over all the words that start with prefix in lexicographical order."""
+        words = self._words
+        for i in range(bisect_left(words, prefix), len(words)):
+            if not words[i].startswith(prefix):
+                break
+            yield words[i]
+
+
+class WordTrie(object):
+    """A prefix tree of words for fast prefix queries."""
+
+    _end = ''
+
+    def __init__(self, words=()):
+        self._root = {}
+        self._len = 0
+        for w in words:
+            self.add(w)
+
+    def add(self, word):
+        node = self._root
+        for c in word:
+            node = node.setdefault(c, {})
+        if self._end not in node:
+            node[self._end] = True
+            self._len += 1
+
+    def _find(self, prefix):
+        node = self._root
+        for c in prefix:
+            node = node.get(c)
+            if node is None:
+                return None
+        return node
+
+    def __contains__(self, word):
+        node = self._find(word)
+        return node is not None and self._end in node
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return self.startswith('')
+
+    def has_prefix(self, prefix):
+        return self._find(prefix) is not None
+
+    def startswith(self, prefix):
+        """Returns an iterator over all the words that start with prefix in lexicographical order."""
+        node = self._find(prefix)
+        if node is None:
+            return
+        stack = [(prefix, node)]
+        while stack:
+            word, node = stack.pop()
+            if self._end in node:
+                yield word
+            for c in sorted((k for k in node if k), reverse=True):
+                stack.append((word + c, node[c]))
+
+
+_backends = {
+    None: list,
+    'list': list,
+    'set': frozenset,
+    'sorted': SortedWordList,
+    'trie': WordTrie
+}
+
+
+def _iter_decompressed(fp, gz):
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gz else None
+    while True:
+        data = fp.read(_chunk_size)
+        if not data:
+            break
+        if decompressor:
+            data = decompressor.decompress(data)
+        if data:
+            yield data
+    if decompressor:
+        data = decompressor.flush()
+        if data:
+            yield data
+
+
+def _iter_lines(chunks, encoding='utf-8'):
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    remainder = u''
+    for chunk in chunks:
+        lines = (remainder + decoder.decode(chunk)).split(u'\n')
+        remainder = lines.pop()
+        for l in lines:
+            yield l.rstrip(u'\r')
+    remainder += decoder.decode(b'', final=True)
+    if remainder:
+        yield remainder.rstrip(u'\r')
+
+
+def iter_lines(uri, encoding='utf-8'):
+    """Generator that streams the lines of the resource located at uri without reading the whole resource into memory.
+    Resources ending in .gz or .gzip are decompressed on the fly."""
+    fp = request.urlopen(uri)
+    try:
+        for l in _iter_lines(_iter_decompressed(fp, uri.endswith(('.gz', '.gzip'))), encoding):
+            yield l
+    finally:
+        fp.close()
+
+
+def _filter_words(words, ignore, strip):
+    if ignore:
+        if isinstance(ignore, string_types):
+            ignore = re.compile(ignore).search
+        words = (w for w in words if not ignore(w) and w)
+    if strip:
+        if isinstance(strip, string_types):
+            strip = re.compile(strip).sub
+        words = (strip('', w) for w in words)
+    return words
+
+
+def _local_path(uri):
+    u = parse.urlparse(uri)
+    if u.scheme == 'file':
+        return request.url2pathname(u.path)
+    return None
+
+
+def _cache_paths(uri, ignore, strip):
+    key = hashlib.sha1(json.dumps([uri, ignore, strip]).encode('utf-8')).hexdigest()
+    path = os.path.join(get_cache_dir(), key)
+    return path + '.txt', path + '.json'
+
+
+def _load_cache_info(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _iter_cached(path):
+    with io.open(path, encoding='utf-8', newline='\n') as f:
+        for l in f:
+            yield l[:-1] if l.endswith(u'\n') else l
+
+
+def _write_cache(words, data_path, info_path, info):
+    directory = os.path.dirname(data_path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    tmp = '%s.%d.tmp' % (data_path, os.getpid())
+    try:
+        with io.open(tmp, 'w', encoding='utf-8', newline='\n') as f:
+            for w in words:
+                f.write(w)
+                f.write(u'\n')
+                yield w
+    except BaseException:
+        os.remove(tmp)
+        raise
+    # Invalidate the old validators before replacing the cached words.
+    if os.path.exists(info_path):
+        os.remove(info_path)
+    if os.name != 'posix' and os.path.exists(data_path):
+        os.remove(data_path)
+    os.rename(tmp, data_path)
+    with open(info_path, 'w') as f:
+        json.dump(info, f)
+
+
+def _cached_words(uri, ignore, strip):
+    data_path, info_path = _cache_paths(uri, ignore, strip)
+    info = _load_cache_info(info_path) if os.path.exists(data_path) else None
+    local_path = _local_path(uri)
+
+    if local_path is not None:
+        # Local files are validated against their modification time and size.
+        st = os.stat(local_path)
+        validator = {'uri': uri, 'mtime': st.st_mtime, 'size': st.st_size}
+        if info == validator:
+            return _iter_cached(data_path)
+        fp = request.urlopen(uri)
+    else:
+        # Remote resources are validated using a conditional GET request.
+        headers = {}
+        if info:
+            if info.get('etag'):
+                headers['If-None-Match'] = info['etag']
+            if info.get('last_modified'):
+                headers['If-Modified-Since'] = info['last_modified']
+        try:
+            fp = request.urlopen(request.Request(uri, headers=headers))
+        except error.HTTPError as e:
+            if e.code == 304 and info:
+                return _iter_cached(data_path)
+            raise
+        validator = {'uri': uri, 'etag': fp.info().get('ETag'), 'last_modified': fp.info().get('Last-Modified')}
+
+    def iter_words():
+        try:
+            chunks = _iter_decompressed(fp, uri.endswith(('.gz', '.gzip')))
+            for w in _filter_words(_iter_lines(chunks), ignore, strip):
+                yield w
+        finally:
+            fp.close()
+
+    return _write_cache(iter_words(), data_path, info_path, validator)
+
+
+def wordlist(uri, match=None, ignore=r'^\s*#.*', strip=None, decompressor=None, cache=None, backend=None):
+    """Loads a list of words from the resource located at uri. By default, each line in the resource is considered a
+    word and the resource is streamed line by line; resources ending in .gz or .gzip are decompressed on the fly.
+
+    :param uri: the URI of the wordlist. If uri is not a string it is returned as is.
+    :param match: a regular expression or a callable accepting the raw data that extracts the words from the
+                  resource. Specifying match (or decompressor) loads the whole resource into memory.
+    :param ignore: a regular expression or a callable. Words that it matches are skipped along with empty words.
+    :param strip: a regular expression or a callable used to remove unwanted substrings from each word.
+    :param decompressor: a callable that decompresses the raw data.
+    :param cache: whether the processed wordlist should be cached on disk (see get_cache_dir()). Cached wordlists are
+                  revalidated using the resource's ETag and Last-Modified headers or, for file:// URIs, its modification
+                  time and size. Defaults to True for remote resources and False for local ones. Only line based
+                  wordlists with string (or no) ignore and strip expressions can be cached.
+    :param backend: the type of the returned collection: 'list' (default), 'set' (a frozenset), 'sorted' (a
+                    SortedWordList), or 'trie' (a WordTrie).
+    """
     if isinstance(uri, string_types):
-        words = []
+        if backend not in _backends:
+            raise ValueError('Unknown wordlist backend %r, expected one of %s.' % (
+                backend, ', '.join(repr(b) for b in _backends if b)))
+        backend = _backends[backend]
         if not uri:
-            return words
+            return backend()
+
+        if match is None and decompressor is None:
+            if cache is None:
+                cache = _local_path(uri) is None
+            if cache and not callable(ignore) and not callable(strip):
+                return backend(_cached_words(uri, ignore, strip))
+            return backend(_filter_words(iter_lines(uri), ignore, strip))
+
+        words = []
         data = request.urlopen(uri).read()
 
         if decompressor:
@@ -35,14 +315,10 @@ def wordlist(uri, match='(.+?)[\n\r]*', ignore='^\s*#.*', strip=None, decompress
             if callable(match):
                 words = match(data)
             else:
-                words = re.findall(match, data.decode('utf-8'))
-                if ignore:
-                    if isinstance(ignore, str):
-                        ignore = re.compile(ignore).search
-                    words = [w for w in words if not ignore(w) and w]
-                if strip:
-                    if isinstance(strip, str):
-                        strip = re.compile(strip).sub
-                    words = [strip('', w) for w in words]
-        return words
+                if match is None:
+                    words = data.decode('utf-8').splitlines()
+                else:
+                    words = re.findall(match, data.decode('utf-8'))
+                words = list(_filter_words(words, ignore, strip))
+        return backend(words)
     return uri
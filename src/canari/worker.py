@@ -0,0 +1,254 @@
+from __future__ import print_function
+
+import array
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'get_socket_path',
+    'is_supported',
+    'serve',
+    'dispatch'
+]
+
+# This module is imported by the worker-dispatcher script on every transform execution so keep the top-level imports
+# limited to the standard library. Everything else is imported by the worker process itself.
+
+_int = struct.Struct('!i')
+_length = struct.Struct('!I')
+_stdio = (0, 1, 2)
+
+
+def get_socket_path():
+    """Returns the path of the worker's Unix domain socket. Can be overridden using the CANARI_WORKER_SOCKET environment
+    variable."""
+    return os.environ.get('CANARI_WORKER_SOCKET') or os.path.join(os.path.expanduser('~'), '.canari', 'worker.sock')
+
+
+def is_supported():
+    """The worker relies on Unix domain sockets and file descriptor passing (Python 3.3+)."""
+    return hasattr(socket, 'AF_UNIX') and hasattr(socket.socket, 'sendmsg')
+
+
+def _recv_exactly(sock, n):
+    data = b''
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise EOFError('Connection closed prematurely.')
+        data += chunk
+    return data
+
+
+def _send_request(sock, header):
+    data = json.dumps(header).encode('utf-8')
+    data = _length.pack(len(data)) + data
+    fds = array.array('i', _stdio)
+    sent = sock.sendmsg([data], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds.tobytes())])
+    if sent < len(data):
+        sock.sendall(data[sent:])
+
+
+def _recv_request(sock):
+    fds = array.array('i')
+    data, ancdata, _, _ = sock.recvmsg(4096, socket.CMSG_SPACE(len(_stdio) * fds.itemsize))
+    for level, type_, cmsg_data in ancdata:
+        if level == socket.SOL_SOCKET and type_ == socket.SCM_RIGHTS:
+            fds.frombytes(cmsg_data[:len(cmsg_data) - (len(cmsg_data) % fds.itemsize)])
+    if len(fds) != len(_stdio):
+        for fd in fds:
+            os.close(fd)
+        raise ValueError('Expected %d file descriptors got %d.' % (len(_stdio), len(fds)))
+    if len(data) < _length.size:
+        data += _recv_exactly(sock, _length.size - len(data))
+    n = _length.unpack(data[:_length.size])[0]
+    data = data[_length.size:]
+    if len(data) < n:
+        data += _recv_exactly(sock, n - len(data))
+    return json.loads(data.decode('utf-8')), list(fds)
+
+
+def _exit_code(code):
+    if code is None:
+        return 0
+    elif isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+if is_supported():
+    import socketserver
+
+    class _WorkerRequestHandler(socketserver.BaseRequestHandler):
+
+        def handle(self):
+            # We are in a freshly forked child at this point so we're free to mangle our process state.
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            header, fds = _recv_request(self.request)
+            self.request.sendall(_int.pack(os.getpid()))
+
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for target, fd in zip(_stdio, fds):
+                os.dup2(fd, target)
+                os.close(fd)
+            sys.stdin, sys.stdout, sys.stderr = sys.__stdin__, sys.__stdout__, sys.__stderr__
+
+            os.environ.clear()
+            os.environ.update(header['env'])
+            os.chdir(header['cwd'])
+            sys.argv = header['argv']
+
+            try:
+                code = _exit_code(self.server.run(sys.argv))
+            except SystemExit as e:
+                code = _exit_code(e.code)
+            except Exception:
+                import traceback
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+
+            self.request.sendall(_int.pack(code))
+
+    class WorkerServer(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+        """A pre-forking Unix domain socket server that keeps Canari, its configuration and the transform packages
+        loaded in memory. Each request is handled in a forked child process which inherits the client's stdin, stdout
+        and stderr, so transform output and progress messages are written directly to Maltego."""
+
+        def __init__(self, path, context, packages=None):
+            self.context = context
+            self.packages = packages or []
+            self._config_mtime = None
+            self._preload()
+            directory = os.path.dirname(path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory, 0o700)
+            if os.path.lexists(path):
+                os.unlink(path)
+            # The socket is created with owner-only permissions so that other users never get a chance to connect
+            umask = os.umask(0o177)
+            try:
+                socketserver.UnixStreamServer.__init__(self, path, _WorkerRequestHandler)
+            finally:
+                os.umask(umask)
+
+        def _preload(self):
+            # Pull in the modules used by the dispatcher so that forked children don't have to.
+            from canari.commands.common import fix_pypath
+            from canari.commands.run_transform import run_transform  # noqa
+            from canari.entrypoints import dispatcher
+            from canari.pkgutils.transform import TransformDistribution
+
+            fix_pypath()
+            self.dispatcher = dispatcher
+            self._refresh_config()
+
+            for package in self.packages:
+                print('Loading transform package %r...' % package, file=sys.stderr)
+                for transform in TransformDistribution(package).transforms:
+                    print('Loaded transform %r' % transform.name, file=sys.stderr)
+
+        def _refresh_config(self):
+            try:
+                mtime = os.stat(self.context.config_file).st_mtime
+            except OSError:
+                mtime = None
+            if mtime != self._config_mtime:
+                self._config_mtime = mtime
+                self.context.reload_config()
+
+        def process_request(self, request, client_address):
+            # Reload the configuration in the parent process so that all subsequent children inherit the changes.
+            self._refresh_config()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            socketserver.ForkingMixIn.process_request(self, request, client_address)
+
+        def run(self, argv):
+            return self.dispatcher.main(
+                args=argv[1:],
+                prog_name=os.path.basename(argv[0]),
+                obj=self.context,
+                auto_envvar_prefix='CANARI'
+            )
+
+        def server_close(self):
+            socketserver.UnixStreamServer.server_close(self)
+            if os.path.lexists(self.server_address):
+                os.unlink(self.server_address)
+
+
+def serve(context, packages=None, path=None):
+    """Starts a worker listening on path (default: get_socket_path()) until it is interrupted."""
+    if not is_supported():
+        raise RuntimeError('The Canari worker requires Python 3 and Unix domain socket support.')
+    path = path or get_socket_path()
+    server = WorkerServer(path, context, packages)
+    print('Canari worker listening on %s...' % path, file=sys.stderr)
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _forward_to_worker(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        _send_request(sock, {'argv': sys.argv, 'env': dict(os.environ), 'cwd': os.getcwd()})
+        pid = _int.unpack(_recv_exactly(sock, _int.size))[0]
+    except (socket.error, EOFError):
+        sock.close()
+        return None
+
+    def forward_signal(signum, frame):
+        try:
+            os.kill(pid, signum)
+        except OSError:
+            pass
+
+    signal.signal(signal.SIGTERM, forward_signal)
+    signal.signal(signal.SIGINT, forward_signal)
+
+    try:
+        return _int.unpack(_recv_exactly(sock, _int.size))[0]
+    except (socket.error, EOFError):
+        return 1
+    finally:
+        sock.close()
+
+
+def dispatch():
+    """Entry point for the worker-dispatcher script. Forwards the transform execution request to the worker if one is
+    running, otherwise the transform is executed in-process by the regular dispatcher."""
+    path = get_socket_path()
+    if is_supported() and os.path.exists(path):
+        code = _forward_to_worker(path)
+        if code is not None:
+            sys.exit(code)
+
+    from canari.entrypoints import dispatcher
+    os.environ.setdefault('TERM', 'dumb')
+    dispatcher(auto_envvar_prefix='CANARI')
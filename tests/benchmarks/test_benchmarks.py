@@ -0,0 +1,28 @@
+"""
+pytest-benchmark flavour of the canari.benchmark suite. These are skipped unless pytest-benchmark is installed. Use
+pytest's --benchmark-save and --benchmark-compare options to keep and compare baselines, or the `canari benchmark`
+command for the full range of corpus sizes.
+"""
+import pytest
+
+from canari.benchmark import iter_cases
+
+pytest.importorskip('pytest_benchmark')
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+cases = list(iter_cases(entities=(1, 100), fields=(0, 10)))
+
+
+@pytest.mark.parametrize('name,case,entities,fields', cases, ids=[c[0] for c in cases])
+def test_benchmark(benchmark, name, case, entities, fields):
+    benchmark.group = case.name
+    benchmark(case.setup(entities, fields))
@@ -0,0 +1,87 @@
+import asyncio
+from unittest import TestCase
+
+from canari.maltego.aio import is_async_transform, run_until_complete
+from canari.maltego.entities import Phrase
+from canari.maltego.message import MaltegoTransformResponseMessage, MaltegoTransformRequestMessage, UIMessage, Limits
+from canari.maltego.runner import scriptable_transform_runner
+from canari.maltego.transform import Transform
+from canari.maltego.utils import to_response
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'AsyncTransformTests'
+]
+
+
+class AsyncTransform(Transform):
+    input_type = Phrase
+
+    async def do_transform(self, request, response, config):
+        await asyncio.sleep(0)
+        return response + Phrase(request.entity.value.upper())
+
+
+class AsyncGeneratorTransform(Transform):
+    input_type = Phrase
+
+    async def do_transform(self, request, response, config):
+        response += UIMessage('started')
+        for i in range(3):
+            await asyncio.sleep(0)
+            yield Phrase('%s%d' % (request.entity.value, i))
+
+
+class AsyncTransformTests(TestCase):
+
+    def request(self, value):
+        request = MaltegoTransformRequestMessage()
+        request._entities = [Phrase(value).__entity__]
+        return request
+
+    def test_is_async_transform(self):
+        self.assertTrue(is_async_transform(AsyncTransform))
+        self.assertTrue(is_async_transform(AsyncGeneratorTransform))
+        self.assertFalse(is_async_transform(Transform))
+
+    def test_to_response(self):
+        response = MaltegoTransformResponseMessage()
+        msg = to_response(AsyncGeneratorTransform().do_transform(self.request('x'), response, None), response)
+        self.assertIs(msg, response)
+        self.assertEqual(['x0', 'x1', 'x2'], [e.value for e in msg.entities])
+        self.assertEqual(['started'], [m.message for m in msg.messages])
+
+    def test_hard_limit(self):
+        response = MaltegoTransformResponseMessage().apply_limits(Limits(hard=2), enforce=True)
+        msg = to_response(AsyncGeneratorTransform().do_transform(self.request('x'), response, None), response)
+        self.assertIs(msg, response)
+        self.assertEqual(['x0', 'x1'], [e.value for e in msg.entities])
+
+    def test_scriptable_runner(self):
+        r = scriptable_transform_runner(AsyncTransform, 'foo', {}, [], None)
+        self.assertEqual(['FOO'], [e.value for e in r.entities])
+        r = scriptable_transform_runner(AsyncGeneratorTransform, 'foo', {}, [], None)
+        self.assertEqual(['foo0', 'foo1', 'foo2'], [e.value for e in r.entities])
+
+    def test_running_loop(self):
+        # Transforms invoked from within a coroutine are run on a separate thread instead of the running loop
+        async def main():
+            response = MaltegoTransformResponseMessage()
+            msg = AsyncTransform().do_transform(self.request('x'), response, None)
+            return run_until_complete(msg, response)
+
+        loop = asyncio.new_event_loop()
+        try:
+            msg = loop.run_until_complete(main())
+        finally:
+            loop.close()
+        self.assertEqual(['X'], [e.value for e in msg.entities])
@@ -0,0 +1,24 @@
+import sys
+from unittest import TestCase, skipUnless
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'AsyncTransformTests'
+]
+
+# The tests are written with async def so they live in a module that isn't imported (or discovered) on Python 2
+if sys.version_info >= (3, 6):
+    from tests.maltego.aio_cases import AsyncTransformTests
+else:
+    @skipUnless(False, 'async transforms require Python 3.6 or later')
+    class AsyncTransformTests(TestCase):
+        pass
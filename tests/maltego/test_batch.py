@@ -0,0 +1,101 @@
+from unittest import TestCase
+
+from canari.maltego.batch import is_batch_transform, iter_batches, split_request, run_batch, merge_responses
+from canari.maltego.entities import Phrase
+from canari.maltego.message import (MaltegoTransformRequestMessage, MaltegoTransformResponseMessage, MaltegoException,
+                                    Field, Limits, UIMessageType)
+from canari.maltego.runner import batch_transform_runner
+from canari.maltego.transform import Transform
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'BatchTransformTests'
+]
+
+
+class UpperTransform(Transform):
+    input_type = Phrase
+    batch_size = 3
+    batches = []
+
+    def do_transform_batch(self, requests, responses, config):
+        self.batches.append([r.entity.value for r in requests])
+        for request, response in zip(requests, responses):
+            response += Phrase(request.entity.value.upper())
+        if requests[0].entity.value == 'bad':
+            responses[0] = 'bad input'
+        return responses
+
+
+class SingleTransform(Transform):
+    input_type = Phrase
+
+    def do_transform(self, request, response, config):
+        return response + Phrase(request.entity.value)
+
+
+class BatchTransformTests(TestCase):
+    def setUp(self):
+        UpperTransform.batches = []
+
+    def request(self, *values):
+        request = MaltegoTransformRequestMessage()
+        request += Field(name='foo', value='bar')
+        request += Limits(soft=10)
+        for v in values:
+            request += Phrase(v)
+        return request
+
+    def test_is_batch_transform(self):
+        self.assertTrue(is_batch_transform(UpperTransform))
+        self.assertFalse(is_batch_transform(SingleTransform))
+        self.assertFalse(is_batch_transform(Transform))
+
+    def test_iter_batches(self):
+        self.assertEqual([[0, 1], [2, 3], [4]], list(iter_batches(range(5), 2)))
+        self.assertEqual([], list(iter_batches([], 2)))
+
+    def test_split_request(self):
+        requests = split_request(self.request('a', 'b'))
+        self.assertEqual(['a', 'b'], [r.entity.value for r in requests])
+        self.assertEqual([1, 1], [len(r.entities) for r in requests])
+        self.assertEqual('bar', requests[1].settings['foo'])
+        self.assertEqual(10, requests[1].limits.soft)
+
+    def test_run_batch(self):
+        results = run_batch(UpperTransform(), split_request(self.request('a', 'b', 'c', 'bad', 'e')), None)
+        self.assertEqual([['a', 'b', 'c'], ['bad', 'e']], UpperTransform.batches)
+        self.assertIsInstance(results[3], MaltegoException)
+        self.assertEqual(['A', 'B', 'C', 'E'], [r.entities[0].value for i, r in enumerate(results) if i != 3])
+
+        response = merge_responses(results)
+        self.assertEqual(['A', 'B', 'C', 'E'], [e.value for e in response.entities])
+        self.assertEqual([(UIMessageType.Partial, 'bad input')], [(m.type, m.message) for m in response.messages])
+
+    def test_do_transform_falls_back_to_batch(self):
+        request = split_request(self.request('a'))[0]
+        response = UpperTransform().do_transform(request, MaltegoTransformResponseMessage(), None)
+        self.assertEqual(['A'], [e.value for e in response.entities])
+        self.assertEqual([['a']], UpperTransform.batches)
+
+        request = split_request(self.request('bad'))[0]
+        self.assertRaises(MaltegoException, UpperTransform().do_transform, request, MaltegoTransformResponseMessage(),
+                          None)
+
+    def test_batch_transform_runner(self):
+        inputs = [('a', {}), ('b', {}), ('c', {}), ('d', {})]
+        results = batch_transform_runner(UpperTransform, inputs, [], None, batch_size=2)
+        self.assertEqual([['a', 'b'], ['c', 'd']], UpperTransform.batches)
+        self.assertEqual(['A', 'B', 'C', 'D'], [r.entities[0].value for r in results])
+
+        results = batch_transform_runner(SingleTransform, inputs, [], None)
+        self.assertEqual(['a', 'b', 'c', 'd'], [r.entities[0].value for r in results])
@@ -0,0 +1,124 @@
+import threading
+from unittest import TestCase
+
+import six
+from six.moves.BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from six.moves.socketserver import ThreadingMixIn
+
+from canari import tracing
+from canari.maltego.client import RemoteTransformClient
+from canari.maltego.codec import get_codec, codec_for_content_type
+from canari.maltego.entities import Phrase
+from canari.maltego.message import (MaltegoTransformResponseMessage, MaltegoTransformExceptionMessage, MaltegoException,
+                                    Field)
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'RemoteTransformClientTests'
+]
+
+
+class TransformHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        codec = codec_for_content_type(self.headers.get('Content-Type'))
+        self.server.trace_ids.append(self.headers.get(tracing.TRACE_HEADER))
+        request = codec.loads_request(self.rfile.read(int(self.headers.get('Content-Length'))))
+        if self.path == '/missing':
+            self._send(404, b'Not found', 'text/plain')
+        elif request.entity.value == 'fail':
+            self._send(200, codec.dumps(MaltegoTransformExceptionMessage(exceptions=[MaltegoException('failed')])),
+                       codec.content_type)
+        else:
+            response = MaltegoTransformResponseMessage()
+            response += Phrase(request.entity.value.upper())
+            response += Phrase(request.settings.get('suffix', ''))
+            self._send(200, codec.dumps(response), codec.content_type)
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TransformServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    trace_ids = []
+
+
+class RemoteTransformClientTests(TestCase):
+
+    def setUp(self):
+        self.server = TransformServer(('127.0.0.1', 0), TransformHandler)
+        self.server.trace_ids = []
+        threading.Thread(target=self.server.serve_forever).start()
+        self.host = '127.0.0.1:%d' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_keep_alive(self):
+        with RemoteTransformClient(self.host, codec='json') as client:
+            for i in range(5):
+                response = client.run('/echo', [Phrase('a%d' % i)], [Field('suffix', 'x')])
+                self.assertEqual(['A%d' % i, 'x'], [e.value for e in response.entities])
+            self.assertEqual((1, 4), (client.pool.created, client.pool.reused))
+
+            r = client.send('missing', [Phrase('a')])
+            self.assertEqual((404, b'Not found'), (r.status, r.data))
+            self.assertRaises(MaltegoException, client.run, 'missing', [Phrase('a')])
+            six.assertRaisesRegex(self, MaltegoException, 'failed', client.run, 'echo', [Phrase('fail')])
+
+    def test_stale_connections_are_retried(self):
+        with RemoteTransformClient(self.host) as client:
+            client.run('echo', [Phrase('a')])
+            # Simulate the server closing the idle connection
+            client.pool._idle[0].sock.close()
+            self.assertEqual(['B', ''], [e.value for e in client.run('echo', [Phrase('b')]).entities])
+            self.assertEqual(2, client.pool.created)
+
+    def test_map(self):
+        values = ['v%d' % i for i in range(20)] + ['fail']
+        with RemoteTransformClient(self.host, codec=get_codec('json'), max_connections=3) as client:
+            results = list(client.map(('echo', [Phrase(v)]) for v in values))
+            self.assertEqual(list(range(len(values))), [i for i, _ in results])
+            self.assertEqual(['V%d' % i for i in range(20)], [r.entities[0].value for _, r in results[:-1]])
+            self.assertIsInstance(results[-1][1], MaltegoException)
+            self.assertLessEqual(client.pool.created, 3)
+
+            unordered = list(client.map((('echo', [Phrase(v)]) for v in values), window=5, ordered=False))
+            self.assertEqual(list(range(len(values))), sorted(i for i, _ in unordered))
+
+    def test_trace_header(self):
+        sink = tracing.RingBufferSink()
+        tracing.set_sink(sink)
+        try:
+            with RemoteTransformClient(self.host) as client, tracing.trace('abc123'):
+                client.run('echo', [Phrase('a')])
+                list(client.map(('echo', [Phrase(v)]) for v in 'bc'))
+            client.run('echo', [Phrase('d')])
+        finally:
+            tracing.set_sink(None)
+
+        # Requests sent from map()'s worker threads are part of the caller's trace
+        self.assertEqual(['abc123'] * 3, self.server.trace_ids[:3])
+        self.assertNotIn(self.server.trace_ids[3], (None, 'abc123'))
+        spans = sink.spans('abc123')
+        self.assertEqual(3, len([s for s in spans if s.name == 'remote_transform']))
+        self.assertEqual({200}, set(s.attributes['status'] for s in spans if s.name == 'remote_transform'))
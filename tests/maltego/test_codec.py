@@ -0,0 +1,127 @@
+import json
+from unittest import TestCase, skipUnless
+
+from safedexml import ParseError
+
+from canari.maltego.codec import (codecs, get_codec, codec_for_content_type, negotiate, message_to_dict,
+                                  message_from_dict, msgpack)
+from canari.maltego.entities import Person, Phrase, Location
+from canari.maltego.message import (MaltegoMessage, MaltegoTransformRequestMessage, MaltegoTransformResponseMessage,
+                                    MaltegoTransformExceptionMessage, MaltegoException, Field, Label, Limits,
+                                    UIMessage, UIMessageType)
+from canari.maltego.parser import LazyMaltegoTransformRequestMessage
+from canari.maltego.renderer import render_message
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'CodecTests'
+]
+
+
+class CodecTests(TestCase):
+
+    def setUp(self):
+        self.request = MaltegoTransformRequestMessage()
+        person = Person('Bob & <Alice>', weight=5)
+        person.firstnames = 'Bob'
+        person += Label('label', '<b>bold</b>')
+        self.request += person
+        self.request += Phrase('second')
+        self.request += Field('api.key', '1234')
+        self.request += Limits(soft=5)
+
+        self.response = MaltegoTransformResponseMessage()
+        self.response += Location('Toronto', latitude=43.7, icon_url='http://localhost/icon.png')
+        self.response += Phrase('phrase', link_label='link')
+        self.response += UIMessage('Oops', type=UIMessageType.Partial)
+
+        self.exception = MaltegoTransformExceptionMessage(exceptions=[MaltegoException('Failed.')])
+
+    def test_round_trip(self):
+        for codec in codecs.values():
+            request = codec.loads_request(codec.dumps(self.request))
+            self.assertIsInstance(request, LazyMaltegoTransformRequestMessage)
+            self.assertEqual(render_message(self.request), render_message(request))
+            self.assertEqual('Bob', request.entity.firstnames)
+            self.assertEqual({'api.key': '1234'}, request.settings)
+            self.assertEqual((5, 10000), (request.limits.soft, request.limits.hard))
+
+            response = codec.loads(codec.dumps(self.response))
+            self.assertIsInstance(response, MaltegoTransformResponseMessage)
+            self.assertEqual(render_message(self.response), render_message(response))
+
+            exception = codec.loads(codec.dumps(MaltegoMessage(message=self.exception)))
+            self.assertEqual(['Failed.'], [str(e) for e in exception.exceptions])
+
+    def test_json_mapping(self):
+        d = json.loads(get_codec('json').dumps(self.response).decode('utf-8'))
+        self.assertEqual({
+            'MaltegoMessage': {
+                'MaltegoTransformResponseMessage': {
+                    'Entities': [
+                        {
+                            'Type': 'maltego.Location',
+                            'Value': 'Toronto',
+                            'Weight': 1,
+                            'IconURL': 'http://localhost/icon.png',
+                            'AdditionalFields': [
+                                {'Name': 'latitude', 'DisplayName': 'Latitude', 'MatchingRule': 'strict',
+                                 'Value': '43.7'}
+                            ]
+                        },
+                        {
+                            'Type': 'maltego.Phrase',
+                            'Value': 'phrase',
+                            'Weight': 1,
+                            'AdditionalFields': [
+                                {'Name': 'link#maltego.link.label', 'DisplayName': 'Link Label',
+                                 'MatchingRule': 'loose', 'Value': 'link'}
+                            ]
+                        }
+                    ],
+                    'UIMessages': [{'MessageType': 'PartialError', 'Value': 'Oops'}]
+                }
+            }
+        }, d)
+        self.assertEqual(d, message_to_dict(message_from_dict(d)))
+
+    def test_invalid_messages(self):
+        codec = get_codec('json')
+        self.assertRaises(ParseError, codec.loads, b'{')
+        self.assertRaises(ParseError, codec.loads, b'[]')
+        self.assertRaises(ParseError, codec.loads, b'{"MaltegoMessage": {"Foo": {}}}')
+        self.assertRaises(ParseError, codec.loads, b'{"MaltegoMessage": {"MaltegoTransformResponseMessage": '
+                                                   b'{"Entities": {}}}}')
+        self.assertRaises(ParseError, codec.loads_request, codec.dumps(self.response))
+        self.assertRaises(ParseError, get_codec('xml').loads_request, get_codec('xml').dumps(self.response))
+        self.assertRaises(ValueError, get_codec, 'yaml')
+
+    def test_negotiation(self):
+        xml = get_codec('xml')
+        json_ = get_codec('json')
+        self.assertIs(xml, codec_for_content_type('text/xml'))
+        self.assertIs(json_, codec_for_content_type('Application/JSON; charset=utf-8'))
+        self.assertIsNone(codec_for_content_type('text/plain'))
+        self.assertIs(xml, codec_for_content_type(None, xml))
+
+        self.assertIs(json_, negotiate('application/json', xml))
+        self.assertIs(xml, negotiate(None, xml))
+        self.assertIs(json_, negotiate('*/*', json_))
+        self.assertIs(xml, negotiate('text/html, application/foo', xml))
+        self.assertIs(json_, negotiate('text/xml;q=0.5, application/json', xml))
+        self.assertIs(xml, negotiate('application/json;q=0, text/xml', json_))
+
+    @skipUnless(msgpack is not None, 'msgpack is not installed')
+    def test_msgpack(self):
+        codec = get_codec('msgpack')
+        self.assertIs(codec, codec_for_content_type('application/x-msgpack'))
+        self.assertEqual(message_to_dict(self.response), msgpack.unpackb(codec.dumps(self.response), raw=False))
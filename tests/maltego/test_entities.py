@@ -1,7 +1,10 @@
+import pickle
 from datetime import date, datetime, timedelta
 from canari.maltego.message import Entity, Field, StringEntityField, IntegerEntityField, FloatEntityField, \
     BooleanEntityField, EnumEntityField, LongEntityField, DateTimeEntityField, DateEntityField, TimeSpan, \
-    TimeSpanEntityField, RegexEntityField, ColorEntityField, ValidationError
+    TimeSpanEntityField, RegexEntityField, ColorEntityField, ArrayEntityField, CompressedEntityField, ValidationError, \
+    Label, EntityRecord, FieldRecord, LabelRecord, MaltegoMessage, MaltegoTransformResponseMessage, MatchingRule, \
+    Limits, LimitReached
 from unittest import TestCase
 
 __author__ = 'Nadeem Douba'
@@ -162,3 +165,162 @@ class EntityTests(TestCase):
         self.assertEqual(TestEntity.datetime.name, 'type.datetime')
         self.assertEqual(TestEntity.timespan.name, 'type.timespan')
         self.assertEqual(TestEntity.color.name, 'type.color')
+
+    def test_compact_records(self):
+        class TestEntity(Entity):
+            str = StringEntityField('type.str', display_name='String')
+
+        a = TestEntity('a', str='foo')
+        b = TestEntity('b', str='bar')
+        a += Field('extra', 'value', display_name='Extra')
+        a += Label('label', 'text')
+        self.assertIsInstance(a.__entity__, EntityRecord)
+        self.assertIsInstance(a.fields['extra'], FieldRecord)
+        self.assertIsInstance(a.labels['label'], LabelRecord)
+        self.assertRaises(AttributeError, setattr, a.fields['type.str'], 'foo', 'bar')
+
+        # Fields set through the same descriptor share their schema
+        self.assertIs(a.fields['type.str']._schema, b.fields['type.str']._schema)
+        self.assertEqual(('type.str', 'String', MatchingRule.Strict, 'foo'), (
+            a.fields['type.str'].name, a.fields['type.str'].display_name, a.fields['type.str'].matching_rule, a.str
+        ))
+
+        b.fields['type.str'].display_name = 'Other'
+        self.assertEqual('String', a.fields['type.str'].display_name)
+        self.assertEqual('Other', b.fields['type.str'].display_name)
+
+        # Records are converted to safedexml models when rendered by safedexml and parse back to the same entity
+        response = MaltegoTransformResponseMessage()
+        response += a
+        e = MaltegoMessage.parse(MaltegoMessage(message=response).render()).message.entities[0]
+        self.assertEqual(('a', 1), (e.value, e.weight))
+        self.assertEqual({'type.str': 'foo', 'extra': 'value'}, {k: f.value for k, f in e.fields.items()})
+        self.assertEqual('Extra', e.fields['extra'].display_name)
+        self.assertEqual('text', e.labels['label'].value)
+
+    def test_wrapping_parsed_entity(self):
+        class TestEntity(Entity):
+            str = StringEntityField('type.str')
+
+        response = MaltegoTransformResponseMessage()
+        response += TestEntity('a')
+        e = TestEntity(MaltegoMessage.parse(MaltegoMessage(message=response).render()).message.entities[0])
+        e.str = 'foo'
+        e['other'] = 'bar'
+        self.assertEqual('foo', e.str)
+        self.assertEqual('bar', e['other'])
+        self.assertIn('<Field Name="type.str" DisplayName="" MatchingRule="strict">foo</Field>',
+                      MaltegoMessage(message=MaltegoTransformResponseMessage(entities=[e.__entity__])).render())
+
+    def test_decoded_value_caching(self):
+        class TestEntity(Entity):
+            datetime = DateTimeEntityField('type.datetime')
+            array = ArrayEntityField('type.array')
+            compressed = CompressedEntityField('type.compressed')
+            int = IntegerEntityField('type.int', alias='type.integer')
+
+        e = TestEntity('a')
+        e.datetime = datetime(2015, 1, 2, 3, 4, 5, 600000)
+        e.array = ['a', 'b,c']
+        e.compressed = {'a': [1, 2]}
+        self.assertEqual(datetime(2015, 1, 2, 3, 4, 5, 600000), e.datetime)
+        self.assertIs(e.datetime, e.datetime)
+
+        # Mutable values are never shared between callers
+        e.array.append('d')
+        e.compressed['b'] = 3
+        self.assertEqual(['a', 'b,c'], e.array)
+        self.assertEqual({'a': [1, 2]}, e.compressed)
+
+        # Setting the property or the raw field value invalidates the cached value
+        e.datetime = datetime(2016, 1, 1)
+        self.assertEqual(datetime(2016, 1, 1), e.datetime)
+        e.fields['type.datetime'].value = '2017-01-01 00:00:00.5'
+        self.assertEqual(datetime(2017, 1, 1, 0, 0, 0, 500000), e.datetime)
+        e.fields['type.datetime'].value = '2017-01-01 00:00:00.123456'
+        self.assertEqual(datetime(2017, 1, 1, 0, 0, 0, 123456), e.datetime)
+        e.fields['type.datetime'].value = '2017-1-1 0:00:00.0'
+        self.assertEqual(datetime(2017, 1, 1), e.datetime)
+        e.fields['type.datetime'].value = 'invalid'
+        self.assertRaises(ValidationError, lambda: e.datetime)
+        e.array = ['x']
+        self.assertEqual(['x'], e.array)
+
+        # Records can still be pickled once decoded values are cached
+        record = pickle.loads(pickle.dumps(e.__entity__))
+        self.assertEqual(e.fields['type.compressed'].value, record.fields['type.compressed'].value)
+        self.assertIs(e.fields['type.array'].name, record.fields['type.array'].name)
+        self.assertIsNone(record.fields['type.compressed']._decoded)
+
+        # Fields set by alias are found and updated in place
+        e += Field('type.integer', '1')
+        self.assertEqual(1, e.int)
+        e.int = 2
+        self.assertEqual(2, e.int)
+        self.assertNotIn('type.int', e.fields)
+
+    def test_response_deduplication(self):
+        response = MaltegoTransformResponseMessage()
+        response += Entity('a', weight=5)
+        response += Entity('a', weight=1)
+        self.assertEqual(2, len(response.entities))
+
+        # Entities already in the response are merged as soon as deduplication is enabled
+        response.deduplicate()
+        self.assertEqual([5], [e.weight for e in response.entities])
+
+        a = Entity('a')
+        a += Field('strict', 'foo')
+        a += Field('loose', 'foo', matching_rule=MatchingRule.Loose)
+        a += Label('label', 'foo')
+        response += a
+        b = Entity('a', weight=10)
+        b += Field('strict', 'foo')
+        b += Field('loose', 'bar', matching_rule=MatchingRule.Loose)
+        b += Field('other', 'bar')
+        b += Label('label', 'bar')
+        b += Label('other', 'bar')
+        response += b
+        self.assertEqual(1, len(response.entities))
+        e = response.entities[0]
+        self.assertEqual(10, e.weight)
+        self.assertEqual({'strict': 'foo', 'loose': 'foo', 'other': 'bar'}, {k: f.value for k, f in e.fields.items()})
+        self.assertEqual({'label': 'foo', 'other': 'bar'}, {k: l.value for k, l in e.labels.items()})
+
+        # Conflicting strict fields or different types or values yield distinct entities
+        c = Entity('a')
+        c += Field('strict', 'bar')
+        response += c
+        response += Entity('b')
+        response += Entity('a', type='maltego.Other')
+        self.assertEqual(4, len(response.entities))
+        response += c
+        self.assertEqual(4, len(response.entities))
+
+    def test_response_limits(self):
+        response = MaltegoTransformResponseMessage()
+        self.assertIsNone(response.remaining)
+        self.assertFalse(response.is_full)
+
+        response.apply_limits(Limits(soft=2, hard=3))
+        response += Entity('a')
+        self.assertEqual(1, response.remaining)
+        response += Entity('b')
+        self.assertEqual((0, True), (response.remaining, response.is_full))
+
+        # Limits are advisory unless they're enforced
+        response += Entity('c')
+        response += Entity('d')
+        self.assertEqual(4, len(response.entities))
+
+        response = MaltegoTransformResponseMessage().apply_limits(Limits(soft=1, hard=2), enforce=True)
+        response += Entity('a')
+        response += Entity('b')
+        with self.assertRaises(LimitReached):
+            response += Entity('c')
+        self.assertEqual(['a', 'b'], [e.value for e in response.entities])
+
+        # Duplicates are merged into entities already in the response so they don't count towards the limits
+        response.deduplicate()
+        response += Entity('a')
+        self.assertEqual(2, len(response.entities))
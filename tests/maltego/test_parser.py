@@ -0,0 +1,78 @@
+from unittest import TestCase
+
+from safedexml import ParseError
+
+from canari.maltego.entities import Person, Phrase
+from canari.maltego.message import MaltegoMessage, MaltegoTransformRequestMessage, Field, Label, Limits
+from canari.maltego.parser import LazyMaltegoTransformRequestMessage
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'LazyRequestParserTests'
+]
+
+
+class LazyRequestParserTests(TestCase):
+
+    def setUp(self):
+        request = MaltegoTransformRequestMessage()
+        person = Person('Bob & <Alice>', weight=5)
+        person.firstnames = 'Bob'
+        person += Label('label', '<b>bold</b>')
+        request += person
+        request += Phrase('second')
+        request += Field('api.key', '1234')
+        request += Limits(soft=5)
+        self.xml = MaltegoMessage(message=request).render(encoding='utf-8')
+        self.request = LazyMaltegoTransformRequestMessage.iterparse(self.xml)
+
+    def test_entity(self):
+        self.assertIsInstance(self.request.entity, Person)
+        self.assertEqual(self.request.entity.value, 'Bob & <Alice>')
+        self.assertEqual(self.request.entity.weight, 5)
+        self.assertEqual(self.request.entity.firstnames, 'Bob')
+        self.assertEqual(self.request.entity.labels['label'].value, '<b>bold</b>')
+
+    def test_entities(self):
+        self.assertEqual([e.value for e in self.request.entities], ['Bob & <Alice>', 'second'])
+        self.assertIs(self.request.entities[0], self.request.entity)
+        self.assertIsInstance(self.request.entities[1], Phrase)
+
+    def test_settings_and_parameters(self):
+        self.assertEqual(self.request.settings, {'api.key': '1234'})
+        self.assertEqual(self.request.parameters['api.key'].value, '1234')
+
+    def test_limits(self):
+        self.assertEqual(self.request.limits.soft, 5)
+        self.assertEqual(self.request.limits.hard, 10000)
+
+    def test_render_round_trip(self):
+        self.assertEqual(MaltegoMessage(message=self.request).render(encoding='utf-8'), self.xml)
+
+    def test_string_input(self):
+        self.assertEqual(LazyMaltegoTransformRequestMessage.iterparse(self.xml.decode('utf-8')).entity.value,
+                         'Bob & <Alice>')
+
+    def test_empty_request(self):
+        request = LazyMaltegoTransformRequestMessage.iterparse(
+            '<MaltegoMessage><MaltegoTransformRequestMessage /></MaltegoMessage>')
+        self.assertEqual(request.entity.value, '')
+        self.assertEqual(request.entities, [])
+        self.assertEqual(request.settings, {})
+        self.assertIsNone(request.limits)
+
+    def test_invalid_message(self):
+        self.assertRaises(ParseError, LazyMaltegoTransformRequestMessage.iterparse, '<Foo />')
+        self.assertRaises(
+            ParseError, LazyMaltegoTransformRequestMessage.iterparse,
+            '<MaltegoMessage><MaltegoTransformResponseMessage /></MaltegoMessage>'
+        )
@@ -0,0 +1,115 @@
+from unittest import TestCase
+
+from safedexml import RenderError
+
+from canari.maltego.entities import Person, Phrase, Location
+from canari.maltego.message import (MaltegoMessage, MaltegoTransformResponseMessage, MaltegoTransformExceptionMessage,
+                                    MaltegoException, Field, Label, UIMessage, UIMessageType, MatchingRule)
+from canari.maltego.renderer import render_message, render_entity, iter_render_message
+from canari.maltego.utils import to_response
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'RendererTests',
+    'StreamingRendererTests'
+]
+
+
+class RendererTests(TestCase):
+
+    def assertRendersIdentically(self, msg):
+        for kwargs in [{}, {'encoding': 'utf-8'}, {'fragment': True}, {'encoding': 'utf-8', 'fragment': True}]:
+            self.assertEqual(render_message(msg, **kwargs), MaltegoMessage(message=msg).render(**kwargs))
+
+    def test_empty_response(self):
+        self.assertRendersIdentically(MaltegoTransformResponseMessage())
+
+    def test_response(self):
+        response = MaltegoTransformResponseMessage()
+        person = Person('Bob & <Alice>', weight=5, icon_url='http://localhost/icon.png?a=1&b=2')
+        person.firstnames = 'Bob'
+        person.lastname = ''
+        person += Field('quotes', 'a"b\'c', display_name='Say "hi"\n\t', matching_rule=MatchingRule.Loose)
+        person += Field('empty', '')
+        person += Label('label', '<b>bold</b> ]]> done', type='text/html')
+        response += person
+        response += Phrase('')
+        response += Location(u'中国', icon_url='')
+        response += UIMessage('Something <happened> & stuff', type=UIMessageType.Partial)
+        response += UIMessage('')
+        self.assertRendersIdentically(response)
+
+    def test_render_entity(self):
+        phrase = Phrase('hello', weight=2)
+        phrase += Label('a', 'b')
+        response = MaltegoTransformResponseMessage()
+        response += phrase
+        xml = render_message(response, fragment=True)
+        self.assertIn(render_entity(phrase), xml)
+        self.assertEqual(render_entity(phrase), render_entity(phrase.__entity__))
+
+    def test_exception_message(self):
+        self.assertRendersIdentically(MaltegoTransformExceptionMessage(exceptions=[MaltegoException('<error>')]))
+
+    def test_missing_value(self):
+        response = MaltegoTransformResponseMessage()
+        phrase = Phrase('test')
+        phrase.fields['bad'] = Field('bad', None)
+        response += phrase
+        self.assertRaises(RenderError, render_message, response)
+
+
+class StreamingRendererTests(TestCase):
+
+    def transform(self, response, n=250, error=None):
+        response += UIMessage('started')
+        for i in range(n):
+            if i % 2:
+                response += Phrase(str(i))
+            else:
+                yield Phrase(str(i))
+        yield UIMessage('done', type=UIMessageType.Debug)
+        if error:
+            raise error
+
+    def parse(self, chunks):
+        return MaltegoMessage.parse(b''.join(chunks)).message
+
+    def test_stream(self):
+        response = MaltegoTransformResponseMessage()
+        chunks = list(iter_render_message(response, self.transform(response), encoding='utf-8', chunk_size=100))
+        self.assertEqual(len(chunks), 3)
+        msg = self.parse(chunks)
+        self.assertEqual(sorted(int(e.value) for e in msg.entities), list(range(250)))
+        self.assertEqual([m.message for m in msg.messages], ['started', 'done'])
+        self.assertEqual(response.entities, [])
+
+    def test_stream_error(self):
+        response = MaltegoTransformResponseMessage()
+        chunks = iter_render_message(response, self.transform(response, 10, MaltegoException('boom')),
+                                     encoding='utf-8', on_error=str)
+        msg = self.parse(chunks)
+        self.assertEqual(len(msg.entities), 10)
+        self.assertEqual(msg.messages[-1].message, 'boom')
+        self.assertEqual(msg.messages[-1].type, UIMessageType.Partial)
+
+        response = MaltegoTransformResponseMessage()
+        chunks = iter_render_message(response, self.transform(response, 10, MaltegoException('boom')))
+        self.assertRaises(MaltegoException, list, chunks)
+
+    def test_to_response(self):
+        response = MaltegoTransformResponseMessage()
+        msg = to_response(self.transform(response, 10), response)
+        self.assertIs(msg, response)
+        self.assertEqual(sorted(int(e.value) for e in msg.entities), list(range(10)))
+        self.assertEqual(len(msg.messages), 2)
+        self.assertIs(to_response(response, MaltegoTransformResponseMessage()), response)
@@ -0,0 +1,97 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+from unittest import TestCase
+
+from canari.pkgutils.index import TransformIndex, index_path, find_transform
+from canari.pkgutils.transform import TransformDistribution
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'TransformIndexTests'
+]
+
+
+transform_module = """
+from canari.maltego.entities import Phrase
+from canari.maltego.transform import Transform, StringSetting
+
+
+class Echo(Transform):
+    input_type = Phrase
+    remote = True
+    transform_settings = {'echo.prefix': StringSetting('Prefix', default_value='>')}
+
+
+class Local(Transform):
+    input_type = Phrase
+"""
+
+
+class TransformIndexTests(TestCase):
+
+    package = 'canari_index_test'
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.package_dir = os.path.join(self.tmp_dir, self.package)
+        os.makedirs(os.path.join(self.package_dir, 'transforms'))
+        for f in ['__init__.py', os.path.join('transforms', '__init__.py')]:
+            open(os.path.join(self.package_dir, f), 'w').close()
+        with open(os.path.join(self.package_dir, 'transforms', 'echo.py'), 'w') as f:
+            f.write(transform_module)
+        sys.path.insert(0, self.tmp_dir)
+        self.path = index_path(self.tmp_dir, self.package)
+        TransformIndex.build(TransformDistribution(self.package)).save(self.path)
+
+    def tearDown(self):
+        sys.path.remove(self.tmp_dir)
+        for m in [m for m in sys.modules if m.startswith(self.package)]:
+            del sys.modules[m]
+        shutil.rmtree(self.tmp_dir)
+
+    def test_load(self):
+        index = TransformIndex.load(self.path)
+        self.assertIsNotNone(index)
+        self.assertEqual(index.package, self.package)
+        self.assertEqual(sorted(t['name'] for t in index.transforms),
+                         ['%s.Echo' % self.package, '%s.Local' % self.package])
+        self.assertEqual([t['name'] for t in index.remote_transforms], ['%s.Echo' % self.package])
+        echo = index.get('%s.Echo' % self.package)
+        self.assertEqual(echo['module'], '%s.transforms.echo' % self.package)
+        self.assertEqual(echo['input_type'], 'maltego.Phrase')
+        self.assertEqual(echo['settings']['echo.prefix']['default_value'], '>')
+
+    def test_load_transform(self):
+        index = TransformIndex.load(self.path)
+        t = index.load_transform('%s.Echo' % self.package)
+        self.assertIs(t, sys.modules['%s.transforms.echo' % self.package].Echo)
+        self.assertIs(find_transform('%s.Local' % self.package, self.package, [self.tmp_dir]),
+                      sys.modules['%s.transforms.echo' % self.package].Local)
+        self.assertIsNone(find_transform('%s.Missing' % self.package, self.package, [self.tmp_dir]))
+
+    def test_stale(self):
+        path = os.path.join(self.package_dir, 'transforms', 'echo.py')
+        mtime = os.stat(path).st_mtime + 10
+        os.utime(path, (mtime, mtime))
+        self.assertIsNone(TransformIndex.load(self.path))
+
+    def test_new_module(self):
+        open(os.path.join(self.package_dir, 'transforms', 'other.py'), 'w').close()
+        d = os.path.join(self.package_dir, 'transforms')
+        os.utime(d, (time.time() + 10, time.time() + 10))
+        self.assertIsNone(TransformIndex.load(self.path))
+
+    def test_missing(self):
+        self.assertIsNone(TransformIndex.load(os.path.join(self.tmp_dir, 'missing.index.json')))
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from canari import tracing
+from canari.maltego.codec import get_codec
+from canari.maltego.entities import Phrase
+from canari.maltego.message import MaltegoTransformRequestMessage, Limits
+from tests.tas.fixtures import PACKAGE, load_plume
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'AsgiPlumeTests'
+]
+
+codec = get_codec('xml')
+
+
+def request(*values):
+    msg = MaltegoTransformRequestMessage()
+    msg += Limits(soft=10, hard=20)
+    for v in values:
+        msg += Phrase(v)
+    return codec.dumps(msg)
+
+
+class AsgiPlumeTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        load_plume()
+        from canari.tas import asgi
+        cls.app = asgi.application
+        cls.transforms = __import__('%s.transforms.common' % PACKAGE, fromlist=['common'])
+
+    def call(self, method, path, body=b'', headers=None):
+        """Calls the application with fake receive and send callables and returns the status, headers and body of the
+        response."""
+        return asyncio.run(self.call_async(method, path, body, headers))
+
+    async def call_async(self, method, path, body=b'', headers=None):
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': query.encode('latin-1'),
+            'scheme': 'http',
+            'server': ('localhost', 8080),
+            'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in (headers or {}).items()]
+        }
+        # The body is sent in two parts to exercise the reassembly of the request body
+        received = [
+            {'type': 'http.request', 'body': body[:10], 'more_body': True},
+            {'type': 'http.request', 'body': body[10:]}
+        ]
+        sent = []
+
+        async def receive():
+            return received.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await self.app(scope, receive, send)
+        self.assertEqual('http.response.start', sent[0]['type'])
+        body = b''.join(m.get('body', b'') for m in sent[1:])
+        return sent[0]['status'], {k.decode('latin-1'): v.decode('latin-1') for k, v in sent[0]['headers']}, body
+
+    def transform(self, name, body, headers=None):
+        return self.call('POST', '/%s.%s' % (PACKAGE, name), body, dict(headers or {}, **{
+            'Content-Type': codec.content_type
+        }))
+
+    def test_routing(self):
+        self.assertEqual((200, b'Yes?'), self.call('GET', '/%s.Echo' % PACKAGE)[::2])
+        self.assertEqual((200, b'Yes?'), self.call('POST', '/%s.Echo' % PACKAGE)[::2])
+        self.assertEqual((404, b'Whaaaaat?'), self.call('GET', '/%s.Missing' % PACKAGE)[::2])
+        self.assertEqual((404, b'Whaaaaat?'), self.transform('Missing', request('foo'))[::2])
+        self.assertEqual(404, self.call('GET', '/static/missing.png')[0])
+        self.assertEqual(404, self.call('DELETE', '/%s.Echo' % PACKAGE)[0])
+
+        status, headers, body = self.call('GET', '/metrics')
+        self.assertEqual(200, status)
+        self.assertIn('canari_transform_requests_total{transform="%s.Echo"}' % PACKAGE, body.decode('utf-8'))
+
+    def test_sync_transform(self):
+        status, headers, body = self.transform('Echo', request('foo'))
+        self.assertEqual(200, status)
+        self.assertEqual(codec.content_type, headers['content-type'])
+        self.assertEqual(['FOO'], [e.value for e in codec.loads(body).entities])
+
+        status, headers, body = self.transform('Echo', request('fail'))
+        self.assertEqual(200, status)
+        self.assertEqual('Transform failed.', codec.loads(body).exceptions[0].value)
+
+    def test_async_transform(self):
+        status, headers, body = self.transform('Async', request('foo'))
+        self.assertEqual(200, status)
+        self.assertEqual(['oof'], [e.value for e in codec.loads(body).entities])
+
+    def test_batch_transform(self):
+        self.transforms.Bulk.batches = []
+        status, headers, body = self.transform('Bulk', request('a', 'b', 'c'))
+        self.assertEqual(200, status)
+        self.assertEqual(['a!', 'b!', 'c!'], [e.value for e in codec.loads(body).entities])
+        self.assertEqual([['a', 'b'], ['c']], self.transforms.Bulk.batches)
+
+    def test_back_pressure(self):
+        rejected = self.app.async_rejected
+        for name in ('Rejected', 'AsyncRejected'):
+            status, headers, body = self.transform(name, request('foo'))
+            self.assertEqual(429, status)
+            self.assertEqual('1', headers['retry-after'])
+        self.assertEqual(rejected + 1, self.app.async_rejected)
+
+    def test_static(self):
+        d = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, d)
+        path = os.path.join(d, 'abcdef')
+        with open(path, 'wb') as f:
+            f.write(b'\x89PNG' * 50000)
+
+        # Large assets are streamed from disk
+        assets = self.app.app.assets
+        assets.add('small', path, 'icon.png')
+        assets.max_memory_size = 100
+        try:
+            asset = assets.add('large', path, 'icon.png')
+        finally:
+            del assets.max_memory_size
+        self.assertIsNone(asset.data)
+
+        for name in ('small', 'large'):
+            status, headers, body = self.call('GET', '/static/%s' % name)
+            self.assertEqual(200, status)
+            self.assertEqual(b'\x89PNG' * 50000, body)
+            self.assertEqual(('image/png', '200000', asset.etag),
+                             (headers['content-type'], headers['content-length'], headers['etag']))
+
+        status, headers, body = self.call('GET', '/static/large', headers={'If-None-Match': asset.etag})
+        self.assertEqual((304, b''), (status, body))
+
+    def test_executor_status(self):
+        status, headers, body = self.call('GET', '/status/executor')
+        self.assertEqual((200, 'application/json'), (status, headers['content-type']))
+        stats = json.loads(body.decode('utf-8'))
+        self.assertEqual(4, stats['workers'])
+        self.assertEqual(self.app.async_rejected, stats['async']['rejected'])
+        self.assertEqual({'running': 0, 'transforms': {}},
+                         {k: v for k, v in stats['async'].items() if k in ('running', 'transforms')})
+
+    def test_tracing(self):
+        self.assertEqual(404, self.call('GET', '/status/traces')[0])
+        sink = tracing.RingBufferSink()
+        previous = tracing.set_sink(sink)
+        self.addCleanup(tracing.set_sink, previous)
+
+        for name in ('Echo', 'Async'):
+            status, headers, body = self.transform(name, request('foo'), {tracing.TRACE_HEADER: 'trace-%s' % name})
+            self.assertEqual((200, 'trace-%s' % name), (status, headers[tracing.TRACE_HEADER.lower()]))
+            spans = {s.name: s for s in sink.spans('trace-%s' % name)}
+            self.assertEqual({'plume', 'parse', 'do_transform', 'render'}, set(spans))
+            self.assertEqual(({'transform': '%s.%s' % (PACKAGE, name), 'status': 200}, None),
+                             (spans['plume'].attributes, spans['plume'].parent_id))
+            for n in ('parse', 'do_transform', 'render'):
+                self.assertEqual(spans['plume'].span_id, spans[n].parent_id)
+
+        # Requests that don't carry a trace ID start a new trace without echoing it
+        status, headers, body = self.transform('Echo', request('foo'))
+        self.assertNotIn(tracing.TRACE_HEADER.lower(), headers)
+
+        status, headers, body = self.call('GET', '/status/traces?trace_id=trace-Echo')
+        self.assertEqual((200, 'application/json'), (status, headers['content-type']))
+        spans = json.loads(body.decode('utf-8'))['spans']
+        self.assertEqual(['parse', 'do_transform', 'render', 'plume'], [s['name'] for s in spans])
+
+    def test_concurrent_tracing(self):
+        # Requests that are interleaved on the event loop each keep track of their own spans
+        sink = tracing.RingBufferSink()
+        previous = tracing.set_sink(sink)
+        self.addCleanup(tracing.set_sink, previous)
+
+        async def run():
+            return await asyncio.gather(*[self.call_async(
+                'POST', '/%s.Async' % PACKAGE, request('foo'),
+                {'Content-Type': codec.content_type, tracing.TRACE_HEADER: 'trace-%d' % i}
+            ) for i in range(5)])
+
+        self.assertEqual([200] * 5, [r[0] for r in asyncio.run(run())])
+        for i in range(5):
+            # Spans are emitted as they finish so a span that ended up in the wrong trace would show up out of order
+            self.assertEqual(['parse', 'do_transform', 'render', 'plume'], [s.name for s in sink.spans('trace-%d' % i)])
+            spans = {s.name: s for s in sink.spans('trace-%d' % i)}
+            for n in ('parse', 'do_transform', 'render'):
+                self.assertEqual(spans['plume'].span_id, spans[n].parent_id)
@@ -0,0 +1,156 @@
+import os
+import sys
+import tempfile
+from importlib import import_module
+
+from canari.mode import get_canari_mode, set_canari_mode
+from canari.utils.fs import PushDir
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'PACKAGE',
+    'load_plume'
+]
+
+PACKAGE = 'plumetests'
+
+CONFIG = """[canari.remote]
+packages = %s
+max_workers = 4
+
+[canari.remote.concurrency]
+%s.Rejected = 0
+%s.AsyncRejected = 0
+""" % (PACKAGE, PACKAGE, PACKAGE)
+
+TRANSFORMS = """import threading
+
+from canari.maltego.entities import Phrase
+from canari.maltego.message import MaltegoException
+from canari.maltego.transform import Transform
+
+
+class Echo(Transform):
+    input_type = Phrase
+    remote = True
+
+    def do_transform(self, request, response, config):
+        if request.entity.value == 'fail':
+            raise MaltegoException('Transform failed.')
+        return response + Phrase(request.entity.value.upper())
+
+
+class Fill(Transform):
+    input_type = Phrase
+    remote = True
+    remaining = []
+
+    def do_transform(self, request, response, config):
+        while not response.is_full and len(Fill.remaining) < 100:
+            Fill.remaining.append(response.remaining)
+            yield Phrase('p%d' % len(Fill.remaining))
+
+
+class Bulk(Transform):
+    input_type = Phrase
+    remote = True
+    batch_size = 2
+    batches = []
+
+    def do_transform_batch(self, requests, responses, config):
+        Bulk.batches.append([r.entity.value for r in requests])
+        for request, response in zip(requests, responses):
+            response += Phrase(request.entity.value + '!')
+        return responses
+
+
+class Rejected(Transform):
+    input_type = Phrase
+    remote = True
+
+    def do_transform(self, request, response, config):
+        return response
+
+
+class Stream(Transform):
+    input_type = Phrase
+    remote = True
+    yielded = 0
+    stopped = threading.Event()
+
+    def do_transform(self, request, response, config):
+        try:
+            while Stream.yielded < 10000:
+                Stream.yielded += 1
+                yield Phrase('s%d' % Stream.yielded)
+        finally:
+            Stream.stopped.set()
+"""
+
+ASYNC_TRANSFORMS = """import asyncio
+
+from canari.maltego.entities import Phrase
+from canari.maltego.transform import Transform
+
+
+class Async(Transform):
+    input_type = Phrase
+    remote = True
+
+    async def do_transform(self, request, response, config):
+        await asyncio.sleep(0)
+        return response + Phrase(request.entity.value[::-1])
+
+
+class AsyncRejected(Transform):
+    input_type = Phrase
+    remote = True
+
+    async def do_transform(self, request, response, config):
+        return response
+"""
+
+_plume = None
+
+
+def _write(path, data=''):
+    with open(path, 'w') as f:
+        f.write(data)
+
+
+def _create_package(root):
+    package = os.path.join(root, PACKAGE)
+    for d in ('', 'transforms', 'resources'):
+        os.mkdir(os.path.join(package, d))
+        _write(os.path.join(package, d, '__init__.py'))
+    _write(os.path.join(package, 'transforms', 'common.py'), TRANSFORMS)
+    if sys.version_info >= (3, 5):
+        _write(os.path.join(package, 'transforms', 'aio.py'), ASYNC_TRANSFORMS)
+    _write(os.path.join(root, 'canari.conf'), CONFIG)
+
+
+def load_plume():
+    """Imports Plume (which can only be loaded once per process) from a temporary directory holding a canari.conf and
+    a transform package with the transforms used by the Plume tests. Returns the canari.tas.plume module."""
+    global _plume
+    if _plume is None:
+        root = tempfile.mkdtemp()
+        _create_package(root)
+        sys.path.insert(0, root)
+        # Plume switches to the remote execution mode when it is loaded
+        mode = get_canari_mode()
+        try:
+            with PushDir(root):
+                _plume = import_module('canari.tas.plume')
+        finally:
+            set_canari_mode(mode)
+    return _plume
@@ -0,0 +1,24 @@
+import sys
+from unittest import TestCase, skipUnless
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'AsgiPlumeTests'
+]
+
+# The tests are written with async def so they live in a module that isn't imported (or discovered) on Python 2
+if sys.version_info >= (3, 7):
+    from tests.tas.asgi_cases import AsgiPlumeTests
+else:
+    @skipUnless(False, 'the ASGI server requires Python 3.7 or later')
+    class AsgiPlumeTests(TestCase):
+        pass
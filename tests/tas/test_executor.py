@@ -0,0 +1,83 @@
+import threading
+from unittest import TestCase
+
+from canari.config import CanariConfigParser
+from canari.tas.executor import TransformExecutor, ExecutorSaturated, executor_from_config
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'TransformExecutorTests'
+]
+
+
+class TransformExecutorTests(TestCase):
+
+    def setUp(self):
+        self.executor = TransformExecutor(max_workers=2, max_queue=1, limits={'Slow': 1}, retry_after=5)
+        self.event = threading.Event()
+
+    def tearDown(self):
+        self.event.set()
+        self.executor.shutdown()
+
+    def test_submit(self):
+        self.assertEqual(42, self.executor.submit('Fast', lambda x: x, 42).result())
+        stats = self.executor.stats()
+        self.assertEqual(1, stats['submitted'])
+        self.assertEqual(1, stats['completed'])
+        self.assertEqual({}, stats['transforms'])
+
+    def test_transform_limit(self):
+        future = self.executor.submit('slow', self.event.wait)
+        with self.assertRaises(ExecutorSaturated) as cm:
+            self.executor.submit('slow', self.event.wait)
+        self.assertEqual(5, cm.exception.retry_after)
+        self.assertEqual('slow', cm.exception.name)
+
+        # Other transforms are unaffected
+        self.assertEqual(1, self.executor.submit('Fast', lambda: 1).result())
+
+        self.event.set()
+        future.result()
+        self.executor.submit('slow', lambda: None).result()
+        self.assertEqual(1, self.executor.stats()['rejected'])
+
+    def test_queue_limit(self):
+        futures = [self.executor.submit('Fast%d' % i, self.event.wait) for i in range(3)]
+        self.assertRaises(ExecutorSaturated, self.executor.submit, 'Fast', self.event.wait)
+        stats = self.executor.stats()
+        self.assertEqual(3, stats['queued'] + stats['running'])
+        self.event.set()
+        for f in futures:
+            f.result()
+        stats = self.executor.stats()
+        self.assertEqual(0, stats['queued'] + stats['running'])
+        self.assertEqual(3, stats['completed'])
+
+    def test_executor_from_config(self):
+        config = CanariConfigParser()
+        config['canari.remote.max_workers'] = 3
+        config['canari.remote.max_concurrency'] = 4
+        config.add_section('canari.remote.concurrency')
+        config.set('canari.remote.concurrency', 'foo.SlowTransform', '2')
+        executor = executor_from_config(config)
+        try:
+            self.assertEqual(3, executor.max_workers)
+            self.assertEqual(30, executor.max_queue)
+            self.assertEqual(2, executor.limit('foo.SlowTransform'))
+            self.assertEqual(4, executor.limit('foo.FastTransform'))
+            self.assertEqual(1, executor.retry_after)
+        finally:
+            executor.shutdown()
+
+        config['canari.remote.max_queue'] = -1
+        self.assertRaises(ValueError, executor_from_config, config)
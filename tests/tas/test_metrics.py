@@ -0,0 +1,98 @@
+from unittest import TestCase
+
+from canari.maltego.message import MaltegoException
+from canari.tas.metrics import Histogram, Metrics
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'MetricsTests'
+]
+
+
+class Executor(object):
+
+    def stats(self):
+        return {'workers': 4, 'max_queue': 8, 'queued': 1, 'running': 2, 'submitted': 10, 'completed': 7,
+                'rejected': 1, 'transforms': {}}
+
+
+class ConfigCache(object):
+    reloads = 3
+
+
+class MetricsTests(TestCase):
+
+    def test_histogram(self):
+        h = Histogram((1, 5, 10))
+        for v in (0, 1, 2, 5, 11, 100):
+            h.observe(v)
+        buckets, sum_, count = h.snapshot()
+        # Buckets are cumulative and inclusive of their upper bound
+        self.assertEqual([(1, 2), (5, 4), (10, 4), (float('inf'), 6)], buckets)
+        self.assertEqual((119, 6, 6), (sum_, count, h.count))
+
+    def test_transform_metrics(self):
+        metrics = Metrics(['a.Foo'])
+        m = metrics.get('a.Foo')
+        self.assertIsNone(metrics.get('a.Bar'))
+
+        m.started()
+        m.started()
+        m.finished()
+        with m.timed('parse'):
+            pass
+        m.observe('transform', 0.3)
+        m.error(MaltegoException('failed'))
+        m.error(ValueError())
+        m.error(KeyError())
+        m.response(3, 2048)
+
+        s = m.snapshot()
+        self.assertEqual((2, 1), (s['requests'], s['in_flight']))
+        self.assertEqual({'maltego': 1, 'unhandled': 2}, s['errors'])
+        self.assertEqual(1, s['phases']['parse'][2])
+        self.assertEqual(0.3, s['phases']['transform'][1])
+        self.assertEqual(0, s['phases']['render'][2])
+        self.assertEqual((3, 1), s['entities'][1:])
+        self.assertEqual((2048, 1), s['sizes'][1:])
+
+    def test_render(self):
+        metrics = Metrics(['a.Foo', 'b"Bar'], Executor(), ConfigCache())
+        m = metrics.get('a.Foo')
+        m.started()
+        m.observe('render', 0.02)
+        m.error(MaltegoException('failed'))
+
+        lines = metrics.render().splitlines()
+        self.assertIn('# TYPE canari_transform_requests_total counter', lines)
+        self.assertIn('canari_transform_requests_total{transform="a.Foo"} 1', lines)
+        self.assertIn('canari_transform_requests_total{transform="b\\"Bar"} 0', lines)
+        self.assertIn('canari_transform_errors_total{transform="a.Foo",type="maltego"} 1', lines)
+        self.assertIn('canari_transform_errors_total{transform="a.Foo",type="unhandled"} 0', lines)
+        self.assertIn('canari_transform_in_flight{transform="a.Foo"} 1', lines)
+        self.assertIn('# TYPE canari_transform_duration_seconds histogram', lines)
+        self.assertIn('canari_transform_duration_seconds_bucket{le="0.01",phase="render",transform="a.Foo"} 0', lines)
+        self.assertIn('canari_transform_duration_seconds_bucket{le="0.025",phase="render",transform="a.Foo"} 1', lines)
+        self.assertIn('canari_transform_duration_seconds_bucket{le="+Inf",phase="render",transform="a.Foo"} 1', lines)
+        self.assertIn('canari_transform_duration_seconds_sum{phase="render",transform="a.Foo"} 0.02', lines)
+        self.assertIn('canari_transform_duration_seconds_count{phase="parse",transform="a.Foo"} 0', lines)
+        self.assertIn('canari_transform_response_bytes_count{transform="a.Foo"} 0', lines)
+        self.assertIn('canari_config_reloads_total 3', lines)
+        self.assertIn('canari_executor_workers 4', lines)
+        self.assertIn('canari_executor_rejected_total 1', lines)
+
+        # Every sample line must be preceded by its metric's TYPE line
+        types = set(l.split()[2] for l in lines if l.startswith('# TYPE'))
+        for line in lines:
+            if not line.startswith('#'):
+                name = line.split('{')[0].split()[0]
+                self.assertTrue(any(name == t or name.startswith(t + '_') for t in types), name)
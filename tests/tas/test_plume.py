@@ -0,0 +1,106 @@
+import json
+import time
+from unittest import TestCase
+
+from canari.maltego.codec import get_codec
+from canari.maltego.entities import Phrase
+from canari.maltego.message import MaltegoTransformRequestMessage, Limits
+from tests.tas.fixtures import PACKAGE, load_plume
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'PlumeTests'
+]
+
+codec = get_codec('xml')
+
+
+def request(*values, **limits):
+    msg = MaltegoTransformRequestMessage()
+    msg += Limits(soft=limits.get('soft', 10), hard=limits.get('hard', 20))
+    for v in values:
+        msg += Phrase(v)
+    return codec.dumps(msg)
+
+
+class PlumeTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.plume = load_plume()
+        cls.client = cls.plume.application.test_client()
+        cls.transforms = __import__('%s.transforms.common' % PACKAGE, fromlist=['common'])
+
+    def post(self, name, data):
+        r = self.client.post('/%s.%s' % (PACKAGE, name), data=data, content_type=codec.content_type)
+        try:
+            return r.status_code, codec.loads(r.get_data()) if r.status_code == 200 else r.get_data()
+        finally:
+            r.close()
+
+    def test_transform(self):
+        status, msg = self.post('Echo', request('foo'))
+        self.assertEqual(200, status)
+        self.assertEqual(['FOO'], [e.value for e in msg.entities])
+
+        status, msg = self.post('Echo', request('fail'))
+        self.assertEqual('Transform failed.', msg.exceptions[0].value)
+
+        self.assertEqual(404, self.post('Missing', request('foo'))[0])
+
+    def test_streamed_limits(self):
+        # Entities relayed to the client count towards the response's limits
+        self.transforms.Fill.remaining = []
+        status, msg = self.post('Fill', request('foo', soft=5))
+        self.assertEqual(200, status)
+        self.assertEqual(['p1', 'p2', 'p3', 'p4', 'p5'], [e.value for e in msg.entities])
+        self.assertEqual([5, 4, 3, 2, 1], self.transforms.Fill.remaining)
+
+    def test_batch_transform(self):
+        # Requests with many input entities are passed to do_transform_batch in batches
+        self.transforms.Bulk.batches = []
+        status, msg = self.post('Bulk', request('a', 'b', 'c'))
+        self.assertEqual(200, status)
+        self.assertEqual(['a!', 'b!', 'c!'], [e.value for e in msg.entities])
+        self.assertEqual([['a', 'b'], ['c']], self.transforms.Bulk.batches)
+
+    def test_back_pressure(self):
+        # Rejected's concurrency limit is 0 so every request is turned away
+        r = self.client.post('/%s.Rejected' % PACKAGE, data=request('foo'), content_type=codec.content_type)
+        self.assertEqual((429, '1'), (r.status_code, r.headers['Retry-After']))
+        stats = json.loads(self.client.get('/status/executor').get_data(as_text=True))
+        self.assertEqual(4, stats['workers'])
+        self.assertGreaterEqual(stats['rejected'], 1)
+
+    def test_stream_back_pressure(self):
+        # A streaming transform is suspended once the relay queue is full and stopped when the client goes away
+        stream = self.transforms.Stream
+        stream.yielded = 0
+        stream.stopped.clear()
+        r = self.client.post('/%s.Stream' % PACKAGE, data=request('foo'), content_type=codec.content_type,
+                             buffered=False)
+        self.assertEqual(200, r.status_code)
+        for _ in range(100):
+            if stream.yielded >= self.plume.RELAY_QUEUE_SIZE:
+                break
+            time.sleep(0.05)
+        time.sleep(0.3)
+        yielded = stream.yielded
+        # The test client reads the first chunk (100 entities) to get the response started
+        self.assertLessEqual(yielded, self.plume.RELAY_QUEUE_SIZE + 101)
+        time.sleep(0.3)
+        self.assertEqual(yielded, stream.yielded)
+        self.assertFalse(stream.stopped.is_set())
+
+        r.close()
+        self.assertTrue(stream.stopped.wait(5))
+        self.assertEqual(yielded, stream.yielded)
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+from email.utils import formatdate
+from unittest import TestCase
+
+from canari.tas.static import StaticAssets
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'StaticAssetsTests'
+]
+
+
+class StaticAssetsTests(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'abcdef')
+        with open(self.path, 'wb') as f:
+            f.write(b'\x89PNG' * 100)
+        os.utime(self.path, (1000000000, 1000000000))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_assets(self):
+        assets = StaticAssets()
+        asset = assets.add('abcdef', self.path, '/tmp/icon.png')
+        self.assertIs(asset, assets.get('abcdef'))
+        self.assertIn('abcdef', assets)
+        self.assertIsNone(assets.get('../abcdef'))
+        self.assertEqual(('image/png', 400, b'\x89PNG' * 100), (asset.content_type, asset.size, asset.data))
+        self.assertEqual({
+            'ETag': '"82d3ac3b339b16c9b686bfbd2179100b"',
+            'Last-Modified': 'Sun, 09 Sep 2001 01:46:40 GMT',
+            'Cache-Control': 'public, max-age=604800'
+        }, dict(asset.headers))
+
+        # Content types default to application/octet-stream
+        self.assertEqual('application/octet-stream', assets.add('abcdef', self.path).content_type)
+
+    def test_conditional_requests(self):
+        asset = StaticAssets().add('abcdef', self.path)
+        self.assertFalse(asset.not_modified())
+        self.assertTrue(asset.not_modified(asset.etag))
+        self.assertTrue(asset.not_modified('"foo", W/%s' % asset.etag))
+        self.assertTrue(asset.not_modified('*'))
+        self.assertFalse(asset.not_modified('"foo"'))
+
+        self.assertTrue(asset.not_modified(if_modified_since='Sun, 09 Sep 2001 01:46:40 GMT'))
+        self.assertTrue(asset.not_modified(if_modified_since=formatdate(2000000000, usegmt=True)))
+        self.assertFalse(asset.not_modified(if_modified_since='Sun, 09 Sep 2001 01:46:39 GMT'))
+        self.assertFalse(asset.not_modified(if_modified_since='yesterday'))
+
+        # If-Modified-Since is ignored when If-None-Match is present
+        self.assertFalse(asset.not_modified('"foo"', 'Sun, 09 Sep 2001 01:46:40 GMT'))
+
+    def test_large_assets_are_read_from_disk(self):
+        asset = StaticAssets(max_memory_size=100).add('abcdef', self.path)
+        self.assertIsNone(asset.data)
+        self.assertEqual(400, asset.size)
+        self.assertEqual(StaticAssets().add('abcdef', self.path).etag, asset.etag)
+        self.assertEqual(b'\x89PNG' * 100, b''.join(asset.iter_chunks()))
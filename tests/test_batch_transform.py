@@ -0,0 +1,98 @@
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from canari.commands.batch_transform import read_inputs, response_to_dict, _execute, _iter_results
+from canari.maltego.batch import iter_batches
+from canari.maltego.entities import Phrase
+from canari.maltego.message import MaltegoException, MaltegoTransformResponseMessage, UIMessage
+from canari.maltego.runner import batch_transform_runner
+from canari.maltego.transform import Transform
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'BatchTransformTests'
+]
+
+
+class EchoTransform(Transform):
+    input_type = Phrase
+
+    def do_transform(self, request, response, config):
+        if request.entity.value == 'fail':
+            raise MaltegoException('failed')
+        response += Phrase(request.entity.value)
+        response += UIMessage('done')
+        return response
+
+
+class EndlessTransform(Transform):
+    input_type = Phrase
+    enforce_limits = True
+    closed = False
+
+    def do_transform(self, request, response, config):
+        try:
+            while True:
+                yield Phrase(request.entity.value)
+        finally:
+            EndlessTransform.closed = True
+
+
+class BatchTransformTests(TestCase):
+    def test_read_csv(self):
+        f = io.StringIO(u'extra,value\n1,a\n,b\n\n')
+        self.assertEqual([(u'a', {u'extra': u'1'}), (u'b', {})], list(read_inputs(f, 'csv')))
+
+    def test_read_jsonl(self):
+        f = io.StringIO(u'"a"\n\n{"value": 1, "fields": {"extra": 2}}\n')
+        self.assertEqual([(u'a', {}), (u'1', {u'extra': u'2'})], list(read_inputs(f, 'jsonl')))
+
+    def test_read_text(self):
+        f = io.StringIO(u'a\r\n\nb\n')
+        self.assertEqual([(u'a', {}), (u'b', {})], list(read_inputs(f, 'text')))
+
+    def test_runner(self):
+        results = batch_transform_runner(EchoTransform, [('a', {})], [], None)
+        self.assertIsInstance(results[0], MaltegoTransformResponseMessage)
+        self.assertEqual(
+            {'entities': [{'type': 'maltego.Phrase', 'value': 'a', 'weight': 1}],
+             'messages': [{'type': 'Inform', 'message': 'done'}]},
+            response_to_dict(results[0])
+        )
+        self.assertRaises(MaltegoException, batch_transform_runner, EchoTransform, [('fail', {})], [], None)
+
+    def test_runner_stops_at_hard_limit(self):
+        [result] = batch_transform_runner(EndlessTransform, [('a', {})], [], None)
+        self.assertEqual(10000, len(result.entities))
+        self.assertTrue(EndlessTransform.closed)
+
+    def test_errors_are_isolated(self):
+        [(index, error, data)] = _execute(EchoTransform, [], None, 'jsonl', False, 1, [(3, 'fail', {})])
+        self.assertEqual((3, 'failed'), (index, error))
+        self.assertEqual({'index': 3, 'value': 'fail', 'fields': {}, 'error': 'failed'}, json.loads(data))
+
+        [(index, error, data)] = _execute(EchoTransform, [], None, 'xml', False, 1, [(4, 'fail', {})])
+        self.assertIn('<MaltegoTransformExceptionMessage>', data)
+
+    def test_iter_results(self):
+        inputs = [(i, str(i), {}) for i in range(50)]
+        with ThreadPoolExecutor(4) as executor:
+            def submit(batch):
+                return executor.submit(_execute, EchoTransform, [], None, 'jsonl', False, 1, batch)
+
+            ordered = [r[0] for r in _iter_results(submit, iter_batches(inputs, 3), True, 8)]
+            unordered = [r[0] for r in _iter_results(submit, iter_batches(inputs, 3), False, 8)]
+
+        self.assertEqual(list(range(50)), ordered)
+        self.assertEqual(list(range(50)), sorted(unordered))
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from canari.benchmark import (benchmarks, make_request, make_response, iter_cases, run_benchmarks, save_results,
+                              load_results, compare_results, regressions)
+from canari.maltego.message import MaltegoMessage
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'BenchmarkTests'
+]
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_corpora(self):
+        request = MaltegoMessage.parse(MaltegoMessage(message=make_request(3, 5)).render()).message
+        self.assertEqual(3, len(request.entities))
+        self.assertEqual(5, len(request.entities[0].fields))
+        self.assertEqual(3, len(make_response(3, 0).entities))
+
+    def test_iter_cases(self):
+        names = [c[0] for c in iter_cases(['message.entity_init', 'config.getitem'], (1, 10), (0, 5), max_size=20)]
+        self.assertEqual([
+            'message.entity_init[entities=1,fields=0]',
+            'message.entity_init[entities=10,fields=0]',
+            'config.getitem[entities=1,fields=0]',
+            'config.getitem[entities=1,fields=5]',
+            'config.getitem[entities=10,fields=0]'
+        ], names)
+
+    def test_all_benchmarks_run(self):
+        for name, b in benchmarks.items():
+            b.setup(2, 2)()
+
+    def test_save_and_compare(self):
+        results = run_benchmarks(['config.*'], (1,), (0,), rounds=2, min_time=0.001)
+        path = os.path.join(self.dir, 'baseline.json')
+        save_results(results, path)
+        baseline = load_results(path)
+        self.assertEqual(list(results['results']), list(baseline['results']))
+
+        stats = baseline['results']['config.getitem[entities=1,fields=0]']
+        current = {'results': {'config.getitem[entities=1,fields=0]': dict(stats, min=stats['min'] * 1.5),
+                               'new[entities=1,fields=0]': stats}}
+        comparison = compare_results(baseline, current)
+        self.assertEqual(1, len(comparison))
+        self.assertAlmostEqual(0.5, comparison[0][3])
+        self.assertEqual(comparison, regressions(comparison, 0.1))
+        self.assertEqual([], regressions(comparison, 0.6))
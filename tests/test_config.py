@@ -1,4 +1,7 @@
 import os
+import shutil
+import tempfile
+import time
 from unittest import TestCase
 
 from pkg_resources import resource_filename
@@ -16,7 +19,8 @@ __email__ = 'ndouba@redcanari.com'
 __status__ = 'Development'
 
 __all__ = [
-    'CanariConfigParserTest'
+    'CanariConfigParserTest',
+    'ConfigCacheTest'
 ]
 
 
@@ -208,3 +212,72 @@ class CanariConfigParserTest(TestCase):
     def test_delete_section(self):
         del self.config_parser['default']
         self.assertFalse('default' in self.config_parser)
+
+    def test_memoized_values(self):
+        self.assertIs(self.config_parser['types.wordlist'], self.config_parser['types.wordlist'])
+        l = self.config_parser['types.list']
+        l.append(4)
+        self.assertListEqual(self.config_parser['types.list'], [1, 2, 3])
+
+    def test_memoized_values_invalidated(self):
+        self.assertEqual(1, self.config_parser['types.int'])
+        self.config_parser['types.int'] = 2
+        self.assertEqual(2, self.config_parser['types.int'])
+        self.config_parser.set('types', 'int', '3')
+        self.assertEqual(3, self.config_parser['types.int'])
+        del self.config_parser['types.int']
+        self.assertRaises(NoOptionError, self.config_parser.__getitem__, 'types.int')
+        c = CanariConfigParser()
+        c['types.int'] = 4
+        self.config_parser.update(c)
+        self.assertEqual(4, self.config_parser['types.int'])
+
+
+class ConfigCacheTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.config_file = os.path.join(self.tmp_dir, 'canari.conf')
+        self.sub_config_file = os.path.join(self.tmp_dir, 'sub.conf')
+        self.write(self.config_file, '[canari.local]\nconfigs = sub.conf\n\n[test]\nvalue = 1\n')
+        self.write(self.sub_config_file, '[sub]\nvalue = foo\n')
+        self.cache = ConfigCache(interval=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, path, content, offset=0):
+        with open(path, 'w') as f:
+            f.write(content)
+        mtime = time.time() + offset
+        os.utime(path, (mtime, mtime))
+
+    def test_shared_snapshot(self):
+        config = self.cache.get(self.config_file)
+        self.assertIsInstance(config, ReadOnlyCanariConfigParser)
+        self.assertEqual(1, config['test.value'])
+        self.assertEqual('foo', config['sub.value'])
+        self.assertIs(config, self.cache.get(self.config_file))
+        self.assertEqual(0, self.cache.reloads)
+
+    def test_read_only(self):
+        config = self.cache.get(self.config_file)
+        self.assertRaises(TypeError, config.__setitem__, 'test.value', 2)
+        self.assertRaises(TypeError, config.__delitem__, 'test.value')
+        self.assertRaises(TypeError, config.add_section, 'foo')
+        self.assertRaises(TypeError, config.read, self.config_file)
+        self.assertEqual(1, config['test.value'])
+
+    def test_reload(self):
+        config = self.cache.get(self.config_file)
+        self.write(self.sub_config_file, '[sub]\nvalue = bar\n', 10)
+        new_config = self.cache.get(self.config_file)
+        self.assertIsNot(config, new_config)
+        self.assertEqual('bar', new_config['sub.value'])
+        self.assertEqual('foo', config['sub.value'])
+        self.assertEqual(1, self.cache.reloads)
+
+    def test_poll_interval(self):
+        self.cache.interval = 60
+        config = self.cache.get(self.config_file)
+        self.write(self.config_file, '[test]\nvalue = 2\n', 10)
+        self.assertIs(config, self.cache.get(self.config_file))
@@ -1,8 +1,14 @@
+import time
 from unittest import TestCase
 from canari.framework import *
 # noinspection PyUnresolvedReferences
 from canari.maltego.entities import *
+from canari.maltego.message import (MaltegoTransformRequestMessage, MaltegoTransformResponseMessage, MaltegoException,
+                                    Field, UIMessage, Limits)
 from canari.maltego.transform import Transform
+from canari.maltego.utils import to_response
+from canari.mode import set_canari_mode, CanariMode
+from canari.utils.cache import MemoryCache
 
 __author__ = 'Nadeem Douba'
 __copyright__ = 'Copyright 2015, Canari Project'
@@ -57,3 +63,153 @@ class FrameworkTests(TestCase):
 
     def test_remote_transform(self):
         self.create_and_test_transform_function(is_remote=True)
+
+
+class CacheResultsTests(TestCase):
+
+    def setUp(self):
+        self.cache = MemoryCache()
+        self.calls = []
+        self.old_mode = set_canari_mode(CanariMode.RemotePlumeDispatch)
+
+    def tearDown(self):
+        set_canari_mode(self.old_mode)
+
+    def create_transform(self, **kwargs):
+        calls = self.calls
+
+        @CacheResults(backend=self.cache, **kwargs)
+        class TestTransform(Transform):
+            input_type = Phrase
+
+            def do_transform(self, request, response, config):
+                calls.append(request.entity.value)
+                if request.entity.value == 'error':
+                    raise MaltegoException('error')
+                response += UIMessage('called %d' % len(calls))
+                yield Phrase(request.entity.value.upper())
+
+        return TestTransform()
+
+    def run_transform(self, transform, value, fields=None, settings=None, limits=None):
+        request = MaltegoTransformRequestMessage()
+        entity = Phrase(value)
+        for k, v in (fields or {}).items():
+            entity += Field(k, v)
+        request += entity
+        for k, v in (settings or {}).items():
+            request += Field(k, v)
+        response = MaltegoTransformResponseMessage().apply_limits(limits, enforce=True)
+        return to_response(transform.do_transform(request, response, None), response)
+
+    def test_cache_hit(self):
+        t = self.create_transform()
+        for _ in range(3):
+            msg = self.run_transform(t, 'foo')
+            self.assertEqual(['FOO'], [e.value for e in msg.entities])
+            self.assertEqual(['called 1'], [m.message for m in msg.messages])
+        self.assertEqual(['foo'], self.calls)
+
+    def test_cache_key(self):
+        t = self.create_transform()
+        self.run_transform(t, 'foo')
+        self.run_transform(t, 'foo', fields={'a': '1'})
+        self.run_transform(t, 'foo', settings={'b': '2'})
+        self.run_transform(t, 'bar')
+        self.run_transform(t, 'foo', fields={'a': '1'})
+        self.assertEqual(4, len(self.calls))
+
+        t = self.create_transform(key=lambda r: r.entity.value[0])
+        self.run_transform(t, 'bar')
+        self.run_transform(t, 'baz')
+        self.assertEqual(5, len(self.calls))
+
+    def test_ttl(self):
+        t = self.create_transform(ttl=0.2)
+        self.run_transform(t, 'foo')
+        self.run_transform(t, 'foo')
+        time.sleep(0.3)
+        self.run_transform(t, 'foo')
+        self.assertEqual(2, len(self.calls))
+
+    def test_stale_while_revalidate(self):
+        t = self.create_transform(ttl=0.2, stale_ttl=10)
+        self.run_transform(t, 'foo')
+        time.sleep(0.3)
+        msg = self.run_transform(t, 'foo')
+        self.assertEqual(['called 1'], [m.message for m in msg.messages])
+        for _ in range(50):
+            if len(self.calls) == 2:
+                break
+            time.sleep(0.05)
+        time.sleep(0.05)
+        msg = self.run_transform(t, 'foo')
+        self.assertEqual(['called 2'], [m.message for m in msg.messages])
+        self.assertEqual(2, len(self.calls))
+
+    def test_negative_caching(self):
+        t = self.create_transform()
+        self.assertRaises(MaltegoException, self.run_transform, t, 'error')
+        self.assertRaises(MaltegoException, self.run_transform, t, 'error')
+        self.assertEqual(2, len(self.calls))
+
+        t = self.create_transform(negative_ttl=60)
+        self.assertRaises(MaltegoException, self.run_transform, t, 'error')
+        self.assertRaises(MaltegoException, self.run_transform, t, 'error')
+        self.assertEqual(3, len(self.calls))
+
+    def test_limit_reached(self):
+        t = self.create_transform()
+        # Responses cut short by the hard limit aren't cached
+        self.run_transform(t, 'foo', limits=Limits(soft=1, hard=1))
+        self.run_transform(t, 'foo', limits=Limits(soft=1, hard=1))
+        self.assertEqual(2, len(self.calls))
+        self.run_transform(t, 'foo', limits=Limits(soft=1, hard=2))
+        self.run_transform(t, 'foo')
+        self.assertEqual(3, len(self.calls))
+
+    def test_broken_backend(self):
+        class BrokenCache(object):
+            def get(self, key):
+                raise IOError()
+
+            def set(self, key, value, ttl=None):
+                raise IOError()
+
+        self.cache = BrokenCache()
+        t = self.create_transform()
+        self.assertEqual(['FOO'], [e.value for e in self.run_transform(t, 'foo').entities])
+        self.assertEqual(['FOO'], [e.value for e in self.run_transform(t, 'foo').entities])
+        self.assertEqual(2, len(self.calls))
+
+
+class DeduplicateEntitiesTests(TestCase):
+
+    def test_generator_transform(self):
+        @DeduplicateEntities
+        class TestTransform(Transform):
+            input_type = Phrase
+
+            def do_transform(self, request, response, config):
+                yield Location('a', city='Toronto', weight=5)
+                yield Location('a', country='Canada', weight=10)
+                yield Location('a', city='Ottawa')
+                response += Location('a', link_label='link')
+
+        response = MaltegoTransformResponseMessage()
+        msg = to_response(TestTransform().do_transform(MaltegoTransformRequestMessage(), response, None), response)
+        self.assertEqual([
+            ('a', 10, {'city': 'Toronto', 'country': 'Canada', 'link#maltego.link.label': 'link'}),
+            ('a', 1, {'city': 'Ottawa'})
+        ], [(e.value, e.weight, {k: f.value for k, f in e.fields.items()}) for e in msg.entities])
+
+    def test_new_response(self):
+        @DeduplicateEntities
+        class TestTransform(Transform):
+            input_type = Phrase
+
+            def do_transform(self, request, response, config):
+                return MaltegoTransformResponseMessage() + Phrase('a') + Phrase('a') + Phrase('b')
+
+        msg = TestTransform().do_transform(MaltegoTransformRequestMessage(), MaltegoTransformResponseMessage(), None)
+        self.assertEqual(['a', 'b'], [e.value for e in msg.entities])
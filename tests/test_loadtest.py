@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+
+from six.moves.BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from six.moves.socketserver import ThreadingMixIn
+
+from canari.loadtest import synthetic_requests, load_corpus, run_load_test, percentile, summarize
+from canari.maltego.client import RemoteTransformClient
+from canari.maltego.codec import get_codec
+from canari.maltego.message import MaltegoTransformResponseMessage, MaltegoTransformExceptionMessage, MaltegoException
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'LoadTestTests'
+]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        request = get_codec('xml').loads_request(self.rfile.read(int(self.headers.get('Content-Length'))))
+        if request.entity.value == 'phrase 0':
+            body = get_codec('xml').dumps(MaltegoTransformExceptionMessage(exceptions=[MaltegoException('failed')]))
+        else:
+            body = get_codec('xml').dumps(MaltegoTransformResponseMessage())
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class LoadTestTests(TestCase):
+
+    def test_synthetic_requests(self):
+        requests = synthetic_requests(4, ('maltego.Phrase', 'maltego.Domain'), entities=2, fields=3,
+                                      distribution='sequential', cardinality=3)
+        self.assertEqual(4, len(requests))
+        entities = [e for r in requests for e in r.entities]
+        self.assertEqual(['maltego.Phrase', 'maltego.Domain'] * 4, [e.type for e in entities])
+        self.assertEqual(['phrase 0', 'domain 1', 'phrase 2', 'domain 0'], [e.value for e in entities[:4]])
+        self.assertEqual(3, len(entities[0].fields))
+        self.assertEqual((500, 10000), (requests[0].limits.soft, requests[0].limits.hard))
+
+        values = [r.entity.value for r in synthetic_requests(500, distribution='zipf', cardinality=50, seed=1)]
+        self.assertGreater(values.count('phrase 0'), values.count('phrase 10'))
+        self.assertEqual(values, [r.entity.value for r in synthetic_requests(500, distribution='zipf', cardinality=50,
+                                                                               seed=1)])
+
+    def test_load_corpus(self):
+        d = tempfile.mkdtemp()
+        try:
+            request = synthetic_requests(1, seed=1)[0]
+            for name, codec in (('a.xml', 'xml'), ('b.json', 'json')):
+                with open(os.path.join(d, name), 'wb') as f:
+                    f.write(get_codec(codec).dumps(request))
+            self.assertEqual([request.entity.value] * 2, [r.entity.value for r in load_corpus([d])])
+        finally:
+            shutil.rmtree(d)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual((1, 50, 99, 100), tuple(percentile(values, p) for p in (0, 50, 99, 100)))
+        self.assertIsNone(percentile([], 50))
+
+    def test_run_load_test(self):
+        server = Server(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever).start()
+        try:
+            payloads = [get_codec('xml').dumps(r) for r in synthetic_requests(4, distribution='sequential')]
+            with RemoteTransformClient('127.0.0.1:%d' % server.server_address[1], max_connections=2) as client:
+                samples, elapsed = run_load_test(client, 'echo', payloads, concurrency=2, requests=20)
+                self.assertEqual(20, len(samples))
+                self.assertEqual(2, client.pool.created)
+
+                samples, elapsed = run_load_test(client, 'echo', payloads, concurrency=2, rate=200, requests=8,
+                                                 duration=None)
+                self.assertEqual(8, len(samples))
+                # Requests are sent on schedule
+                self.assertGreaterEqual(elapsed, 7 / 200.0)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        summary = summarize(samples, elapsed, transform='echo')
+        self.assertEqual((8, 2, 0.25), (summary['requests'], summary['errors'], summary['error_rate']))
+        self.assertEqual({'MaltegoTransformExceptionMessage': 2}, summary['error_types'])
+        self.assertEqual({'200': 8}, summary['statuses'])
+        self.assertEqual({'transform': 'echo'}, summary['settings'])
+        self.assertLessEqual(summary['latency']['p50'], summary['latency']['max'])
@@ -0,0 +1,128 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+
+from canari.commands.profile_startup import parse_importtime, startup_script
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'ParseImportTimeTests',
+    'DispatcherImportTests'
+]
+
+# Captured from python -X importtime -c "import json" with another top-level module and a stray line added
+importtime_output = """import time: self [us] | cumulative | imported package
+import time:       101 |        101 |         _sre
+import time:      1401 |       1401 |           re._constants
+import time:       531 |       1931 |         re._parser
+import time:       192 |        192 |         re._casefix
+import time:       578 |       2801 |       re._compiler
+import time:       227 |        227 |       copyreg
+import time:       678 |       9426 |     re
+import time:       302 |        302 |       _json
+import time:       708 |       1009 |     json.scanner
+import time:       553 |      10988 |   json.decoder
+import time:       637 |        637 |   json.encoder
+import time:       380 |      12003 | json
+Traceback (most recent call last):
+import time:       117 |        117 | zlib
+"""
+
+transform = """from canari.maltego.entities import Phrase
+from canari.maltego.transform import Transform
+
+
+class Echo(Transform):
+    input_type = Phrase
+
+    def do_transform(self, request, response, config):
+        return response + Phrase(request.entity.value)
+"""
+
+# Reports whether mrbob was imported once the dispatcher has written the transform's response and exited
+dispatch_script = """
+import atexit
+import sys
+atexit.register(lambda: sys.stderr.write('mrbob loaded: %s\\n' % ('mrbob' in sys.modules)))
+from canari.entrypoints import dispatcher
+dispatcher(['dispatchtests.Echo', 'foo'])
+"""
+
+
+def flatten(nodes, depth=0):
+    for n in nodes:
+        yield depth, n.name, n.self_us, n.cumulative_us
+        for c in flatten(n.children, depth + 1):
+            yield c
+
+
+class ParseImportTimeTests(TestCase):
+
+    def test_parse_importtime(self):
+        nodes = parse_importtime(importtime_output.splitlines(True))
+        self.assertEqual(['json', 'zlib'], [n.name for n in nodes])
+        # Children are listed before their parents and in the order they were imported
+        self.assertEqual([
+            (0, 'json', 380, 12003),
+            (1, 'json.decoder', 553, 10988),
+            (2, 're', 678, 9426),
+            (3, 're._compiler', 578, 2801),
+            (4, '_sre', 101, 101),
+            (4, 're._parser', 531, 1931),
+            (5, 're._constants', 1401, 1401),
+            (4, 're._casefix', 192, 192),
+            (3, 'copyreg', 227, 227),
+            (2, 'json.scanner', 708, 1009),
+            (3, '_json', 302, 302),
+            (1, 'json.encoder', 637, 637),
+            (0, 'zlib', 117, 117)
+        ], list(flatten(nodes)))
+
+    def test_empty(self):
+        self.assertEqual([], parse_importtime([]))
+        self.assertEqual([], parse_importtime(['Traceback (most recent call last):']))
+
+
+class DispatcherImportTests(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.tmp_dir, '.canari'))
+        with open(os.path.join(self.tmp_dir, '.canari', 'canari.conf'), 'w') as f:
+            f.write('[canari.local]\npath = ${PATH}\n')
+        with open(os.path.join(self.tmp_dir, 'dispatchtests.py'), 'w') as f:
+            f.write(transform)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def run_script(self, script, *args):
+        env = dict(os.environ, HOME=self.tmp_dir, PYTHONPATH=os.pathsep.join([self.tmp_dir] + sys.path))
+        p = subprocess.Popen([sys.executable, '-c', script] + list(args), env=env, cwd=self.tmp_dir,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        out, err = p.communicate()
+        return p.returncode, out, err
+
+    def test_dispatch(self):
+        # mrbob is only needed to create and install packages so it shouldn't slow down every transform execution
+        code, out, err = self.run_script(dispatch_script)
+        self.assertEqual(0, code, err)
+        self.assertIn('foo', out)
+        self.assertIn('mrbob loaded: False', err)
+
+    def test_startup_script(self):
+        code, out, err = self.run_script(startup_script + 'print("mrbob" in sys.modules)', 'dispatchtests.Echo')
+        self.assertEqual(0, code, err)
+        self.assertEqual('False', out.strip())
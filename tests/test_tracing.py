@@ -0,0 +1,138 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from canari import tracing
+from canari.config import CanariConfigParser
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'TracingTests'
+]
+
+
+class TracingTests(TestCase):
+
+    def setUp(self):
+        self.sink = tracing.RingBufferSink(capacity=10)
+        tracing.set_sink(self.sink)
+
+    def tearDown(self):
+        tracing.set_sink(None)
+
+    def test_spans(self):
+        with tracing.trace('t1'):
+            with tracing.span('outer', transform='a') as outer:
+                with tracing.span('inner') as inner:
+                    inner.set(size=3)
+                try:
+                    with tracing.span('failed'):
+                        raise ValueError()
+                except ValueError:
+                    pass
+        self.assertIsNone(tracing.current_context())
+
+        failed, outer = self.sink.spans()[1:]
+        self.assertEqual(['inner', 'failed', 'outer'], [s.name for s in self.sink.spans()])
+        self.assertEqual(['t1'] * 3, [s.trace_id for s in self.sink.spans()])
+        self.assertEqual((outer.span_id, outer.span_id, None), (inner.parent_id, failed.parent_id, outer.parent_id))
+        self.assertEqual(({'transform': 'a'}, {'size': 3}), (outer.attributes, inner.attributes))
+        self.assertEqual(('ValueError', None), (failed.error, outer.error))
+        self.assertGreaterEqual(outer.duration, inner.duration)
+
+        # Spans outside of a trace start a new one
+        with tracing.span('root'):
+            pass
+        root = self.sink.spans()[-1]
+        self.assertEqual((32, None), (len(root.trace_id), root.parent_id))
+
+        # The ring buffer only keeps the last spans
+        for i in range(20):
+            tracing.emit('emitted', time.time(), 0.5, ('t2', 'abc'), index=i)
+        self.assertEqual(list(range(10, 20)), [s.attributes['index'] for s in self.sink.spans()])
+        self.assertEqual(('t2', 'abc'), (self.sink.spans('t2')[0].trace_id, self.sink.spans('t2')[0].parent_id))
+
+    def test_disabled(self):
+        tracing.set_sink(None)
+        with tracing.span('ignored') as s:
+            s.set(foo='bar')
+            self.assertIsNone(tracing.current_context())
+        tracing.emit('ignored', time.time(), 0.5)
+        self.assertEqual([], self.sink.spans())
+
+    def test_bind(self):
+        results = []
+
+        def work():
+            with tracing.span('work'):
+                results.append(tracing.current_trace_id())
+
+        with tracing.trace('t1'), tracing.span('parent') as parent:
+            t = threading.Thread(target=tracing.bind(work))
+            t.start()
+            t.join()
+        work, parent = self.sink.spans()
+        self.assertEqual(['t1'], results)
+        self.assertEqual(parent.span_id, work.parent_id)
+        self.assertNotEqual(parent.thread, work.thread)
+
+    def test_parse_trace_id(self):
+        self.assertEqual('0af7651916cd43dd8448eb211c80319c', tracing.parse_trace_id('0af7651916cd43dd8448eb211c80319c'))
+        self.assertIsNone(tracing.parse_trace_id(None))
+        self.assertIsNone(tracing.parse_trace_id('a b'))
+        self.assertIsNone(tracing.parse_trace_id('a' * 65))
+
+    def test_chrome_trace_sink(self):
+        d = tempfile.mkdtemp()
+        try:
+            path = os.path.join(d, 'trace.json')
+            tracing.set_sink(tracing.ChromeTraceSink(path))
+            with tracing.trace('t1'), tracing.span('outer', transform='a'), tracing.span('inner'):
+                pass
+            tracing.get_sink().close()
+            with open(path) as f:
+                events = json.load(f)
+            self.assertEqual(['inner', 'outer'], [e['name'] for e in events])
+            self.assertEqual({'X'}, set(e['ph'] for e in events))
+            self.assertEqual(('a', 't1'), (events[1]['args']['transform'], events[1]['args']['trace_id']))
+            self.assertEqual(events[1]['args']['span_id'], events[0]['args']['parent_id'])
+            self.assertLessEqual(events[1]['ts'], events[0]['ts'])
+        finally:
+            shutil.rmtree(d)
+
+    def test_sink_from_config(self):
+        config = CanariConfigParser()
+        self.assertIsInstance(tracing.sink_from_config(config), tracing.NullSink)
+        config['canari.remote.trace_sink'] = 'memory'
+        config['canari.remote.trace_buffer'] = 5
+        sink = tracing.sink_from_config(config)
+        self.assertEqual(5, sink._spans.maxlen)
+        config['canari.remote.trace_sink'] = 'canari.tracing.RingBufferSink'
+        self.assertIsInstance(tracing.sink_from_config(config), tracing.RingBufferSink)
+
+    def test_profiler(self):
+        def spin():
+            end = time.time() + 0.1
+            while time.time() < end:
+                pass
+
+        with tracing.Profiler(interval=0.001) as profiler:
+            spin()
+        self.assertTrue(profiler.samples)
+        lines = profiler.folded().splitlines()
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertGreater(int(count), 0)
+        self.assertTrue(any('spin (test_tracing.py:' in l for l in lines))
@@ -0,0 +1,79 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from unittest import TestCase, skipUnless
+
+from canari import worker
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+
+client = """
+import sys
+from canari.worker import _forward_to_worker
+sys.exit(_forward_to_worker(sys.argv[1]))
+"""
+
+
+@skipUnless(worker.is_supported(), 'worker requires Python 3 and Unix domain sockets')
+class WorkerTests(TestCase):
+
+    def setUp(self):
+        class EchoWorkerServer(worker.WorkerServer):
+            def _preload(self):
+                pass
+
+            def _refresh_config(self):
+                pass
+
+            def run(self, argv):
+                sys.stdout.write('%s %s %s' % (' '.join(argv), os.environ['CANARI_TEST'], os.getcwd()))
+                sys.stderr.write('%50.0\n')
+                exit(int(argv[-1]))
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, '.canari', 'worker.sock')
+        self.server = EchoWorkerServer(self.path, None)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp_dir)
+
+    def run_client(self, code):
+        env = dict(os.environ, CANARI_TEST='foo', PYTHONPATH=os.pathsep.join(sys.path))
+        p = subprocess.Popen([sys.executable, '-c', client, self.path, str(code)], env=env, cwd=self.tmp_dir,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = p.communicate()
+        return p.returncode, out.decode('utf-8'), err.decode('utf-8')
+
+    def test_dispatch(self):
+        code, out, err = self.run_client(0)
+        self.assertEqual(code, 0)
+        self.assertEqual(out, '-c %s 0 foo %s' % (self.path, os.path.realpath(self.tmp_dir)))
+        self.assertEqual(err, '%50.0\n')
+
+    def test_exit_code(self):
+        self.assertEqual(self.run_client(3)[0], 3)
+
+    def test_permissions(self):
+        # The socket's directory is created if it is missing and both are only accessible by their owner
+        self.assertEqual(0o700, os.stat(os.path.dirname(self.path)).st_mode & 0o777)
+        self.assertEqual(0o600, os.stat(self.path).st_mode & 0o777)
+
+    def test_no_worker(self):
+        self.assertIsNone(worker._forward_to_worker(os.path.join(self.tmp_dir, 'missing.sock')))
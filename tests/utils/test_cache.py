@@ -0,0 +1,155 @@
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from six.moves import socketserver
+
+from canari.utils.cache import MemoryCache, SQLiteCache, RedisError, cache_from_uri
+
+__author__ = 'Nadeem Douba'
+__copyright__ = 'Copyright 2015, Canari Project'
+__credits__ = []
+
+__license__ = 'GPLv3'
+__version__ = '0.1'
+__maintainer__ = 'Nadeem Douba'
+__email__ = 'ndouba@redcanari.com'
+__status__ = 'Development'
+
+__all__ = [
+    'MemoryCacheTests',
+    'SQLiteCacheTests',
+    'RedisCacheTests'
+]
+
+
+class CacheTestsMixin(object):
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get('foo'))
+        self.cache.set('foo', b'bar')
+        self.assertEqual(b'bar', self.cache.get('foo'))
+        self.cache.set('foo', u'baz')
+        self.assertEqual(b'baz', self.cache.get('foo'))
+        self.cache.delete('foo')
+        self.assertIsNone(self.cache.get('foo'))
+
+    def test_ttl(self):
+        self.cache.set('foo', b'bar', 0.2)
+        self.cache.set('bar', b'baz')
+        self.assertEqual(b'bar', self.cache.get('foo'))
+        time.sleep(0.3)
+        self.assertIsNone(self.cache.get('foo'))
+        self.assertEqual(b'baz', self.cache.get('bar'))
+
+
+class MemoryCacheTests(CacheTestsMixin, TestCase):
+
+    def setUp(self):
+        self.cache = MemoryCache(max_entries=2)
+
+    def test_lru(self):
+        self.cache.set('a', b'1')
+        self.cache.set('b', b'2')
+        self.cache.get('a')
+        self.cache.set('c', b'3')
+        self.assertEqual(2, len(self.cache))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(b'1', self.cache.get('a'))
+        self.assertEqual(b'3', self.cache.get('c'))
+
+
+class SQLiteCacheTests(CacheTestsMixin, TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = cache_from_uri('sqlite://%s' % os.path.join(self.tmp_dir, 'cache', 'cache.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_shared(self):
+        self.cache.set('foo', b'bar')
+        self.assertEqual(b'bar', SQLiteCache(self.cache.path).get('foo'))
+
+        result = []
+        t = threading.Thread(target=lambda: result.append(self.cache.get('foo')))
+        t.start()
+        t.join()
+        self.assertEqual([b'bar'], result)
+
+
+class _RedisHandler(socketserver.StreamRequestHandler):
+    """Implements just enough of the Redis protocol to stand in for a Redis server."""
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            n = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(n + 2)[:-2])
+        return args
+
+    def handle(self):
+        data = self.server.data
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            command = args[0].upper()
+            if command == b'GET':
+                value, expires = data.get(args[1], (None, None))
+                if value is None or (expires and expires <= time.time()):
+                    self.wfile.write(b'$-1\r\n')
+                else:
+                    self.wfile.write(b'$%d\r\n%s\r\n' % (len(value), value))
+            elif command == b'SET':
+                expires = time.time() + int(args[4]) / 1000.0 if len(args) > 3 else None
+                data[args[1]] = (args[2], expires)
+                self.wfile.write(b'+OK\r\n')
+            elif command == b'DEL':
+                self.wfile.write(b':%d\r\n' % (data.pop(args[1], None) is not None))
+            else:
+                self.wfile.write(b'-ERR unknown command\r\n')
+
+
+class _RedisServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        socketserver.TCPServer.__init__(self, ('127.0.0.1', 0), _RedisHandler)
+        self.data = {}
+
+
+class RedisCacheTests(CacheTestsMixin, TestCase):
+
+    def setUp(self):
+        self.server = _RedisServer()
+        t = threading.Thread(target=self.server.serve_forever)
+        t.daemon = True
+        t.start()
+        self.cache = cache_from_uri('redis://127.0.0.1:%d/0?prefix=test:' % self.server.server_address[1])
+
+    def tearDown(self):
+        self.cache.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_prefix(self):
+        self.cache.set('foo', b'bar')
+        self.assertEqual([b'test:foo'], list(self.server.data))
+
+    def test_error(self):
+        self.assertRaises(RedisError, self.cache.execute, 'FOO')
+
+    def test_reconnect(self):
+        self.cache.set('foo', b'bar')
+        self.cache._local.sock.shutdown(socket.SHUT_RDWR)
+        self.assertEqual(b'bar', self.cache.get('foo'))
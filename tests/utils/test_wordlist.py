@@ -1,11 +1,39 @@
+import os
+import shutil
+import tempfile
 import zlib
 from unittest import TestCase
 from pkg_resources import resource_filename
-from canari.utils.wordlist import wordlist
+from canari.utils.wordlist import wordlist, SortedWordList, WordTrie
 
 
 class WordListTests(TestCase):
 
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        self.old_cache_dir = os.environ.get('CANARI_WORDLIST_CACHE')
+        os.environ['CANARI_WORDLIST_CACHE'] = self.cache_dir
+
+    def tearDown(self):
+        if self.old_cache_dir is None:
+            del os.environ['CANARI_WORDLIST_CACHE']
+        else:
+            os.environ['CANARI_WORDLIST_CACHE'] = self.old_cache_dir
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, content, suffix='.txt'):
+        path = os.path.join(self.tmp_dir, 'wordlist' + suffix)
+        with open(path, 'wb') as f:
+            f.write(content if isinstance(content, bytes) else content.encode('utf-8'))
+        # Make sure the modification time changes between writes
+        st = os.stat(path)
+        os.utime(path, (st.st_atime, st.st_mtime + 2))
+        return path
+
+    def load(self, content, suffix='.txt', **kwargs):
+        return wordlist('file://%s' % self.write(content, suffix), **kwargs)
+
     def test_simple_wordlist_resource(self):
         self.assertListEqual(
             ['1', '2', '3', '4', '5'],
@@ -53,3 +81,53 @@ class WordListTests(TestCase):
                 decompressor=lambda d: zlib.decompress(d, 16 + zlib.MAX_WBITS)
             )
         )
+
+    def test_multi_character_lines(self):
+        self.assertEqual(['foo', 'bar baz', 'qux'], self.load(u'foo\r\n# comment\nbar baz\n\nqux'))
+
+    def test_streamed_gz(self):
+        words = [u'word%d' % i for i in range(50000)]
+        data = u'\n'.join(words).encode('utf-8')
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self.assertEqual(words, self.load(compressor.compress(data) + compressor.flush(), '.txt.gz'))
+
+    def test_backends(self):
+        content = u'foo\nfoobar\nbar\nfoo\nbaz'
+        self.assertEqual(frozenset(['foo', 'foobar', 'bar', 'baz']), self.load(content, backend='set'))
+
+        words = self.load(content, backend='sorted')
+        self.assertIsInstance(words, SortedWordList)
+        self.assertEqual(['bar', 'baz', 'foo', 'foobar'], list(words))
+        self.assertIn('foo', words)
+        self.assertNotIn('fo', words)
+        self.assertEqual(['foo', 'foobar'], list(words.startswith('fo')))
+        self.assertEqual([], list(words.startswith('x')))
+
+        words = self.load(content, backend='trie')
+        self.assertIsInstance(words, WordTrie)
+        self.assertEqual(4, len(words))
+        self.assertEqual(['bar', 'baz', 'foo', 'foobar'], list(words))
+        self.assertIn('foobar', words)
+        self.assertNotIn('fo', words)
+        self.assertTrue(words.has_prefix('fo'))
+        self.assertEqual(['foo', 'foobar'], list(words.startswith('foo')))
+        self.assertEqual([], list(words.startswith('x')))
+
+        self.assertRaises(ValueError, self.load, content, backend='foo')
+
+    def test_cache(self):
+        uri = 'file://%s' % self.write(u'1\n2\n#3\n')
+        self.assertEqual(['1', '2'], wordlist(uri, cache=True))
+        self.assertEqual(2, len([f for f in os.listdir(self.cache_dir) if f.endswith(('.txt', '.json'))]))
+
+        # Serve straight from the cache if the file is unchanged
+        data_file = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir) if f.endswith('.txt')][0]
+        with open(data_file, 'w') as f:
+            f.write('cached\n')
+        self.assertEqual(['cached'], wordlist(uri, cache=True))
+        self.assertEqual(['1', '2'], wordlist(uri, cache=False))
+
+        # Reload the wordlist once it has changed
+        self.write(u'1\n2\n3\n4\n')
+        self.assertEqual(['1', '2', '3', '4'], wordlist(uri, cache=True, backend='list'))
+        self.assertEqual(['1', '2', '3', '4'], wordlist(uri, cache=True))